@@ -1,6 +1,8 @@
 # authentech_app/management/commands/create_fake_users.py
 from django.core.management.base import BaseCommand
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from django.db import transaction
 from faker import Faker
 from authentech_app.models import UserProfile
 
@@ -10,21 +12,68 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('num_users', type=int, help='Number of fake users to create')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed, for reproducible users')
+        parser.add_argument('--bulk', action='store_true',
+                            help='Insert users and profiles with bulk_create in batches instead of one at a time')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per insert with --bulk')
+        parser.add_argument('--fast-hash', action='store_true',
+                            help='Give every user the same password, hashed once, instead of hashing one per user')
+        parser.add_argument('--password', default=None,
+                            help='The shared password with --fast-hash (a random one is printed by default)')
 
     def handle(self, *args, **options):
         num_users = options['num_users']
         fake = Faker()
+        if options['seed'] is not None:
+            fake.seed_instance(options['seed'])
+        existing_usernames = set(User.objects.values_list('username', flat=True))
 
+        shared_password = None
+        if options['fast_hash']:
+            shared_password = options['password'] or fake.password()
+            # Hashing is deliberately slow; once for all users keeps large batches fast
+            shared_password_hash = make_password(shared_password)
+
+        users, profiles = [], []
         for _ in range(num_users):
-            username = fake.user_name()
+            # Usernames are unique; Faker repeats them often enough to matter in large batches
+            username = fake.unique.user_name()
+            while username in existing_usernames:
+                username = fake.unique.user_name()
             email = fake.email()
-            password = fake.password()
             first_name = fake.first_name()
             last_name = fake.last_name()
             preferred_name = f"{first_name} {last_name}"
 
-            user = User.objects.create_user(username=username, email=email, password=password,
-                                            first_name=first_name, last_name=last_name)
+            if options['bulk']:
+                users.append(User(
+                    username=User.normalize_username(username), email=User.objects.normalize_email(email),
+                    first_name=first_name, last_name=last_name,
+                    password=shared_password_hash if shared_password else make_password(fake.password()),
+                ))
+                profiles.append(preferred_name)
+                continue
+
+            if shared_password:
+                user = User.objects.create(
+                    username=User.normalize_username(username), email=User.objects.normalize_email(email),
+                    first_name=first_name, last_name=last_name, password=shared_password_hash,
+                )
+            else:
+                user = User.objects.create_user(username=username, email=email, password=fake.password(),
+                                                first_name=first_name, last_name=last_name)
             UserProfile.objects.create(user=user, preferred_name=preferred_name)
 
-        self.stdout.write(self.style.SUCCESS(f'Successfully created {num_users} fake users.'))
\ No newline at end of file
+        if options['bulk']:
+            # New users have no quantables, so skipping UserProfile's post_save handler loses nothing
+            with transaction.atomic():
+                for start in range(0, len(users), options['batch_size']):
+                    batch = User.objects.bulk_create(users[start:start + options['batch_size']])
+                    UserProfile.objects.bulk_create([
+                        UserProfile(user=user, preferred_name=preferred_name)
+                        for user, preferred_name in zip(batch, profiles[start:start + options['batch_size']])
+                    ])
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully created {num_users} fake users.'))
+        if shared_password:
+            self.stdout.write(f'Every new user has the password: {shared_password}')
@@ -1,6 +1,11 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class DiscussableAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'quantable_app'
+
+    def ready(self):
+        from .instrumentation import install_query_recorder  # Import here to avoid circular import
+        connection_created.connect(install_query_recorder)
@@ -0,0 +1,219 @@
+# quantable_app/async_views.py
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBase
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+from . import live_updates, payloads, response_cache
+from .enums import Category, CATEGORY_UNIT_MAPPING
+from .models import Quantable, QuantablePair, stats_refresh_deferred
+from .pagination import QuantableKeysetPagination
+from .preferences import aresolve_preferred_unit, aresolve_preferred_units
+from .serializers import CategorySerializer
+from .vote_storage import get_storage
+
+# Async versions of the read endpoints for ASGI deployments (e.g. `uvicorn quantable_backend.asgi:application`),
+# so a worker keeps serving other readers while one waits on the database. They return the same
+# bodies as the sync views in views.py, built by the same functions in payloads.py.
+
+
+class AsyncReadView(View):
+    """
+    Base for the async read views. DRF 3.14 views cannot be async, so this authenticates with the
+    configured DRF authentication classes, renders with DRF's JSONRenderer and turns exceptions into
+    responses with DRF's exception handler, as an APIView would. Subclasses implement aget(), which
+    returns the data to render or a ready response.
+    """
+    authentication_required = False
+
+    async def get(self, request, *args, **kwargs):
+        request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+        try:
+            # Authenticating reads the token from the database
+            user = await sync_to_async(lambda: request.user)()
+            if self.authentication_required and not user.is_authenticated:
+                raise exceptions.NotAuthenticated()
+            data = await self.aget(request, user, *args, **kwargs)
+        except (exceptions.APIException, Http404) as exc:
+            return self.handle_exception(exc, request)
+        if isinstance(data, HttpResponseBase):
+            return data
+        return HttpResponse(JSONRenderer().render(data), content_type='application/json')
+
+    async def aget(self, request, user, *args, **kwargs):
+        raise NotImplementedError
+
+    def handle_exception(self, exc, request):
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            exc.auth_header = request.authenticators[0].authenticate_header(request) if request.authenticators else None
+            if exc.auth_header is None:
+                exc.status_code = 403
+        response = exception_handler(exc, {'request': request, 'view': self})
+        http_response = HttpResponse(JSONRenderer().render(response.data), status=response.status_code,
+                                     content_type='application/json')
+        for header in ('WWW-Authenticate', 'Retry-After'):
+            if header in response:
+                http_response[header] = response[header]
+        return http_response
+
+
+class InvalidQuantableData(exceptions.APIException):
+    # Rendered as {'error': ...}, as the sync list view does for a ValueError
+    status_code = 400
+
+
+class ASGIRequired(exceptions.APIException):
+    status_code = 501
+    default_detail = 'Live updates are only served when the application runs under ASGI.'
+    default_code = 'asgi_required'
+
+
+async def _user_votes(user, quantables):
+    """{quantable id: the user's vote} for the given quantables, or None for anonymous users."""
+    if not user.is_authenticated:
+        return None
+    return await get_storage().auser_votes(user, [quantable.id for quantable in quantables])
+
+
+async def _refresh_stale_vote_data(quantables):
+    if stats_refresh_deferred():
+        await sync_to_async(Quantable.refresh_stale_vote_data)(quantables)
+
+
+class AsyncQuantableListView(AsyncReadView):
+    async def aget(self, request, user):
+        sort_option = request.query_params.get('sort', 'newest')
+        include_vote_values = request.query_params.get('include_vote_values', '').lower() in ('1', 'true')
+
+        paginator = QuantableKeysetPagination(request, sort_option)
+        page = await paginator.apaginate_queryset(Quantable.objects.select_related(
+            'histogram', 'min_of_pair__max_quantable__histogram', 'max_of_pair__min_quantable__histogram'
+        ))
+        pairs, quantables = payloads.page_with_partners(page)
+        await _refresh_stale_vote_data(quantables)
+
+        vote_values, preferred_units = await asyncio.gather(
+            self.load_vote_values([quantable.id for quantable in quantables], include_vote_values),
+            aresolve_preferred_units(user, quantables),
+        )
+
+        try:
+            # A quantable whose histogram is not built yet falls back to reading its votes
+            quantable_data_by_id = await sync_to_async(payloads.build_list_rows)(
+                quantables, vote_values, preferred_units, include_vote_values
+            )
+        except ValueError as e:
+            raise InvalidQuantableData({'error': str(e)})
+        return paginator.get_paginated_response_data(
+            payloads.list_results(page, pairs, quantable_data_by_id, paginator)
+        )
+
+    async def load_vote_values(self, quantable_ids, include_vote_values):
+        if include_vote_values:
+            return await get_storage().avote_values(quantable_ids)
+        return {quantable_id: [] for quantable_id in quantable_ids}
+
+
+class AsyncQuantableDetailView(AsyncReadView):
+    async def aget(self, request, user, pk):
+        try:
+            instance = await Quantable.objects.select_related('histogram').aget(pk=pk)
+        except Quantable.DoesNotExist:
+            raise Http404
+        await _refresh_stale_vote_data([instance])
+
+        preferred_unit, user_votes = await asyncio.gather(
+            aresolve_preferred_unit(user, instance), _user_votes(user, [instance])
+        )
+        data = await sync_to_async(response_cache.get_or_build)(
+            'detail', [instance.id], preferred_unit, lambda: payloads.build_detail_payload(instance, preferred_unit)
+        )
+        return payloads.with_detail_user_vote(data, instance, (user_votes or {}).get(instance.id), preferred_unit)
+
+
+class AsyncQuantablePairDetailView(AsyncReadView):
+    async def aget(self, request, user, pair_id):
+        try:
+            pair = await QuantablePair.objects.select_related(
+                'min_quantable__histogram', 'max_quantable__histogram'
+            ).aget(pair_id=pair_id)
+        except QuantablePair.DoesNotExist:
+            raise exceptions.NotFound("Quantable pair not found.")
+        min_quantable, max_quantable = pair.min_quantable, pair.max_quantable
+        await _refresh_stale_vote_data([min_quantable, max_quantable])
+
+        # A unit passed in the query applies to this response only; otherwise the user's stored preferences apply
+        preferred_unit = request.query_params.get('preferred_unit')
+        if preferred_unit:
+            user_votes = await _user_votes(user, [min_quantable, max_quantable])
+        else:
+            preferred_unit, user_votes = await asyncio.gather(
+                aresolve_preferred_unit(user, min_quantable), _user_votes(user, [min_quantable, max_quantable])
+            )
+
+        payload = await sync_to_async(response_cache.get_or_build)(
+            'pair', [min_quantable.id, max_quantable.id], preferred_unit,
+            lambda: payloads.build_pair_payload(min_quantable, max_quantable, preferred_unit)
+        )
+        return payloads.with_pair_user_votes(payload, min_quantable, max_quantable, user_votes, preferred_unit)
+
+
+class AsyncCategoryListView(AsyncReadView):
+    authentication_required = True
+
+    async def aget(self, request, user):
+        return CategorySerializer([category for category in Category], many=True).data
+
+
+class AsyncUnitListView(AsyncReadView):
+    authentication_required = True
+
+    async def aget(self, request, user, category):
+        unit_enum = CATEGORY_UNIT_MAPPING[Category(category)]
+        return CategorySerializer([unit for unit in unit_enum], many=True).data
+
+
+class QuantableLiveUpdatesView(AsyncReadView):
+    """
+    Server-sent events with the live stats and histogram bins of the quantables in ?ids=1,2,3, in the
+    user's preferred units: a snapshot of each first, then only the changed fields, coalesced into at
+    most one event per QUANTABLE_LIVE_UPDATES_INTERVAL seconds. Needs ASGI: a WSGI server collects
+    the body of an async streaming response before sending any of it, so the endless stream would
+    never start and would hold the worker forever. WSGI requests get a 501 instead.
+    """
+
+    async def aget(self, request, user):
+        if not isinstance(request._request, ASGIRequest):
+            raise ASGIRequired()
+        try:
+            quantable_ids = {int(quantable_id) for quantable_id in request.query_params.get('ids', '').split(',')
+                             if quantable_id.strip()}
+        except ValueError:
+            quantable_ids = None
+        if not quantable_ids:
+            raise exceptions.ValidationError({'ids': 'A comma-separated list of quantable ids is required.'})
+        max_quantables = getattr(settings, 'QUANTABLE_LIVE_UPDATES_MAX_QUANTABLES', 50)
+        if len(quantable_ids) > max_quantables:
+            raise exceptions.ValidationError({'ids': f'At most {max_quantables} quantables can be followed at once.'})
+
+        quantables = [quantable async for quantable in Quantable.objects.filter(id__in=quantable_ids)]
+        missing = quantable_ids - {quantable.id for quantable in quantables}
+        if missing:
+            raise exceptions.NotFound(f"Quantables not found: {', '.join(map(str, sorted(missing)))}")
+        units = await aresolve_preferred_units(user, quantables)
+
+        response = StreamingHttpResponse(live_updates.stream(quantables, units), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stops nginx from buffering the events
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -0,0 +1,163 @@
+# quantable_app/exchange_rates.py
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .enums import CurrencyUnit
+
+logger = logging.getLogger(__name__)
+
+# Every rate is in units per USD
+RateSnapshot = namedtuple('RateSnapshot', ['version', 'rates'])
+
+# Hardcoded conversion rates (units per USD) for development purposes, and the offline default
+STATIC_RATES = {
+    CurrencyUnit.USD.value: 1.0,
+    CurrencyUnit.EUR.value: 0.92,
+    CurrencyUnit.GBP.value: 0.81,
+    CurrencyUnit.JPY.value: 135.0,
+    CurrencyUnit.CAD.value: 1.32,
+    CurrencyUnit.AUD.value: 1.47,
+    CurrencyUnit.CHF.value: 0.96,
+    CurrencyUnit.CNY.value: 6.80,
+    CurrencyUnit.HKD.value: 7.75,
+    CurrencyUnit.SGD.value: 1.37,
+}
+
+
+def validate_rates(rates):
+    missing = [unit.value for unit in CurrencyUnit if unit.value not in rates]
+    if missing:
+        raise ValueError(f"No exchange rate for: {', '.join(missing)}")
+    invalid = [unit for unit, rate in rates.items() if not isinstance(rate, (int, float)) or rate <= 0]
+    if invalid:
+        raise ValueError(f"Invalid exchange rate for: {', '.join(invalid)}")
+    return rates
+
+
+class StaticRateProvider:
+    """The rates above, for development and offline use."""
+
+    def version(self):
+        return 'static'
+
+    def snapshot(self):
+        return RateSnapshot('static', dict(STATIC_RATES))
+
+
+class FileRateProvider:
+    """
+    Rates read from a JSON file of the form {"version": ..., "rates": {"USD": 1.0, ...}},
+    at QUANTABLE_EXCHANGE_RATE_FILE. write() replaces the file atomically. The version is the
+    file's modification time and size, so checking it does not read the file.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or getattr(settings, 'QUANTABLE_EXCHANGE_RATE_FILE', None)
+
+    def version(self):
+        return self._stat_version(os.stat(self.path))
+
+    def snapshot(self):
+        # Tagged with the version() of the file actually read, so the next check finds it unchanged
+        with open(self.path) as rate_file:
+            version = self._stat_version(os.fstat(rate_file.fileno()))
+            data = json.load(rate_file)
+        return RateSnapshot(version, validate_rates(data['rates']))
+
+    @staticmethod
+    def _stat_version(stat):
+        return f'file:{stat.st_mtime_ns}:{stat.st_size}'
+
+    def write(self, rates, version, source=''):
+        validate_rates(rates)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile('w', dir=directory, delete=False) as rate_file:
+            json.dump({'version': version, 'source': source, 'rates': rates}, rate_file, indent=2)
+        os.replace(rate_file.name, self.path)
+
+
+class DatabaseRateProvider:
+    """The newest ExchangeRateSnapshot row; older rows are kept as history."""
+
+    def version(self):
+        from .models import ExchangeRateSnapshot  # Import here to avoid circular import
+        latest_id = ExchangeRateSnapshot.objects.order_by('-id').values_list('id', flat=True).first()
+        if latest_id is None:
+            raise LookupError('No exchange rate snapshot has been recorded.')
+        return f'db:{latest_id}'
+
+    def snapshot(self):
+        from .models import ExchangeRateSnapshot  # Import here to avoid circular import
+        latest = ExchangeRateSnapshot.objects.order_by('-id').first()
+        if latest is None:
+            raise LookupError('No exchange rate snapshot has been recorded.')
+        return RateSnapshot(f'db:{latest.id}', validate_rates(latest.rates))
+
+    def write(self, rates, version=None, source=''):
+        from .models import ExchangeRateSnapshot  # Import here to avoid circular import
+        return ExchangeRateSnapshot.objects.create(rates=validate_rates(rates), source=source)
+
+
+PROVIDERS = {
+    'static': StaticRateProvider,
+    'file': FileRateProvider,
+    'database': DatabaseRateProvider,
+}
+
+
+def get_provider():
+    provider = getattr(settings, 'QUANTABLE_EXCHANGE_RATE_PROVIDER', 'static')
+    provider_class = PROVIDERS[provider] if provider in PROVIDERS else import_string(provider)
+    return provider_class()
+
+
+# (snapshot, monotonic time it was last checked against the provider), replaced as a whole
+_current = (None, 0.0)
+_refresh_lock = threading.Lock()
+
+
+def current_snapshot():
+    """
+    The rate snapshot in use. The provider is asked whether its version has changed at most once
+    every QUANTABLE_EXCHANGE_RATE_REFRESH_SECONDS; in between this is a tuple read.
+    """
+    snapshot, checked_at = _current
+    refresh_seconds = getattr(settings, 'QUANTABLE_EXCHANGE_RATE_REFRESH_SECONDS', 300)
+    if snapshot is not None and time.monotonic() - checked_at < refresh_seconds:
+        return snapshot
+    if not _refresh_lock.acquire(blocking=snapshot is None):
+        # Another thread is refreshing; keep serving the current rates meanwhile
+        return snapshot
+    try:
+        return _refresh(snapshot)
+    finally:
+        _refresh_lock.release()
+
+
+def _refresh(previous):
+    global _current
+    provider = get_provider()
+    try:
+        version = provider.version()
+        snapshot = previous if previous is not None and previous.version == version else provider.snapshot()
+    except Exception:
+        logger.warning('Could not load exchange rates; keeping the %s rates',
+                       previous.version if previous else 'static', exc_info=True)
+        snapshot = previous or StaticRateProvider().snapshot()
+    _current = (snapshot, time.monotonic())
+    return snapshot
+
+
+def reset():
+    """Forget the cached snapshot so the next lookup reloads it from the provider."""
+    global _current
+    _current = (None, 0.0)
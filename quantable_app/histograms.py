@@ -0,0 +1,142 @@
+# quantable_app/histograms.py
+
+from collections import namedtuple
+
+import numpy as np
+
+VoteSummary = namedtuple('VoteSummary', ['sorted_values', 'quantiles', 'bins', 'ninety_percent_range'])
+
+# A single far-off vote would otherwise stretch a stored histogram over millions of bins
+MAX_STORED_BINS = 200
+
+
+def sort_votes(values):
+    return np.sort(np.asarray(values, dtype=float))
+
+
+def quantiles(sorted_values, qs):
+    """Exact quantiles of an already sorted array, interpolated like np.percentile's default."""
+    positions = np.asarray(qs, dtype=float) * (len(sorted_values) - 1)
+    lower = np.floor(positions).astype(int)
+    upper = np.ceil(positions).astype(int)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (positions - lower)
+
+
+def freedman_diaconis_width(vote_count, vote_iqr):
+    if vote_count < 2 or not vote_iqr:
+        return None
+    return 2 * vote_iqr / (vote_count ** (1 / 3))
+
+
+def stored_layout(minimum, maximum, bin_width):
+    """
+    Bin width and number of bins a stored histogram covers [minimum, maximum] with, the bins
+    widened when needed so there are at most MAX_STORED_BINS of them.
+    """
+    value_range = maximum - minimum
+    if value_range > bin_width * MAX_STORED_BINS:
+        bin_width = value_range / MAX_STORED_BINS
+    return bin_width, min(max(int(np.ceil(value_range / bin_width)), 1), MAX_STORED_BINS)
+
+
+def freedman_diaconis_bins(sorted_values):
+    """
+    Freedman-Diaconis bins of a sorted vote array. Each bin covers [bin_min, bin_max)
+    and all bins are counted at once with two binary searches over the sorted votes.
+    """
+    vote_count = len(sorted_values)
+    if vote_count < 2:
+        return []
+
+    q1, q3 = quantiles(sorted_values, [0.25, 0.75])
+    bin_width = freedman_diaconis_width(vote_count, q3 - q1)
+    if not bin_width:
+        return []
+
+    min_val = sorted_values[0]
+    num_bins = int(np.ceil((sorted_values[-1] - min_val) / bin_width))
+    bin_mins = min_val + np.arange(num_bins) * bin_width
+    bin_maxs = bin_mins + bin_width
+    counts = np.searchsorted(sorted_values, bin_maxs) - np.searchsorted(sorted_values, bin_mins)
+    percentages = counts / vote_count * 100
+
+    return [{
+        'bin_min': bin_min,
+        'bin_max': bin_max,
+        'count': count,
+        'percentage': percentage
+    } for bin_min, bin_max, count, percentage in zip(
+        bin_mins.tolist(), bin_maxs.tolist(), counts.tolist(), percentages.tolist()
+    )]
+
+
+def ninety_percent_range(bins):
+    """(nmin, nmax) where the cumulative share of votes first reaches 5% and 95%, or None."""
+    if not bins:
+        return None
+
+    counts = np.array([bin['count'] for bin in bins])
+    total_votes = counts.sum()
+    if total_votes == 0:
+        return None
+
+    cumulative_percentage = np.cumsum(counts) / total_votes * 100
+    reached_min = np.flatnonzero(cumulative_percentage >= 5)
+    reached_max = np.flatnonzero(cumulative_percentage >= 95)
+    if len(reached_min) == 0 or len(reached_max) == 0:
+        return None
+
+    return bins[reached_min[0]]['bin_min'], bins[reached_max[0]]['bin_max']
+
+
+def kde_curve(sorted_values, points, grid_size=1024):
+    """
+    Gaussian kernel density estimate (Silverman's bandwidth) sampled at evenly spaced points
+    from three bandwidths below the lowest vote to three above the highest. The votes are first
+    counted onto a fixed grid, so the cost does not depend on how many votes there are.
+    """
+    vote_count = len(sorted_values)
+    if vote_count == 0:
+        return []
+
+    q1, q3 = quantiles(sorted_values, [0.25, 0.75])
+    spread = min(sorted_values.std(), (q3 - q1) / 1.34) or sorted_values.std()
+    bandwidth = 0.9 * spread * vote_count ** (-1 / 5)
+    if not bandwidth:
+        # Every vote is identical: draw a narrow peak around the value
+        bandwidth = max(abs(sorted_values[0]), 1) * 1e-3
+
+    low, high = sorted_values[0] - 3 * bandwidth, sorted_values[-1] + 3 * bandwidth
+    grid_edges = np.linspace(sorted_values[0], sorted_values[-1], grid_size + 1)
+    grid_counts = np.diff(np.searchsorted(sorted_values, grid_edges[1:-1]), prepend=0, append=vote_count)
+    grid_centers = (grid_edges[:-1] + grid_edges[1:]) / 2
+
+    xs = np.linspace(low, high, points)
+    offsets = (xs[:, None] - grid_centers[None, :]) / bandwidth
+    densities = (np.exp(-0.5 * offsets ** 2) @ grid_counts) / (vote_count * bandwidth * np.sqrt(2 * np.pi))
+    return [{'value': x, 'density': density} for x, density in zip(xs.tolist(), densities.tolist())]
+
+
+def quantile_buckets(sorted_values, buckets):
+    """Bucket edges holding an equal share of the votes each: the 0, 1/buckets, ..., 1 quantiles."""
+    if len(sorted_values) == 0:
+        return []
+
+    qs = np.linspace(0, 1, buckets + 1)
+    return [{'quantile': q, 'value': value} for q, value in zip(qs.tolist(), quantiles(sorted_values, qs).tolist())]
+
+
+def summarize(values):
+    """Quartiles, bins and the 90% range of a set of votes from a single sort."""
+    sorted_values = sort_votes(values)
+    if len(sorted_values) == 0:
+        return VoteSummary(sorted_values, None, [], None)
+
+    q1, median, q3 = quantiles(sorted_values, [0.25, 0.5, 0.75]).tolist()
+    bins = freedman_diaconis_bins(sorted_values)
+    return VoteSummary(
+        sorted_values,
+        {'q1': q1, 'median': median, 'q3': q3},
+        bins,
+        ninety_percent_range(bins),
+    )
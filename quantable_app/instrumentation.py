@@ -0,0 +1,178 @@
+# quantable_app/instrumentation.py
+
+import contextvars
+import json
+import logging
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+metrics_logger = logging.getLogger('quantable_app.metrics')
+slow_query_logger = logging.getLogger('quantable_app.slow_queries')
+
+METRIC_FIELDS = ['latency_ms', 'query_count', 'query_ms', 'serializer_ms', 'stats_ms', 'response_bytes']
+PERCENTILES = [50, 90, 99]
+
+_current = contextvars.ContextVar('quantable_request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self, request):
+        self.request = request
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.timers = defaultdict(float)
+        self.running = set()
+
+    @property
+    def url_name(self):
+        resolver_match = getattr(self.request, 'resolver_match', None)
+        return (resolver_match.url_name if resolver_match else None) or 'unresolved'
+
+    def record_query(self, sql, duration):
+        self.query_count += 1
+        self.query_seconds += duration
+        slow_query_ms = getattr(settings, 'QUANTABLE_SLOW_QUERY_MS', None)
+        if slow_query_ms is not None and duration * 1000 >= slow_query_ms \
+                and random.random() < getattr(settings, 'QUANTABLE_SLOW_QUERY_SAMPLE_RATE', 1.0):
+            slow_query_logger.warning('Slow query (%.1f ms) in %s: %s', duration * 1000, self.url_name, sql)
+
+
+def _query_recorder(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, time.perf_counter() - start)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    connection_created receiver adding the query recorder to every new database connection. The
+    current request is found through a context variable, so queries are attributed correctly
+    from sync views and from async views whose queries run in a worker thread.
+    """
+    if _query_recorder not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_query_recorder)
+
+
+@contextmanager
+def timer(name):
+    """
+    Add the time spent in the block to the current request's `name` timer, if there is one.
+    Usable as a decorator; nested blocks of the same name are only counted once.
+    """
+    metrics = _current.get()
+    if metrics is None or name in metrics.running:
+        yield
+        return
+    metrics.running.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timers[name] += time.perf_counter() - start
+        metrics.running.discard(name)
+
+
+class MetricsRegistry:
+    """The most recent samples of every URL name handled by this process."""
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.samples = defaultdict(lambda: deque(maxlen=self.window))
+        self.lock = threading.Lock()
+
+    def record(self, sample):
+        with self.lock:
+            self.samples[sample['url_name']].append(sample)
+
+    def summary(self):
+        with self.lock:
+            samples = {url_name: list(url_samples) for url_name, url_samples in self.samples.items()}
+        return summarize(samples)
+
+
+def summarize(samples_by_url_name):
+    """{url_name: {'count': n, metric: {'p50': ..., 'p90': ..., 'p99': ..., 'max': ...}}}"""
+    summary = {}
+    for url_name, samples in sorted(samples_by_url_name.items()):
+        if not samples:
+            continue
+        url_summary = {'count': len(samples)}
+        for field in METRIC_FIELDS:
+            values = np.array([sample.get(field, 0) for sample in samples], dtype=float)
+            percentiles = np.percentile(values, PERCENTILES)
+            url_summary[field] = {
+                **{f'p{percentile}': round(float(value), 3) for percentile, value in zip(PERCENTILES, percentiles)},
+                'max': round(float(values.max()), 3),
+            }
+        summary[url_name] = url_summary
+    return summary
+
+
+registry = MetricsRegistry(window=getattr(settings, 'QUANTABLE_METRICS_WINDOW', 1000))
+
+
+class InstrumentationMiddleware:
+    """
+    Records each request's DB query count and time, serializer and stats time, latency and
+    response size, tagged by URL name. Samples are kept in `registry` for the metrics endpoint
+    and logged as JSON lines on the quantable_app.metrics logger for the request_metrics command.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics(request)
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(metrics, request, response, start)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics(request)
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(metrics, request, response, start)
+        return response
+
+    def record(self, metrics, request, response, start):
+        sample = {
+            'url_name': metrics.url_name,
+            'method': request.method,
+            'status': response.status_code,
+            'latency_ms': (time.perf_counter() - start) * 1000,
+            'query_count': metrics.query_count,
+            'query_ms': metrics.query_seconds * 1000,
+            'serializer_ms': metrics.timers['serializer'] * 1000,
+            'stats_ms': metrics.timers['stats'] * 1000,
+            'response_bytes': 0 if response.streaming else len(response.content),
+        }
+        registry.record(sample)
+        if metrics_logger.isEnabledFor(logging.INFO):
+            metrics_logger.info(json.dumps(sample))
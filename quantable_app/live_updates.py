@@ -0,0 +1,239 @@
+# quantable_app/live_updates.py
+
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+from . import response_cache
+from .enums import Category
+from .unit_conversions import convert_stats, convert_bins
+
+# Live statistics for subscribed quantables. response_cache.invalidate() publishes every change to
+# the broker, which wakes the subscriptions of this process; each subscription then sends at most
+# one event per interval with only the fields that changed since its previous event.
+
+STAT_FIELDS = [
+    'vote_count', 'vote_average', 'vote_median', 'vote_stddev', 'vote_q1', 'vote_q3',
+    'vote_iqr', 'vote_min', 'vote_max', 'vote_skewness',
+]
+
+
+class Subscription:
+    def __init__(self, quantable_ids):
+        self.quantable_ids = set(quantable_ids)
+        self.loop = asyncio.get_running_loop()
+        self.changed = set()
+        self.event = asyncio.Event()
+
+    def notify(self, quantable_ids):
+        # Called from any thread; the subscription's state is only touched on its own loop
+        try:
+            self.loop.call_soon_threadsafe(self._mark, quantable_ids)
+        except RuntimeError:
+            # The loop has closed, and the stream with it
+            pass
+
+    def _mark(self, quantable_ids):
+        self.changed.update(self.quantable_ids.intersection(quantable_ids))
+        if self.changed:
+            self.event.set()
+
+    async def wait(self, timeout):
+        """The ids changed since the last call, or an empty set if none changed within `timeout` seconds."""
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.event.clear()
+        changed, self.changed = self.changed, set()
+        return changed
+
+
+class LocalBroker:
+    """Fans changes out to the subscriptions of this process only."""
+
+    def __init__(self):
+        self.subscriptions = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def subscribe(self, quantable_ids):
+        subscription = Subscription(quantable_ids)
+        with self.lock:
+            for quantable_id in subscription.quantable_ids:
+                self.subscriptions[quantable_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for quantable_id in subscription.quantable_ids:
+                subscribers = self.subscriptions.get(quantable_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self.subscriptions[quantable_id]
+
+    def publish(self, quantable_ids):
+        with self.lock:
+            targets = {
+                subscription for quantable_id in quantable_ids
+                for subscription in self.subscriptions.get(quantable_id, ())
+            }
+        for subscription in targets:
+            subscription.notify(quantable_ids)
+
+
+class CachePollingBroker(LocalBroker):
+    """
+    For more than one worker process: also polls the response cache generations of the subscribed
+    quantables every QUANTABLE_LIVE_UPDATES_POLL_SECONDS, so changes made by other processes (or the
+    refresh_vote_stats worker) reach this one's subscribers. Needs a cache shared by the processes.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.pollers = {}
+
+    def subscribe(self, quantable_ids):
+        subscription = super().subscribe(quantable_ids)
+        poller = self.pollers.get(subscription.loop)
+        if poller is None or poller.done():
+            self.pollers[subscription.loop] = subscription.loop.create_task(self.poll(subscription.loop))
+        return subscription
+
+    async def poll(self, loop):
+        interval = getattr(settings, 'QUANTABLE_LIVE_UPDATES_POLL_SECONDS', 1.0)
+        seen = {}
+        while True:
+            await asyncio.sleep(interval)
+            with self.lock:
+                quantable_ids = [
+                    quantable_id for quantable_id, subscribers in self.subscriptions.items()
+                    if any(subscription.loop is loop for subscription in subscribers)
+                ]
+            if not quantable_ids:
+                self.pollers.pop(loop, None)
+                return
+
+            keys = {response_cache.generation_key(quantable_id): quantable_id for quantable_id in quantable_ids}
+            generations = {keys[key]: generation for key, generation in (await cache.aget_many(keys)).items()}
+            changed = [
+                quantable_id for quantable_id in quantable_ids
+                if quantable_id in seen and generations.get(quantable_id) != seen[quantable_id]
+            ]
+            seen = generations
+            if changed:
+                LocalBroker.publish(self, changed)
+
+
+BROKERS = {
+    'local': LocalBroker,
+    'cache': CachePollingBroker,
+}
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                backend = getattr(settings, 'QUANTABLE_LIVE_UPDATES_BACKEND', 'local')
+                _broker = (BROKERS[backend] if backend in BROKERS else import_string(backend))()
+    return _broker
+
+
+def publish(quantable_ids):
+    # Nothing to do until something has subscribed in this process
+    if _broker is not None:
+        _broker.publish(list(quantable_ids))
+
+
+def _build_snapshot(quantable_id):
+    from .models import Quantable  # Import here to avoid circular import
+    quantable = Quantable.objects.select_related('histogram').filter(id=quantable_id).first()
+    if quantable is None:
+        return {'deleted': True}
+    snapshot = {field: getattr(quantable, field) for field in STAT_FIELDS}
+    snapshot['freedman_diaconis_bins'] = quantable.freedman_diaconis_bins()
+    return snapshot
+
+
+def get_snapshot(quantable):
+    """The quantable's current stats and bins in its default unit, built once per change and shared."""
+    return response_cache.get_or_build('live', [quantable.id], quantable.default_unit,
+                                       lambda: _build_snapshot(quantable.id))
+
+
+def snapshot_in_unit(quantable, snapshot, unit):
+    snapshot = dict(snapshot)
+    if 'freedman_diaconis_bins' in snapshot:
+        snapshot['freedman_diaconis_bins'] = [dict(bin_data) for bin_data in snapshot['freedman_diaconis_bins']]
+    if unit != quantable.default_unit and not snapshot.get('deleted'):
+        category = Category(quantable.category)
+        convert_stats(category, snapshot, quantable.default_unit, unit)
+        convert_bins(category, snapshot['freedman_diaconis_bins'], quantable.default_unit, unit)
+    return snapshot
+
+
+def delta(previous, current):
+    """The fields of `current` that differ from `previous` (everything when there is no previous)."""
+    if previous is None:
+        return current
+    return {field: value for field, value in current.items() if previous.get(field) != value}
+
+
+async def stream(quantables, units):
+    """
+    Server-sent events for the given quantables in the given units ({quantable id: unit}): a full
+    snapshot first, then deltas as they change, at most one event per QUANTABLE_LIVE_UPDATES_INTERVAL
+    seconds, with a comment line every QUANTABLE_LIVE_UPDATES_KEEPALIVE_SECONDS to keep proxies open.
+    """
+    interval = getattr(settings, 'QUANTABLE_LIVE_UPDATES_INTERVAL', 1.0)
+    keepalive = getattr(settings, 'QUANTABLE_LIVE_UPDATES_KEEPALIVE_SECONDS', 15.0)
+    quantables = {quantable.id: quantable for quantable in quantables}
+    broker = get_broker()
+    subscription = broker.subscribe(quantables)
+    sent = {}
+    event_id = 0
+
+    async def changes(quantable_ids):
+        snapshots = await sync_to_async(lambda: {
+            quantable_id: snapshot_in_unit(
+                quantables[quantable_id], get_snapshot(quantables[quantable_id]), units[quantable_id]
+            ) for quantable_id in quantable_ids
+        })()
+        changed = {}
+        for quantable_id, snapshot in snapshots.items():
+            quantable_delta = delta(sent.get(quantable_id), snapshot)
+            if quantable_delta:
+                changed[quantable_id] = quantable_delta
+                sent[quantable_id] = snapshot
+        return changed
+
+    try:
+        yield f'retry: {int(interval * 3000)}\n\n'
+        changed = await changes(sorted(quantables))
+        while True:
+            if changed:
+                event_id += 1
+                data = json.dumps(changed, separators=(',', ':'), ensure_ascii=False)
+                yield f'id: {event_id}\nevent: stats\ndata: {data}\n\n'
+                # Whatever changes meanwhile is coalesced into the next event
+                await asyncio.sleep(interval)
+
+            changed_ids = await subscription.wait(keepalive)
+            if not changed_ids:
+                yield ': keepalive\n\n'
+                changed = None
+                continue
+            changed = await changes(sorted(changed_ids))
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,218 @@
+# quantable_app/management/commands/benchmark_api.py
+import json
+import platform
+import random
+import subprocess
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import django
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from quantable_app.models import Quantable, QuantablePair
+
+ENDPOINTS = ['list', 'detail', 'pair', 'vote_create']
+
+
+class Command(BaseCommand):
+    help = ("Measures throughput and p50/p90/p99 latency of the list, detail, pair and vote-create endpoints, "
+            "in process with the test client or against a running server, and writes the results as JSON. "
+            "Use a dedicated database: --seed-data and vote_create write to it.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed-data', action='store_true',
+                            help='Seed the database with create_fake_users and load_sample_data first')
+        parser.add_argument('--users', type=int, default=1000, help='Fake users to create when seeding')
+        parser.add_argument('--quantables', type=int, default=100, help='Quantables to load when seeding')
+        parser.add_argument('--votes-per-quantable', type=int, default=100,
+                            help='Votes per quantable when seeding (at most one per user)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the data and the request mix')
+        parser.add_argument('--requests', type=int, default=200, help='Measured requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per endpoint first')
+        parser.add_argument('--endpoint', action='append', choices=ENDPOINTS, help='Only run these endpoints')
+        parser.add_argument('--cold-cache', action='store_true', help='Clear the response cache before every request')
+        parser.add_argument('--server', help='Base URL of a running server (e.g. http://127.0.0.1:8000) '
+                                             'instead of the in-process test client')
+        parser.add_argument('--concurrency', type=int, default=1, help='Concurrent requests (with --server only)')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='Compare against the results in this JSON file')
+        parser.add_argument('--tolerance', type=float, default=0.10,
+                            help='Relative slowdown in p50/p99/throughput reported as a regression')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Exit with an error if --compare finds a regression')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] > 1 and not options['server']:
+            raise CommandError('--concurrency needs --server; the test client runs requests one at a time.')
+
+        if options['seed_data']:
+            self.seed_data(options)
+
+        quantable_ids = list(Quantable.objects.values_list('id', flat=True))
+        pair_ids = list(QuantablePair.objects.values_list('pair_id', flat=True))
+        users = list(User.objects.order_by('id')[:100])
+        if not quantable_ids or not users:
+            raise CommandError('No data to benchmark. Run with --seed-data, or load some with load_sample_data first.')
+
+        rng = random.Random(options['seed'])
+        request_factories = {
+            'list': lambda: ('GET', reverse('quantable_list') + '?sort=' + rng.choice(['newest', 'oldest', 'total_votes']), None),
+            'detail': lambda: ('GET', reverse('quantable_detail', args=[rng.choice(quantable_ids)]), None),
+            'pair': lambda: ('GET', reverse('quantable_pair_detail', args=[rng.choice(pair_ids)]), None),
+            'vote_create': lambda: ('POST', reverse('create_vote'), {
+                'quantable': rng.choice(quantable_ids), 'value': round(rng.uniform(1, 1000), 2),
+            }),
+        }
+        endpoints = options['endpoint'] or ENDPOINTS
+        if not pair_ids and 'pair' in endpoints:
+            endpoints = [endpoint for endpoint in endpoints if endpoint != 'pair']
+            self.stdout.write(self.style.WARNING('No quantable pairs; skipping the pair endpoint.'))
+
+        send = self.server_sender(options['server'], users) if options['server'] else self.client_sender()
+
+        results = {}
+        for endpoint in endpoints:
+            make_request = request_factories[endpoint]
+            for _ in range(options['warmup']):
+                send(*make_request(), user=rng.choice(users))
+            requests = [(make_request(), rng.choice(users)) for _ in range(options['requests'])]
+            results[endpoint] = self.run(send, requests, options)
+            self.report(endpoint, results[endpoint])
+
+        output = {'meta': self.meta(options, len(quantable_ids)), 'results': results}
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(output, output_file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+        if options['compare']:
+            self.compare(output, options)
+
+    def seed_data(self, options):
+        self.stdout.write('Seeding the database...')
+        start = time.perf_counter()
+        call_command('create_fake_users', options['users'], seed=options['seed'], bulk=True, fast_hash=True,
+                     stdout=self.stdout)
+        call_command('load_sample_data', quantables=options['quantables'], seed=options['seed'], bulk=True,
+                     min_votes=options['votes_per_quantable'], max_votes=options['votes_per_quantable'],
+                     stdout=self.stdout)
+        self.stdout.write(f'Seeded in {time.perf_counter() - start:.1f}s')
+
+    def client_sender(self):
+        # The default settings only allow local host names
+        client = APIClient(HTTP_HOST='localhost')
+
+        def send(method, url, data, user):
+            client.force_authenticate(user=user)
+            if method == 'GET':
+                return client.get(url).status_code
+            return client.post(url, data, format='json').status_code
+        return send
+
+    def server_sender(self, server, users):
+        tokens = {user.id: Token.objects.get_or_create(user=user)[0].key for user in users}
+
+        def send(method, url, data, user):
+            request = urllib.request.Request(
+                server.rstrip('/') + url, method=method,
+                data=json.dumps(data).encode() if data is not None else None,
+                headers={'Authorization': f'Token {tokens[user.id]}', 'Content-Type': 'application/json'},
+            )
+            try:
+                with urllib.request.urlopen(request) as response:
+                    response.read()
+                    return response.status
+            except urllib.error.HTTPError as e:
+                return e.code
+        return send
+
+    def run(self, send, requests, options):
+        def timed(request):
+            (method, url, data), user = request
+            if options['cold_cache']:
+                cache.clear()
+            start = time.perf_counter()
+            status = send(method, url, data, user=user)
+            return time.perf_counter() - start, status
+
+        start = time.perf_counter()
+        if options['concurrency'] > 1:
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+                timings = list(executor.map(timed, requests))
+        else:
+            timings = [timed(request) for request in requests]
+        elapsed = time.perf_counter() - start
+
+        latencies = np.array([latency for latency, _ in timings]) * 1000
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+        return {
+            'requests': len(timings),
+            'errors': sum(1 for _, status in timings if status >= 400),
+            'throughput_rps': round(len(timings) / elapsed, 2),
+            'latency_ms': {
+                'mean': round(float(latencies.mean()), 3),
+                'p50': round(float(p50), 3),
+                'p90': round(float(p90), 3),
+                'p99': round(float(p99), 3),
+                'max': round(float(latencies.max()), 3),
+            },
+        }
+
+    def report(self, endpoint, result):
+        latency = result['latency_ms']
+        line = (f"{endpoint:<12} {result['throughput_rps']:>9.1f} req/s  p50 {latency['p50']:>8.2f} ms  "
+                f"p99 {latency['p99']:>8.2f} ms  errors {result['errors']}")
+        self.stdout.write(self.style.WARNING(line) if result['errors'] else line)
+
+    def meta(self, options, quantable_count):
+        try:
+            commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip()
+        except OSError:
+            commit = ''
+        return {
+            'commit': commit or None,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'database': connection.vendor,
+            'mode': 'server' if options['server'] else 'client',
+            'concurrency': options['concurrency'],
+            'cold_cache': options['cold_cache'],
+            'seed': options['seed'],
+            'users': User.objects.count(),
+            'quantables': quantable_count,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        }
+
+    def compare(self, output, options):
+        with open(options['compare']) as baseline_file:
+            baseline = json.load(baseline_file)
+        tolerance = options['tolerance']
+        regressions = []
+
+        self.stdout.write(f"Compared with {options['compare']} (commit {baseline['meta'].get('commit')}):")
+        for endpoint, result in output['results'].items():
+            previous = baseline['results'].get(endpoint)
+            if previous is None:
+                continue
+            changes = {
+                'p50': result['latency_ms']['p50'] / previous['latency_ms']['p50'] - 1,
+                'p99': result['latency_ms']['p99'] / previous['latency_ms']['p99'] - 1,
+                # Lower throughput is the slowdown here
+                'throughput': previous['throughput_rps'] / result['throughput_rps'] - 1,
+            }
+            regressed = [name for name, change in changes.items() if change > tolerance]
+            line = f'{endpoint:<12} ' + '  '.join(f'{name} {change:+.1%}' for name, change in changes.items())
+            self.stdout.write(self.style.ERROR(line) if regressed else line)
+            regressions.extend(f'{endpoint} {name}' for name in regressed)
+
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f"Regressions beyond {tolerance:.0%}: {', '.join(regressions)}")
@@ -0,0 +1,51 @@
+# quantable_app/management/commands/benchmark_serializers.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from quantable_app.models import Quantable
+from quantable_app.serializers import QuantableSerializer, QuantableRowSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compares rows per second of QuantableSerializer and the QuantableRowSerializer fast path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=1000, help='Number of quantables to serialize')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per serializer; the best is reported')
+
+    def handle(self, *args, **options):
+        quantables = list(Quantable.objects.order_by('id')[:options['limit']])
+        if not quantables:
+            raise CommandError('No quantables to serialize. Load some with load_sample_data first.')
+        value_rows = list(Quantable.objects.order_by('id')[:options['limit']].values_list(
+            *QuantableRowSerializer.QUERY_FIELDS
+        ))
+
+        fast = QuantableRowSerializer(include_vote_values=False)
+        candidates = [
+            ('QuantableSerializer', lambda: QuantableSerializer(
+                quantables, many=True, context={'include_vote_values': False}
+            ).data),
+            ('QuantableRowSerializer (instances)', lambda: fast.from_instances(quantables)),
+            ('QuantableRowSerializer (value tuples)', lambda: fast.serialize(value_rows)),
+        ]
+
+        renderer = JSONRenderer()
+        expected = None
+        for name, serialize in candidates:
+            best = float('inf')
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                data = serialize()
+                best = min(best, time.perf_counter() - start)
+
+            rendered = renderer.render(data)
+            if expected is None:
+                expected = rendered
+            elif rendered != expected:
+                raise CommandError(f'{name} output differs from QuantableSerializer')
+
+            self.stdout.write(f'{name}: {len(quantables) / best:,.0f} rows/s')
+
+        self.stdout.write(self.style.SUCCESS('All serializers rendered byte-identical JSON.'))
@@ -0,0 +1,45 @@
+# quantable_app/management/commands/compact_votes.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from quantable_app.models import Quantable, PackedVotes
+from quantable_app.vote_storage import get_storage
+
+
+class Command(BaseCommand):
+    help = ("Moves the Vote rows of quantables into packed float32 storage, one row per quantable "
+            "(QUANTABLE_VOTE_STORAGE = 'packed'; see quantable_app/vote_storage.py for the precision kept), "
+            "or back into Vote rows with --expand")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quantable', type=int, action='append', help='Only these quantables')
+        parser.add_argument('--min-rows', type=int, default=1000,
+                            help='Only compact quantables with at least this many Vote rows')
+        parser.add_argument('--drop-deleted-users', action='store_true',
+                            help='Also remove the packed votes of users that have been deleted')
+        parser.add_argument('--expand', action='store_true',
+                            help='Move packed votes back into Vote rows, e.g. before switching to row storage')
+
+    def handle(self, *args, **options):
+        if options['expand']:
+            queryset = Quantable.objects.filter(packed_votes__isnull=False)
+        else:
+            if not get_storage().packed:
+                raise CommandError("Packed votes are only read with QUANTABLE_VOTE_STORAGE = 'packed'.")
+            queryset = Quantable.objects.annotate(rows=Count('vote')).filter(rows__gte=options['min_rows'])
+        if options['quantable']:
+            queryset = queryset.filter(id__in=options['quantable'])
+        quantables = list(queryset.order_by('id'))
+
+        moved = 0
+        for index, quantable in enumerate(quantables, start=1):
+            if options['expand']:
+                moved += PackedVotes.expand(quantable)
+            else:
+                moved += PackedVotes.compact(quantable, drop_deleted_users=options['drop_deleted_users'])
+            if index % 100 == 0:
+                self.stdout.write(f'Processed {index}/{len(quantables)} quantables')
+
+        action = 'expanded' if options['expand'] else 'compacted'
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully {action} {moved} votes of {len(quantables)} quantables.'
+        ))
@@ -0,0 +1,103 @@
+# quantable_app/management/commands/explain_queries.py
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve, reverse
+from rest_framework.test import APIRequestFactory, force_authenticate
+from quantable_app.models import Quantable, QuantablePair
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ("Runs each read endpoint once, EXPLAINs every SELECT it issues and reports sequential scans. "
+            "On PostgreSQL sequential scans are disabled while planning, so any that remain have no usable index.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username to make the requests as (anonymous by default)')
+        parser.add_argument('--fail-on-seqscan', action='store_true',
+                            help='Exit with an error if any sequential scan is found')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every query plan')
+
+    def handle(self, *args, **options):
+        quantable = Quantable.objects.order_by('id').first()
+        pair = QuantablePair.objects.order_by('id').first()
+        if quantable is None:
+            raise CommandError('No quantables to explain. Load some with load_sample_data first.')
+        user = User.objects.get(username=options['user']) if options['user'] else None
+
+        endpoints = [
+            reverse('quantable_list') + '?sort=newest',
+            reverse('quantable_list') + '?sort=oldest',
+            reverse('quantable_list') + '?sort=total_votes',
+            reverse('quantable_detail', args=[quantable.id]),
+            reverse('quantable_distribution', args=[quantable.id]),
+            reverse('quantable_vote_values', args=[quantable.id]),
+        ]
+        if pair is not None:
+            endpoints.append(reverse('quantable_pair_detail', args=[pair.pair_id]))
+
+        # Cached payloads would hide the queries that build them. The requests get a dummy cache rather than
+        # invalidating the configured one, which would throw away the payloads served in production.
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            seq_scan_total = self.explain_endpoints(endpoints, user, options)
+
+        if seq_scan_total and options['fail_on_seqscan']:
+            raise CommandError(f'{seq_scan_total} sequential scans found.')
+        self.stdout.write(self.style.SUCCESS(f'Explained {len(endpoints)} endpoints, {seq_scan_total} sequential scans.'))
+
+    def explain_endpoints(self, endpoints, user, options):
+        factory = APIRequestFactory()
+        seq_scan_total = 0
+        for url in endpoints:
+            request = factory.get(url)
+            if user is not None:
+                force_authenticate(request, user=user)
+            match = resolve(url.split('?')[0])
+
+            with CaptureQueriesContext(connection) as context:
+                response = match.func(request, *match.args, **match.kwargs)
+                response.render()
+
+            selects = [query['sql'] for query in context.captured_queries
+                       if query['sql'].lstrip().upper().startswith(('SELECT', 'WITH'))]
+            self.stdout.write(f'{url} -> {response.status_code}, {len(selects)} SELECT queries')
+
+            for sql in selects:
+                plan, seq_scans = self.explain(sql)
+                if options['verbose_plans']:
+                    self.stdout.write(f'  {sql}\n    {plan}')
+                for table in seq_scans:
+                    seq_scan_total += 1
+                    self.stdout.write(self.style.WARNING(f'  sequential scan on {table}: {sql[:160]}'))
+        return seq_scan_total
+
+    def explain(self, sql):
+        with transaction.atomic(), connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                return plan, list(self._postgresql_seq_scans(plan[0]['Plan']))
+
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                details = [row[-1] for row in cursor.fetchall()]
+                # 'SCAN table' without an index is a full table scan; 'SEARCH' and 'SCAN ... USING INDEX' are not
+                seq_scans = [detail.split()[1] for detail in details
+                             if detail.startswith('SCAN') and 'USING' not in detail and len(detail.split()) > 1]
+                return details, seq_scans
+
+            cursor.execute(f'EXPLAIN {sql}')
+            return cursor.fetchall(), []
+
+    def _postgresql_seq_scans(self, node):
+        if node.get('Node Type') == 'Seq Scan':
+            yield node.get('Relation Name')
+        for child in node.get('Plans', []):
+            yield from self._postgresql_seq_scans(child)
@@ -0,0 +1,54 @@
+# quantable_app/management/commands/import_votes.py
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from quantable_app.vote_ingest import ingest_votes
+
+
+class Command(BaseCommand):
+    help = 'Imports votes from a CSV file with quantable, user, value and optional unit columns'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file to import, or '-' to read from stdin")
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Number of rows upserted, and quantables recomputed, per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        path = options['path']
+        csv_file = sys.stdin if path == '-' else open(path, newline='')
+
+        vote_total = 0
+        try:
+            batch = []
+            for line_number, row in enumerate(csv.DictReader(csv_file), start=2):
+                try:
+                    batch.append({
+                        'quantable': int(row['quantable']),
+                        'user': int(row['user']),
+                        'value': float(row['value']),
+                        'unit': row.get('unit'),
+                    })
+                except (KeyError, TypeError, ValueError):
+                    raise CommandError(f'Invalid row on line {line_number}: {row}')
+
+                if len(batch) == batch_size:
+                    vote_total += self.import_batch(batch)
+                    batch = []
+
+            if batch:
+                vote_total += self.import_batch(batch)
+        finally:
+            if csv_file is not sys.stdin:
+                csv_file.close()
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully imported {vote_total} votes.'))
+
+    def import_batch(self, batch):
+        try:
+            vote_count, quantable_count = ingest_votes(batch)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(f'Imported {vote_count} votes across {quantable_count} quantables')
+        return vote_count
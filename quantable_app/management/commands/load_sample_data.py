@@ -3,13 +3,37 @@ import random
 import numpy as np
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
-from quantable_app.models import Quantable, Vote
+from django.db import transaction
+from quantable_app.models import Quantable, Vote, PackedVotes
 
 
 class Command(BaseCommand):
     help = 'Loads sample data and generates realistic votes'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--quantables', type=int, default=None,
+                            help='Number of quantables to load; the samples are repeated with numbered questions '
+                                 'and pair ids beyond the first 8')
+        parser.add_argument('--min-votes', type=int, default=50, help='Minimum number of votes per quantable')
+        parser.add_argument('--max-votes', type=int, default=100,
+                            help='Maximum number of votes per quantable (at most one per user)')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed, for reproducible data')
+        parser.add_argument('--bulk', action='store_true',
+                            help='Generate each quantable\'s votes with NumPy, insert them with bulk_create and '
+                                 'compute every quantable\'s stats once at the end, instead of per vote')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Votes per insert with --bulk')
+
     def handle(self, *args, **options):
+        if options['bulk']:
+            with transaction.atomic():
+                self.load(options)
+        else:
+            self.load(options)
+
+    def load(self, options):
+        rng = random.Random(options['seed'])
+        np_rng = np.random.default_rng(options['seed'])
+
         # Load sample quantables
         quantables = [
             {
@@ -86,16 +110,28 @@ class Command(BaseCommand):
             }
         ]
 
-        for quantable_data in quantables:
+        num_quantables = options['quantables'] if options['quantables'] is not None else len(quantables)
+        users = list(User.objects.order_by('id'))
+        user_ids = np.array([user.id for user in users])
+        loaded = []
+        pending_votes = []
+
+        for index in range(num_quantables):
+            quantable_data = dict(quantables[index % len(quantables)])
+            copy = index // len(quantables)
+            if copy:
+                quantable_data['question'] = f"{quantable_data['question']} (#{copy + 1})"
+                if quantable_data['pair_id']:
+                    quantable_data['pair_id'] = f"{quantable_data['pair_id']}_{copy + 1}"
             quantable, created = Quantable.objects.get_or_create(**quantable_data)
 
             # Delete existing votes for the quantable
             Vote.objects.filter(quantable=quantable).delete()
+            PackedVotes.objects.filter(quantable=quantable).delete()
 
             # Generate realistic votes for the quantable
-            num_votes = random.randint(50, 100)  # Random number of votes between 50 and 100
-            users = list(User.objects.all())
-            random.shuffle(users)  # Shuffle the users randomly
+            num_votes = rng.randint(options['min_votes'], options['max_votes'])
+            rng.shuffle(users)  # Shuffle the users randomly
 
             if quantable.category == 'currency':
                 if quantable.is_min:
@@ -115,8 +151,29 @@ class Command(BaseCommand):
                 vote_mean = 40
                 vote_stddev = 10
 
+            if options['bulk']:
+                voters = np_rng.choice(user_ids, size=min(num_votes, len(user_ids)), replace=False)
+                values = np_rng.normal(vote_mean, vote_stddev, size=len(voters))
+                pending_votes.extend(
+                    Vote(quantable_id=quantable.id, user_id=user_id, value=value)
+                    for user_id, value in zip(voters.tolist(), values.tolist())
+                )
+                if len(pending_votes) >= options['batch_size']:
+                    Vote.objects.bulk_create(pending_votes, batch_size=options['batch_size'])
+                    pending_votes = []
+                loaded.append(quantable)
+                continue
+
             for user in users[:num_votes]:
-                value = np.random.normal(vote_mean, vote_stddev)
+                value = np_rng.normal(vote_mean, vote_stddev)
                 Vote.objects.create(quantable=quantable, user=user, value=value)
 
-        self.stdout.write(self.style.SUCCESS('Successfully loaded sample data and generated realistic votes.'))
\ No newline at end of file
+        if options['bulk']:
+            Vote.objects.bulk_create(pending_votes, batch_size=options['batch_size'])
+            # bulk_create skips Vote.save, so the stats are computed here, once per quantable
+            for start in range(0, len(loaded), 100):
+                Quantable.refresh_vote_data_markers(loaded[start:start + 100])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully loaded {num_quantables} quantables with sample data and generated realistic votes.'
+        ))
\ No newline at end of file
@@ -0,0 +1,39 @@
+# quantable_app/management/commands/rebuild_histograms.py
+from django.core.management.base import BaseCommand
+from quantable_app.models import Quantable, QuantableHistogram
+from quantable_app.vote_aggregates import histogram_fields
+from quantable_app.vote_storage import get_storage
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the stored Freedman-Diaconis histogram of every quantable from its votes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Number of quantables whose votes are loaded and written per batch')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        quantable_ids = list(Quantable.objects.order_by('id').values_list('id', flat=True))
+        existing = dict(QuantableHistogram.objects.values_list('quantable_id', 'id'))
+
+        for start in range(0, len(quantable_ids), chunk_size):
+            chunk_ids = quantable_ids[start:start + chunk_size]
+
+            vote_values = get_storage().vote_values(chunk_ids)
+
+            to_create, to_update = [], []
+            for quantable_id in chunk_ids:
+                fields = histogram_fields(vote_values[quantable_id])
+                histogram = QuantableHistogram(id=existing.get(quantable_id), quantable_id=quantable_id, **fields)
+                if histogram.id:
+                    to_update.append(histogram)
+                else:
+                    to_create.append(histogram)
+
+            QuantableHistogram.objects.bulk_create(to_create)
+            QuantableHistogram.objects.bulk_update(to_update, QuantableHistogram.LAYOUT_FIELDS)
+
+            self.stdout.write(f'Rebuilt {start + len(chunk_ids)}/{len(quantable_ids)} histograms')
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt {len(quantable_ids)} histograms.'))
@@ -0,0 +1,48 @@
+# quantable_app/management/commands/refresh_vote_stats.py
+import time
+
+from django.core.management.base import BaseCommand
+from quantable_app.models import Quantable, DirtyQuantable
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the vote stats of quantables queued by votes cast in deferred refresh mode'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to wait between passes over the queue')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of queued quantables recomputed together')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the queue a single time and exit')
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        batch_size = options['batch_size']
+
+        try:
+            while True:
+                refreshed = self.drain(batch_size)
+                if refreshed:
+                    self.stdout.write(f'Refreshed {refreshed} quantables')
+                if options['once']:
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS('Vote stats refresh stopped.'))
+
+    def drain(self, batch_size):
+        refreshed = 0
+        while True:
+            quantable_ids = DirtyQuantable.claim(limit=batch_size)
+            if not quantable_ids:
+                return refreshed
+            try:
+                Quantable.refresh_vote_data_markers(Quantable.objects.filter(id__in=quantable_ids))
+            except Exception:
+                # Put the batch back so its votes are not lost
+                DirtyQuantable.mark(quantable_ids)
+                raise
+            refreshed += len(quantable_ids)
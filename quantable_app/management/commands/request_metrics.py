@@ -0,0 +1,49 @@
+# quantable_app/management/commands/request_metrics.py
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from quantable_app.instrumentation import METRIC_FIELDS, summarize
+
+
+class Command(BaseCommand):
+    help = ("Summarizes the per-request metrics log written by InstrumentationMiddleware into "
+            "p50/p90/p99/max per URL name, across every process that wrote to it")
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*',
+                            help='Metrics log files (QUANTABLE_METRICS_LOG_FILE by default); include rotated files to cover more')
+        parser.add_argument('--url-name', action='append', help='Only summarize these URL names')
+        parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or [getattr(settings, 'QUANTABLE_METRICS_LOG_FILE', 'request_metrics.log')]
+
+        samples = defaultdict(list)
+        for path in paths:
+            try:
+                with open(path) as log_file:
+                    for line in log_file:
+                        try:
+                            sample = json.loads(line)
+                        except ValueError:
+                            continue
+                        if not options['url_name'] or sample.get('url_name') in options['url_name']:
+                            samples[sample.get('url_name', 'unresolved')].append(sample)
+            except FileNotFoundError:
+                raise CommandError(f'No metrics log at {path}.')
+
+        summary = summarize(samples)
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+        if not summary:
+            self.stdout.write('No requests recorded.')
+            return
+
+        for url_name, url_summary in summary.items():
+            self.stdout.write(self.style.SUCCESS(f"{url_name} ({url_summary['count']} requests)"))
+            for field in METRIC_FIELDS:
+                stats = url_summary[field]
+                self.stdout.write(f'  {field:<15}' + '  '.join(f'{name} {value:>10.2f}' for name, value in stats.items()))
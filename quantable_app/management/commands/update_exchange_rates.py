@@ -0,0 +1,42 @@
+# quantable_app/management/commands/update_exchange_rates.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from quantable_app import exchange_rates
+from quantable_app.models import ExchangeRateSnapshot
+
+
+class Command(BaseCommand):
+    help = ('Records a new exchange rate snapshot for the configured file or database rate provider '
+            'from a JSON file of units per USD, e.g. {"USD": 1.0, "EUR": 0.92, ...}')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help='JSON file with the new rates')
+        parser.add_argument('--source', default='', help='Where the rates came from')
+        parser.add_argument('--list', action='store_true', help='List the recorded database snapshots')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for snapshot in ExchangeRateSnapshot.objects.order_by('-id'):
+                self.stdout.write(f'db:{snapshot.id}  {snapshot.created_at:%Y-%m-%d %H:%M}  {snapshot.source}')
+            return
+
+        if not options['path']:
+            raise CommandError('A JSON file of rates is required.')
+        provider = exchange_rates.get_provider()
+        if not hasattr(provider, 'write'):
+            raise CommandError('The configured exchange rate provider cannot be updated; '
+                               "set QUANTABLE_EXCHANGE_RATE_PROVIDER to 'file' or 'database'.")
+
+        with open(options['path']) as rate_file:
+            data = json.load(rate_file)
+        rates = data.get('rates', data)
+
+        try:
+            provider.write(rates, version=timezone.now().strftime('%Y%m%d%H%M%S'), source=options['source'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        exchange_rates.reset()
+        self.stdout.write(self.style.SUCCESS(f'Exchange rates updated to {exchange_rates.current_snapshot().version}.'))
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.9 on 2026-10-18 11:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quantable_app', '0005_quantable_is_min_quantable_pair_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuantableStatsState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0)),
+                ('mean', models.FloatField(default=0.0)),
+                ('m2', models.FloatField(default=0.0)),
+                ('m3', models.FloatField(default=0.0)),
+                ('minimum', models.FloatField(null=True)),
+                ('maximum', models.FloatField(null=True)),
+                ('sketch', models.JSONField(default=dict)),
+                ('quantable', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats_state', to='quantable_app.quantable')),
+            ],
+        ),
+    ]
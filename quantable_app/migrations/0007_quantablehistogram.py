@@ -0,0 +1,25 @@
+# Generated by Django 4.2.9 on 2026-10-18 11:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quantable_app', '0006_quantablestatsstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuantableHistogram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origin', models.FloatField(null=True)),
+                ('bin_width', models.FloatField(null=True)),
+                ('counts', models.JSONField(default=list)),
+                ('total', models.IntegerField(default=0)),
+                ('quantable', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='histogram', to='quantable_app.quantable')),
+            ],
+        ),
+    ]
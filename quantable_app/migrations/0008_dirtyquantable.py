@@ -0,0 +1,21 @@
+# Generated by Django 4.2.9 on 2026-10-18 12:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quantable_app', '0007_quantablehistogram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyQuantable',
+            fields=[
+                ('quantable', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='quantable_app.quantable')),
+                ('marked_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.9 on 2026-10-18 12:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def delete_blank_quantable_preferences(apps, schema_editor):
+    # Left behind by the detail view, which used to create an empty preference on every read
+    UserQuantablePreference = apps.get_model('quantable_app', 'UserQuantablePreference')
+    UserQuantablePreference.objects.filter(preferred_unit='').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quantable_app', '0008_dirtyquantable'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCategoryUnitPreference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('size', 'SIZE'), ('volume', 'VOLUME'), ('weight', 'WEIGHT'), ('currency', 'CURRENCY'), ('length', 'LENGTH'), ('area', 'AREA'), ('temperature', 'TEMPERATURE'), ('time', 'TIME'), ('speed', 'SPEED'), ('number', 'NUMBER')], max_length=20)),
+                ('preferred_unit', models.CharField(max_length=20)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'category')},
+            },
+        ),
+        migrations.RunPython(delete_blank_quantable_preferences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.9 on 2026-10-18 12:20
+
+from django.db import migrations
+
+VOTE_STAT_FIELDS = [
+    'vote_average', 'vote_median', 'vote_stddev', 'vote_q1', 'vote_q3',
+    'vote_iqr', 'vote_min', 'vote_max', 'vote_skewness',
+]
+
+
+def clear_non_finite_vote_stats(apps, schema_editor):
+    # Stats are never NaN or infinite any more, so serializers no longer check every field of every row
+    Quantable = apps.get_model('quantable_app', 'Quantable')
+    for field in VOTE_STAT_FIELDS:
+        for value in (float('nan'), float('inf'), float('-inf')):
+            Quantable.objects.filter(**{field: value}).update(**{field: None})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quantable_app', '0009_usercategoryunitpreference'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_non_finite_vote_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.9 on 2026-10-18 12:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_pairs(apps, schema_editor):
+    Quantable = apps.get_model('quantable_app', 'Quantable')
+    QuantablePair = apps.get_model('quantable_app', 'QuantablePair')
+
+    sides = {}
+    for quantable in Quantable.objects.exclude(pair_id__isnull=True).exclude(pair_id='').only('id', 'pair_id', 'is_min'):
+        sides.setdefault(quantable.pair_id, []).append(quantable)
+
+    pairs = []
+    for pair_id, quantables in sides.items():
+        min_sides = [quantable for quantable in quantables if quantable.is_min]
+        max_sides = [quantable for quantable in quantables if not quantable.is_min]
+        # Only complete pairs, with exactly one side of each kind, are linked
+        if len(min_sides) == 1 and len(max_sides) == 1:
+            pairs.append(QuantablePair(pair_id=pair_id, min_quantable=min_sides[0], max_quantable=max_sides[0]))
+    QuantablePair.objects.bulk_create(pairs, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quantable_app', '0010_clear_non_finite_vote_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuantablePair',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pair_id', models.CharField(max_length=100, unique=True)),
+                ('max_quantable', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='max_of_pair', to='quantable_app.quantable')),
+                ('min_quantable', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='min_of_pair', to='quantable_app.quantable')),
+            ],
+        ),
+        migrations.RunPython(backfill_pairs, migrations.RunPython.noop),
+    ]
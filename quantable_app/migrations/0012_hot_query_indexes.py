@@ -0,0 +1,29 @@
+# Generated by Django 4.2.9 on 2026-10-18 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quantable_app', '0011_quantablepair'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quantable',
+            index=models.Index(fields=['created_at', 'id'], name='quantable_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quantable',
+            index=models.Index(fields=['vote_count', 'id'], name='quantable_vote_count_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quantable',
+            index=models.Index(condition=models.Q(('pair_id__isnull', False)), fields=['pair_id'], name='quantable_pair_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['quantable', 'value'], name='vote_quantable_value_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.9 on 2026-10-18 12:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quantable_app', '0013_exchangeratesnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PackedVotes',
+            fields=[
+                ('quantable', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='packed_votes', serialize=False, to='quantable_app.quantable')),
+                ('user_ids', models.BinaryField(default=bytes)),
+                ('vote_values', models.BinaryField(default=bytes)),
+                ('packed_at', models.DateTimeField(null=True)),
+            ],
+        ),
+    ]
@@ -1,16 +1,29 @@
 # quantable_app/models.py
 
+from datetime import timedelta, timezone as dt_timezone
+
 import numpy as np
-from django.db import models
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from django.db.models import FloatField, Count, Avg, StdDev, Min, Max
-from django.db.models.functions import Cast
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from .enums import Category, CATEGORY_UNIT_MAPPING
-from scipy import stats
+from . import histograms, response_cache, vote_aggregates, vote_storage
+from .unit_conversions import convert
+from .instrumentation import timer
+from .vote_stats import RunningMoments, QuantileSketch, finite_or_none
 
 User = get_user_model()
 
 
+def stats_refresh_deferred():
+    return getattr(settings, 'QUANTABLE_STATS_REFRESH_MODE', 'sync') == 'deferred'
+
+
 class Quantable(models.Model):
     question = models.TextField()
     category = models.CharField(max_length=20, choices=Category.choices())
@@ -33,6 +46,14 @@ class Quantable(models.Model):
     vote_max = models.FloatField(null=True)
     vote_skewness = models.FloatField(null=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination for the list view's sort options; scanned backwards for descending order
+            models.Index(fields=['created_at', 'id'], name='quantable_created_at_id_idx'),
+            models.Index(fields=['vote_count', 'id'], name='quantable_vote_count_id_idx'),
+            models.Index(fields=['pair_id'], name='quantable_pair_id_idx', condition=models.Q(pair_id__isnull=False)),
+        ]
+
     def __str__(self):
         return self.question
 
@@ -50,95 +71,225 @@ class Quantable(models.Model):
         if user_profile:
             self.creator_name = user_profile.preferred_name
         super().save(*args, **kwargs)
+        response_cache.invalidate_on_commit([self.id])
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'pair_id', 'is_min'} & set(update_fields):
+            QuantablePair.sync(self)
+
+    def to_default_unit(self, value, unit):
+        """A value given in `unit` (None meaning the default unit) in the default unit; ValueError if unsupported."""
+        if not unit or unit == self.default_unit:
+            return value
+        return convert(Category(self.category), value, unit, self.default_unit)
+
+    def get_pair(self):
+        """The QuantablePair this quantable is a side of, or None."""
+        for accessor in ('min_of_pair', 'max_of_pair'):
+            try:
+                return getattr(self, accessor)
+            except QuantablePair.DoesNotExist:
+                pass
+        return None
+
+    VOTE_DATA_MARKER_FIELDS = [
+        'vote_count', 'vote_average', 'vote_median', 'vote_stddev',
+        'vote_q1', 'vote_q3', 'vote_iqr', 'vote_min', 'vote_max', 'vote_skewness'
+    ]
 
     def update_vote_data_markers(self):
-        votes = self.vote_set.values_list('value', flat=True)
-        vote_array = np.array(votes)
-
-        self.vote_count = len(vote_array)
-        self.vote_average = np.mean(vote_array) if self.vote_count > 0 else None
-        self.vote_median = np.median(vote_array) if self.vote_count > 0 else None
-        self.vote_stddev = np.std(vote_array) if self.vote_count > 1 else None
-        self.vote_q1 = np.percentile(vote_array, 25) if self.vote_count > 0 else None
-        self.vote_q3 = np.percentile(vote_array, 75) if self.vote_count > 0 else None
-        self.vote_iqr = self.vote_q3 - self.vote_q1 if self.vote_count > 0 else None
-        self.vote_min = np.min(vote_array) if self.vote_count > 0 else None
-        self.vote_max = np.max(vote_array) if self.vote_count > 0 else None
-        self.vote_skewness = stats.skew(vote_array) if self.vote_count > 1 else None
-
-        self.save(update_fields=[
-            'vote_count', 'vote_average', 'vote_median', 'vote_stddev',
-            'vote_q1', 'vote_q3', 'vote_iqr', 'vote_min', 'vote_max', 'vote_skewness'
-        ])
+        type(self).refresh_vote_data_markers([self])
+
+    @classmethod
+    @timer('stats')
+    def refresh_vote_data_markers(cls, quantables):
+        """
+        Recompute the vote_* fields of many quantables from their votes in a fixed number of
+        queries: aggregated inside the database on PostgreSQL, with NumPy elsewhere. The
+        incremental stats state and histograms are re-seeded from the same pass.
+        """
+        quantables = list(quantables)
+        quantable_ids = [quantable.id for quantable in quantables]
+        storage = vote_storage.get_storage()
+
+        # Packed votes are only readable in Python
+        if vote_aggregates.supports_sql_aggregation() and not storage.packed:
+            aggregates = vote_aggregates.aggregate_votes_in_db(quantable_ids)
+        else:
+            vote_values = storage.vote_values(quantable_ids)
+            aggregates = {
+                quantable_id: vote_aggregates.aggregate_vote_array(values)
+                for quantable_id, values in vote_values.items()
+            }
+
+        for quantable in quantables:
+            for field, value in aggregates[quantable.id].markers.items():
+                setattr(quantable, field, value)
+
+        with transaction.atomic():
+            cls.objects.bulk_update(quantables, cls.VOTE_DATA_MARKER_FIELDS)
+            # Re-seed the incremental state so later single-vote updates start from exact values
+            QuantableStatsState.objects.bulk_create(
+                [QuantableStatsState(quantable_id=quantable_id, **aggregate.state)
+                 for quantable_id, aggregate in aggregates.items()],
+                update_conflicts=True, unique_fields=['quantable'], update_fields=QuantableStatsState.STATE_FIELDS,
+            )
+            QuantableHistogram.objects.bulk_create(
+                [QuantableHistogram(quantable_id=quantable_id, **aggregate.histogram)
+                 for quantable_id, aggregate in aggregates.items()],
+                update_conflicts=True, unique_fields=['quantable'], update_fields=QuantableHistogram.LAYOUT_FIELDS,
+            )
+            response_cache.invalidate_on_commit(quantable_ids)
+
+    @classmethod
+    def refresh_stale_vote_data(cls, quantables):
+        """
+        In deferred refresh mode, recompute those of the given quantables that have been queued
+        for longer than QUANTABLE_STATS_MAX_STALENESS seconds, so reads never see older stats.
+        """
+        if not stats_refresh_deferred():
+            return
+
+        quantables = list(quantables)
+        max_staleness = getattr(settings, 'QUANTABLE_STATS_MAX_STALENESS', 30)
+        stale_ids = set(DirtyQuantable.claim(
+            quantable_ids=[quantable.id for quantable in quantables],
+            marked_before=timezone.now() - timedelta(seconds=max_staleness),
+        ))
+        if not stale_ids:
+            return
+
+        stale = [quantable for quantable in quantables if quantable.id in stale_ids]
+        try:
+            cls.refresh_vote_data_markers(stale)
+        except Exception:
+            DirtyQuantable.mark(stale_ids)
+            raise
+        for quantable in stale:
+            # Drop the histogram loaded with the quantable so the refreshed one is read
+            quantable._state.fields_cache.pop('histogram', None)
+
+    @timer('stats')
+    def apply_vote_change(self, old_value=None, new_value=None):
+        """
+        Update the vote_* fields for a single inserted (old_value=None), updated or
+        deleted (new_value=None) vote without recomputing them from all of the quantable's votes.
+        """
+        with transaction.atomic():
+            state = QuantableStatsState.objects.select_for_update().filter(quantable=self).first()
+            if state is None:
+                # No incremental state yet (e.g. votes cast before it existed): seed it from a full scan
+                self.update_vote_data_markers()
+                return
+
+            moments = state.moments()
+            sketch = QuantileSketch.from_dict(state.sketch)
+            extremes_invalidated = False
+
+            if old_value is not None:
+                moments.remove(old_value)
+                sketch.remove(old_value)
+                extremes_invalidated = old_value in (state.minimum, state.maximum)
+            if new_value is not None:
+                moments.add(new_value)
+                sketch.add(new_value)
+
+            if moments.count == 0:
+                state.minimum = state.maximum = None
+            elif extremes_invalidated:
+                state.minimum, state.maximum = vote_storage.get_storage().extremes(self)
+            elif new_value is not None:
+                state.minimum = new_value if state.minimum is None else min(state.minimum, new_value)
+                state.maximum = new_value if state.maximum is None else max(state.maximum, new_value)
+
+            quartiles = None
+            if 0 < moments.count <= getattr(settings, 'QUANTABLE_EXACT_QUANTILES_MAX_VOTES', 1000):
+                quartiles = vote_storage.get_storage().quantiles(self, moments.count, [0.25, 0.5, 0.75])
+                if quartiles is None:
+                    # The state no longer matches the stored votes: rebuild it from them
+                    self.update_vote_data_markers()
+                    return
+
+            state.count, state.mean, state.m2, state.m3 = moments.count, moments.mean, moments.m2, moments.m3
+            state.sketch = sketch.to_dict()
+            state.save()
+
+            self.set_vote_data_markers_from_state(state, moments, sketch, quartiles)
+            self.save(update_fields=self.VOTE_DATA_MARKER_FIELDS)
+
+            histogram, created = QuantableHistogram.objects.select_for_update().get_or_create(quantable=self)
+            histogram.quantable = self
+            if created:
+                # Not built yet (see the rebuild_histograms command), so there are no counts to update
+                histogram.rebuild()
+                histogram.save()
+            else:
+                histogram.apply_vote_change(old_value, new_value)
+
+    def set_vote_data_markers_from_state(self, state, moments, sketch, quartiles=None):
+        self.vote_count = moments.count
+        if moments.count == 0:
+            for field in self.VOTE_DATA_MARKER_FIELDS[1:]:
+                setattr(self, field, None)
+            return
+
+        if quartiles is not None:
+            q1, median, q3 = quartiles
+        else:
+            # Sketch quantiles, within its relative accuracy, are clamped to the exact extremes
+            q1, median, q3 = (min(max(value, state.minimum), state.maximum)
+                              for value in sketch.quantiles([0.25, 0.5, 0.75]))
+        self.vote_average = moments.mean
+        self.vote_median = median
+        self.vote_stddev = moments.stddev
+        self.vote_q1 = q1
+        self.vote_q3 = q3
+        self.vote_iqr = q3 - q1
+        self.vote_min = state.minimum
+        self.vote_max = state.maximum
+        self.vote_skewness = moments.skewness
+        for field in self.VOTE_DATA_MARKER_FIELDS[1:]:
+            setattr(self, field, finite_or_none(getattr(self, field)))
 
     def vote_data_for_d3(self):
-        vote_data = self.vote_set.annotate(
-            value_float=Cast('value', FloatField())
-        ).values('value_float').annotate(count=Count('value_float')).order_by('value_float')
-
+        values, counts = np.unique(vote_storage.get_storage().vote_values([self.id])[self.id], return_counts=True)
         return [{
-            'value': entry['value_float'],
-            'count': entry['count']
-        } for entry in vote_data]
-
-    def freedman_diaconis_bins(self):
-        votes = self.vote_set.values_list('value', flat=True)
-        vote_array = np.array(votes)
-
-        if len(vote_array) < 2:
-            return []
-
-        iqr = np.subtract(*np.percentile(vote_array, [75, 25]))
-        bin_width = 2 * iqr / (len(vote_array) ** (1 / 3))
-
-        if bin_width == 0:
-            return []
-
-        min_val = vote_array.min()
-        max_val = vote_array.max()
-        num_bins = int(np.ceil((max_val - min_val) / bin_width))
-
-        bins = []
-        for i in range(num_bins):
-            bin_min = min_val + i * bin_width
-            bin_max = bin_min + bin_width
-            bin_votes = vote_array[(vote_array >= bin_min) & (vote_array < bin_max)]
-            bin_count = len(bin_votes)
-            bin_percentage = bin_count / len(vote_array) * 100
-            bins.append({
-                'bin_min': bin_min,
-                'bin_max': bin_max,
-                'count': bin_count,
-                'percentage': bin_percentage
-            })
-
-        return bins
-
-    def ninety_percent_vote_range(self):
-        bins = self.freedman_diaconis_bins()
-        if not bins:
-            return None
-
-        total_votes = sum(bin['count'] for bin in bins)
-        cumulative_votes = 0
-        nmin = None
-        nmax = None
-
-        for bin in bins:
-            cumulative_votes += bin['count']
-            cumulative_percentage = cumulative_votes / total_votes * 100
-
-            if nmin is None and cumulative_percentage >= 5:
-                nmin = bin['bin_min']
-
-            if nmax is None and cumulative_percentage >= 95:
-                nmax = bin['bin_max']
-                break
-
-        if nmin is not None and nmax is not None:
-            return nmin, nmax
-
-        return None
+            'value': value,
+            'count': count
+        } for value, count in zip(values.tolist(), counts.tolist())]
+
+    @timer('stats')
+    def freedman_diaconis_bins(self, vote_array=None):
+        try:
+            return self.histogram.as_bins()
+        except QuantableHistogram.DoesNotExist:
+            pass
+
+        # Not built yet (see the rebuild_histograms command); compute it from the votes,
+        # reusing vote_array when the caller has already loaded them
+        if vote_array is None:
+            if not self.vote_count:
+                # Nothing to read for a quantable nobody has voted on, which has no histogram until then
+                return []
+            vote_array = vote_storage.get_storage().vote_values([self.id])[self.id]
+        return histograms.freedman_diaconis_bins(histograms.sort_votes(vote_array))
+
+    @timer('stats')
+    def ninety_percent_vote_range(self, bins=None):
+        if bins is None:
+            bins = self.freedman_diaconis_bins()
+        return histograms.ninety_percent_range(bins)
+
+
+# One vote per (quantable, user), written by a single statement. On PostgreSQL xmax is 0 only in a
+# row version the statement inserted, since the DO UPDATE branch sets it; elsewhere whether the row
+# existed is known from the row read just before.
+VOTE_UPSERT_SQL = """
+INSERT INTO {vote_table} (quantable_id, user_id, value, created_at, updated_at) VALUES (%s, %s, %s, %s, %s)
+ON CONFLICT (quantable_id, user_id) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+RETURNING id, created_at
+"""
+VOTE_UPSERT_RETURNING_INSERTED_SQL = VOTE_UPSERT_SQL.strip() + ", (xmax = 0)"
 
 
 class Vote(models.Model):
@@ -149,14 +300,186 @@ class Vote(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
+        # The unique index on (quantable, user) also serves a user's vote lookups
         unique_together = ('quantable', 'user')
+        indexes = [
+            # Covers value, so a quantable's votes are read from the index alone
+            models.Index(fields=['quantable', 'value'], name='vote_quantable_value_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s vote on {self.quantable.question}"
 
+    @classmethod
+    def upsert(cls, quantable, user, value):
+        """
+        Insert the user's vote on the quantable, or replace its value, in one INSERT ... ON CONFLICT
+        DO UPDATE, then update the quantable's stats once. Concurrent first votes from the same user
+        cannot fail on the unique constraint, and repeating a vote with its current value leaves the
+        stats and cached responses alone. Returns (vote, created).
+        """
+        now = timezone.now()
+        vote_table = connection.ops.quote_name(cls._meta.db_table)
+        params = [quantable.id, user.id, value, connection.ops.adapt_datetimefield_value(now),
+                  connection.ops.adapt_datetimefield_value(now)]
+
+        with transaction.atomic():
+            # Locks the quantable's packed votes, if any, for the rest of the transaction
+            packed_value = vote_storage.get_storage().packed_vote(quantable.id, user.id)
+            # Locks the user's current vote, so a concurrent change waits for this one and then
+            # replaces the value written here rather than the one read here
+            old_value = cls.objects.select_for_update().filter(quantable=quantable, user=user).values_list(
+                'value', flat=True
+            ).first()
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    cursor.execute(VOTE_UPSERT_RETURNING_INSERTED_SQL.format(vote_table=vote_table), params)
+                    vote_id, created_at, created = cursor.fetchone()
+                else:
+                    cursor.execute(VOTE_UPSERT_SQL.format(vote_table=vote_table), params)
+                    vote_id, created_at = cursor.fetchone()
+                    # SQLite runs one write transaction at a time, so the row read above is still current
+                    created = old_value is None
+
+            if isinstance(created_at, str):
+                created_at = parse_datetime(created_at)
+            if timezone.is_naive(created_at):
+                created_at = timezone.make_aware(created_at, dt_timezone.utc)
+            if created and packed_value is not None:
+                # The new row shadows the user's packed vote, which it replaces
+                created, old_value = False, packed_value
+
+            if created or old_value != value:
+                response_cache.invalidate_on_commit([quantable.id])
+                if stats_refresh_deferred():
+                    DirtyQuantable.mark_on_commit([quantable.id])
+                elif created:
+                    quantable.apply_vote_change(new_value=value)
+                elif old_value is not None:
+                    quantable.apply_vote_change(old_value=old_value, new_value=value)
+                else:
+                    # Inserted by a concurrent request after the row was read, so its value is unknown
+                    quantable.update_vote_data_markers()
+
+        vote = cls(id=vote_id, quantable=quantable, user=user, value=value, created_at=created_at, updated_at=now)
+        vote._state.adding = False
+        vote._state.db = connection.alias
+        return vote, created
+
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        self.quantable.update_vote_data_markers()
+        adding = self._state.adding
+        with transaction.atomic():
+            if adding:
+                # Locks the quantable's packed votes, if any, like upsert()
+                old_value = vote_storage.get_storage().packed_vote(self.quantable_id, self.user_id)
+            else:
+                # Locks the row, so a concurrent change of the vote waits and then replaces the value written here
+                old_value = self.locked_value()
+            super().save(*args, **kwargs)
+            response_cache.invalidate_on_commit([self.quantable_id])
+            if stats_refresh_deferred():
+                DirtyQuantable.mark_on_commit([self.quantable_id])
+            elif adding or old_value is not None:
+                # A new row shadows the user's packed vote, if any, which it replaces
+                self.quantable.apply_vote_change(old_value=old_value, new_value=self.value)
+            else:
+                # Its row was gone, so the save inserted it again
+                self.quantable.update_vote_data_markers()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            value = self.locked_value()
+            # The stats are updated here rather than by vote_removed
+            self._removal_applied = True
+            result = super().delete(*args, **kwargs)
+            # A packed vote the row was shadowing must not come back
+            vote_storage.get_storage().drop_packed_vote(self.quantable_id, self.user_id)
+            if value is not None:
+                response_cache.invalidate_on_commit([self.quantable_id])
+                if stats_refresh_deferred():
+                    DirtyQuantable.mark_on_commit([self.quantable_id])
+                else:
+                    self.quantable.apply_vote_change(old_value=value)
+        return result
+
+    def locked_value(self):
+        """The stored value of the vote, locking its row until the transaction ends; None if it is gone."""
+        return type(self).objects.select_for_update().filter(pk=self.pk).values_list('value', flat=True).first()
+
+
+class VoteRemovals:
+    """
+    The quantables that lost votes in the current transaction other than through Vote.delete(): a
+    queryset delete, the admin's bulk delete or a deleted user's votes. Their stats are recomputed
+    once each when the transaction commits, however many of their votes went.
+    """
+
+    def __init__(self):
+        self.quantable_ids = set()
+
+    @classmethod
+    def add(cls, quantable_id):
+        connection = transaction.get_connection()
+        if not connection.in_atomic_block:
+            cls.refresh([quantable_id])
+            return
+        pending = next((entry[1] for entry in connection.run_on_commit if isinstance(entry[1], cls)), None)
+        if pending is None:
+            pending = cls()
+            transaction.on_commit(pending)
+        pending.quantable_ids.add(quantable_id)
+
+    def __call__(self):
+        self.refresh(self.quantable_ids)
+
+    @staticmethod
+    def refresh(quantable_ids):
+        response_cache.invalidate(quantable_ids)
+        # Quantables deleted along with their votes are gone
+        quantables = list(Quantable.objects.filter(id__in=quantable_ids))
+        if stats_refresh_deferred():
+            DirtyQuantable.mark([quantable.id for quantable in quantables])
+        elif quantables:
+            Quantable.refresh_vote_data_markers(quantables)
+
+
+@receiver(post_delete, sender=Vote)
+def vote_removed(sender, instance, **kwargs):
+    if not getattr(instance, '_removal_applied', False):
+        VoteRemovals.add(instance.quantable_id)
+
+
+class QuantablePair(models.Model):
+    """
+    The two sides of a pair of quantables, kept in step with Quantable.pair_id and is_min
+    so that a pair and both sides' stats load in one joined query.
+    """
+    pair_id = models.CharField(max_length=100, unique=True)
+    min_quantable = models.OneToOneField(Quantable, on_delete=models.CASCADE, related_name='min_of_pair')
+    max_quantable = models.OneToOneField(Quantable, on_delete=models.CASCADE, related_name='max_of_pair')
+
+    @classmethod
+    def sync(cls, quantable):
+        # Drop any pair the quantable no longer belongs to, then link it with its partner
+        cls.objects.filter(
+            models.Q(min_quantable=quantable) | models.Q(max_quantable=quantable)
+        ).exclude(pair_id=quantable.pair_id or None).delete()
+        if not quantable.pair_id:
+            return
+
+        sides = list(Quantable.objects.filter(pair_id=quantable.pair_id))
+        min_sides = [side for side in sides if side.is_min]
+        max_sides = [side for side in sides if not side.is_min]
+        if len(min_sides) != 1 or len(max_sides) != 1:
+            cls.objects.filter(pair_id=quantable.pair_id).delete()
+            return
+        cls.objects.update_or_create(
+            pair_id=quantable.pair_id,
+            defaults={'min_quantable': min_sides[0], 'max_quantable': max_sides[0]},
+        )
+
+    def partner_of(self, quantable):
+        return self.max_quantable if quantable.id == self.min_quantable_id else self.min_quantable
 
 
 class UserQuantablePreference(models.Model):
@@ -165,4 +488,281 @@ class UserQuantablePreference(models.Model):
     preferred_unit = models.CharField(max_length=20)
 
     class Meta:
-        unique_together = ('user', 'quantable')
\ No newline at end of file
+        unique_together = ('user', 'quantable')
+
+
+class UserCategoryUnitPreference(models.Model):
+    """The unit a user sees a whole category in, unless they override it for a single quantable."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    category = models.CharField(max_length=20, choices=Category.choices())
+    preferred_unit = models.CharField(max_length=20)
+
+    class Meta:
+        unique_together = ('user', 'category')
+
+    def save(self, *args, **kwargs):
+        valid_units = [unit.value for unit in CATEGORY_UNIT_MAPPING[Category(self.category)]]
+        if self.preferred_unit not in valid_units:
+            raise ValueError(f"Invalid unit for the '{self.category}' category.")
+        super().save(*args, **kwargs)
+
+
+class QuantableStatsState(models.Model):
+    """Running moments and quantile sketch backing Quantable.apply_vote_change."""
+    quantable = models.OneToOneField(Quantable, on_delete=models.CASCADE, related_name='stats_state')
+    count = models.IntegerField(default=0)
+    mean = models.FloatField(default=0.0)
+    m2 = models.FloatField(default=0.0)
+    m3 = models.FloatField(default=0.0)
+    minimum = models.FloatField(null=True)
+    maximum = models.FloatField(null=True)
+    sketch = models.JSONField(default=dict)
+
+    STATE_FIELDS = ['count', 'mean', 'm2', 'm3', 'minimum', 'maximum', 'sketch']
+
+    def moments(self):
+        return RunningMoments(self.count, self.mean, self.m2, self.m3)
+
+
+class QuantableHistogram(models.Model):
+    """
+    Freedman-Diaconis histogram of a quantable's votes, kept current as votes change.
+
+    Single vote changes only touch one bin; the bins are rebuilt from the votes when
+    the Freedman-Diaconis width for the current count and IQR drifts more than
+    REBIN_THRESHOLD away from the stored width, or a vote lands outside the MAX_BINS
+    bins the width allows. Bins are widened past that width to fit the range in MAX_BINS.
+    """
+    REBIN_THRESHOLD = 0.25
+    MAX_BINS = histograms.MAX_STORED_BINS
+    LAYOUT_FIELDS = ['origin', 'bin_width', 'counts', 'total']
+
+    quantable = models.OneToOneField(Quantable, on_delete=models.CASCADE, related_name='histogram')
+    origin = models.FloatField(null=True)
+    bin_width = models.FloatField(null=True)
+    counts = models.JSONField(default=list)
+    total = models.IntegerField(default=0)
+
+    def rebuild(self):
+        vote_array = vote_storage.get_storage().vote_values([self.quantable_id])[self.quantable_id]
+        for field, value in vote_aggregates.histogram_fields(vote_array).items():
+            setattr(self, field, value)
+
+    def _add(self, value):
+        """Count the value; False, leaving the bins untouched, when that would take more than MAX_BINS."""
+        index = int((value - self.origin) // self.bin_width)
+        if index < 0:
+            if len(self.counts) - index > self.MAX_BINS:
+                return False
+            self.counts[:0] = [0] * -index
+            self.origin += index * self.bin_width
+            index = 0
+        elif index >= len(self.counts):
+            if index >= self.MAX_BINS:
+                return False
+            self.counts.extend([0] * (index - len(self.counts) + 1))
+        self.counts[index] += 1
+        return True
+
+    def _remove(self, value):
+        index = int((value - self.origin) // self.bin_width)
+        # The maximum vote of a fresh build sits on the top edge of the last bin
+        index = min(index, len(self.counts) - 1)
+        if 0 <= index and self.counts[index] > 0:
+            self.counts[index] -= 1
+
+    def target_width(self):
+        """The width a rebuild would give the bins now, from the quantable's current vote stats."""
+        quantable = self.quantable
+        bin_width = histograms.freedman_diaconis_width(quantable.vote_count, quantable.vote_iqr)
+        if bin_width is None:
+            return None
+        return histograms.stored_layout(quantable.vote_min, quantable.vote_max, bin_width)[0]
+
+    def needs_rebin(self):
+        target_width = self.target_width()
+        if target_width is None or self.bin_width is None:
+            return target_width != self.bin_width
+        if len(self.counts) > self.MAX_BINS:
+            return True
+        return abs(target_width / self.bin_width - 1) > self.REBIN_THRESHOLD
+
+    def apply_vote_change(self, old_value=None, new_value=None):
+        counted = True
+        if old_value is not None:
+            self.total -= 1
+            if self.bin_width is not None:
+                self._remove(old_value)
+        if new_value is not None:
+            self.total += 1
+            if self.bin_width is not None:
+                counted = self._add(new_value)
+
+        if not counted or self.needs_rebin():
+            self.rebuild()
+        self.save()
+
+    def as_bins(self):
+        if not self.bin_width or not self.total:
+            return []
+
+        # Bins emptied by deletions at either end are dropped, as a fresh build would
+        first = next(index for index, count in enumerate(self.counts) if count)
+        last = len(self.counts) - next(index for index, count in enumerate(reversed(self.counts)) if count)
+
+        bins = []
+        for index in range(first, last):
+            bin_min = self.origin + index * self.bin_width
+            bins.append({
+                'bin_min': bin_min,
+                'bin_max': bin_min + self.bin_width,
+                'count': self.counts[index],
+                'percentage': self.counts[index] / self.total * 100
+            })
+        return bins
+
+
+class DirtyQuantable(models.Model):
+    """
+    Quantables whose vote stats are waiting for the refresh_vote_stats worker, used in
+    deferred refresh mode. A quantable is queued once however many votes it receives
+    until the worker claims it; marked_at is when it was first queued.
+    """
+    quantable = models.OneToOneField(Quantable, on_delete=models.CASCADE, primary_key=True)
+    marked_at = models.DateTimeField(db_index=True)
+
+    @classmethod
+    def mark(cls, quantable_ids):
+        cls.objects.bulk_create(
+            [cls(quantable_id=quantable_id, marked_at=timezone.now()) for quantable_id in quantable_ids],
+            ignore_conflicts=True,
+        )
+
+    @classmethod
+    def mark_on_commit(cls, quantable_ids):
+        # Queued only once the votes are visible, so a worker that claims the quantable sees them
+        transaction.on_commit(lambda: cls.mark(quantable_ids))
+
+    @classmethod
+    def claim(cls, quantable_ids=None, marked_before=None, limit=None):
+        """Remove and return the ids of queued quantables, oldest first."""
+        with transaction.atomic():
+            queryset = cls.objects.select_for_update(skip_locked=True).order_by('marked_at')
+            if quantable_ids is not None:
+                queryset = queryset.filter(quantable_id__in=quantable_ids)
+            if marked_before is not None:
+                queryset = queryset.filter(marked_at__lte=marked_before)
+            claimed = list(queryset.values_list('quantable_id', flat=True)[:limit])
+            cls.objects.filter(quantable_id__in=claimed).delete()
+        return claimed
+
+
+class PackedVotes(models.Model):
+    """
+    The votes of a quantable compacted out of the Vote table in 'packed' vote storage (see
+    vote_storage): their values as float32 and their users' ids as a sorted uint32 array, slot for
+    slot. A user's Vote row on the quantable takes precedence over their slot here.
+    """
+    quantable = models.OneToOneField(Quantable, on_delete=models.CASCADE, primary_key=True,
+                                     related_name='packed_votes')
+    user_ids = models.BinaryField(default=bytes)
+    vote_values = models.BinaryField(default=bytes)
+    packed_at = models.DateTimeField(null=True)
+
+    def arrays(self):
+        """The stored (user ids, float32 values), without decoding the values."""
+        return (vote_storage.unpack_user_ids(self.user_ids),
+                np.frombuffer(self.vote_values, dtype=vote_storage.VALUE_DTYPE))
+
+    def set_arrays(self, user_ids, values):
+        order = np.argsort(user_ids, kind='stable')
+        self.user_ids = vote_storage.pack_user_ids(np.asarray(user_ids)[order])
+        self.vote_values = vote_storage.pack_values(np.asarray(values)[order])
+
+    def remove_user(self, user_id):
+        user_ids, values = self.arrays()
+        slot = vote_storage.find_slot(user_ids, user_id)
+        if slot is not None:
+            self.set_arrays(np.delete(user_ids, slot), np.delete(values, slot))
+            self.save(update_fields=['user_ids', 'vote_values'])
+
+    def drop_deleted_users(self):
+        """Remove the slots of users that no longer exist; returns how many were removed."""
+        user_ids, values = self.arrays()
+        existing = np.zeros(len(user_ids), dtype=bool)
+        for start in range(0, len(user_ids), 10000):
+            chunk = user_ids[start:start + 10000].tolist()
+            existing[start:start + 10000] = np.isin(
+                chunk, list(User.objects.filter(id__in=chunk).values_list('id', flat=True))
+            )
+        if not existing.all():
+            self.set_arrays(user_ids[existing], values[existing])
+        return int((~existing).sum())
+
+    @classmethod
+    def compact(cls, quantable, drop_deleted_users=False, batch_size=10000):
+        """
+        Move the quantable's Vote rows into its packed votes, replacing the slots they shadow, and
+        recompute its stats from the stored values. Rows that cannot be packed stay. Returns the
+        number of votes moved.
+        """
+        # Exists before the rows are read, so from here on a vote on the quantable waits for the lock
+        cls.objects.get_or_create(quantable=quantable)
+        with transaction.atomic():
+            packed = cls.objects.select_for_update().get(quantable=quantable)
+            row_ids, row_user_ids, row_values = [], [], []
+            for vote_id, user_id, value in Vote.objects.select_for_update().filter(quantable=quantable).values_list(
+                    'id', 'user_id', 'value'):
+                row_ids.append(vote_id)
+                row_user_ids.append(user_id)
+                row_values.append(value)
+            row_ids = np.array(row_ids, dtype=np.int64)
+            row_user_ids = np.array(row_user_ids, dtype=np.int64)
+            row_values = np.array(row_values, dtype=float)
+            movable = vote_storage.packable(row_user_ids, row_values)
+
+            user_ids, values = packed.arrays()
+            kept = ~np.isin(user_ids, row_user_ids)
+            packed.set_arrays(
+                np.concatenate([user_ids[kept].astype(np.int64), row_user_ids[movable]]),
+                np.concatenate([values[kept].astype(float), row_values[movable]]),
+            )
+            if drop_deleted_users:
+                packed.drop_deleted_users()
+            packed.packed_at = timezone.now()
+            packed.save()
+
+            moved_ids = row_ids[movable].tolist()
+            for start in range(0, len(moved_ids), batch_size):
+                # A plain DELETE without post_delete: the votes moved rather than went, and the stats
+                # are recomputed below
+                Vote.objects.filter(id__in=moved_ids[start:start + batch_size])._raw_delete(connection.alias)
+            Quantable.refresh_vote_data_markers([quantable])
+        return len(moved_ids)
+
+    @classmethod
+    def expand(cls, quantable, batch_size=10000):
+        """Move the quantable's packed votes back into Vote rows and drop them; returns the number of votes moved."""
+        with transaction.atomic():
+            packed = cls.objects.select_for_update().filter(quantable=quantable).first()
+            if packed is None:
+                return 0
+            packed.drop_deleted_users()
+            user_ids, _ = packed.arrays()
+            values = vote_storage.unpack_values(packed.vote_values)
+            # Users who voted again since have a row already, which wins
+            Vote.objects.bulk_create(
+                [Vote(quantable=quantable, user_id=user_id, value=value)
+                 for user_id, value in zip(user_ids.tolist(), values.tolist())],
+                batch_size=batch_size, ignore_conflicts=True,
+            )
+            packed.delete()
+            Quantable.refresh_vote_data_markers([quantable])
+        return len(user_ids)
+
+
+class ExchangeRateSnapshot(models.Model):
+    """A versioned table of exchange rates (units per USD) for the database rate provider; the newest row is in use."""
+    rates = models.JSONField()
+    source = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
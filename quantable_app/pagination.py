@@ -0,0 +1,118 @@
+# quantable_app/pagination.py
+
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import replace_query_param
+
+# Sort option -> (field, descending). The primary key breaks ties so every row has a unique position.
+SORT_OPTIONS = {
+    'newest': ('created_at', True),
+    'oldest': ('created_at', False),
+    'total_votes': ('vote_count', True),
+}
+
+
+class QuantableKeysetPagination:
+    """
+    Keyset (cursor) pagination over quantables for the list endpoint's sort options.
+
+    The cursor is the (sort value, id) of the last row on the previous page, so
+    each page is a single indexed range query however deep the client pages.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 100
+
+    def __init__(self, request, sort_option):
+        self.request = request
+        self.field, self.descending = SORT_OPTIONS.get(sort_option, SORT_OPTIONS['newest'])
+        self.has_next = False
+        self.last_row = None
+
+    def get_page_size(self):
+        try:
+            page_size = int(self.request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            raise ValidationError({self.page_size_query_param: 'A valid integer is required.'})
+        return max(1, min(page_size, self.max_page_size))
+
+    def order_queryset(self, queryset):
+        prefix = '-' if self.descending else ''
+        return queryset.order_by(f'{prefix}{self.field}', f'{prefix}id')
+
+    def paginate_queryset(self, queryset):
+        return self.set_page(list(self.page_queryset(queryset)))
+
+    async def apaginate_queryset(self, queryset):
+        return self.set_page([row async for row in self.page_queryset(queryset)])
+
+    def page_queryset(self, queryset):
+        """The query for the current page, with one extra row to tell whether there is a next page."""
+        queryset = self.order_queryset(queryset)
+
+        cursor = self.request.query_params.get(self.cursor_query_param)
+        if cursor:
+            value, last_id = self.decode_cursor(cursor)
+            lookup = 'lt' if self.descending else 'gt'
+            # The leading inclusive bound gives the planner an index range on (field, id)
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{lookup}e': value}),
+                Q(**{f'{self.field}__{lookup}': value}) | Q(**{f'id__{lookup}': last_id}),
+            )
+
+        return queryset[:self.get_page_size() + 1]
+
+    def set_page(self, rows):
+        page_size = self.get_page_size()
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.last_row = rows[-1] if rows else None
+        return rows
+
+    def position(self, quantable):
+        return getattr(quantable, self.field), quantable.id
+
+    def precedes(self, first, second):
+        """True if ``first`` is listed before ``second`` in the current sort order."""
+        if self.descending:
+            return self.position(first) > self.position(second)
+        return self.position(first) < self.position(second)
+
+    def encode_cursor(self, quantable):
+        value = getattr(quantable, self.field)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        payload = json.dumps({'value': value, 'id': quantable.id})
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            value, last_id = payload['value'], int(payload['id'])
+        except (ValueError, KeyError, TypeError):
+            raise ValidationError({self.cursor_query_param: 'Invalid cursor.'})
+
+        if self.field == 'created_at':
+            value = parse_datetime(value) if isinstance(value, str) else None
+            if value is None:
+                raise ValidationError({self.cursor_query_param: 'Invalid cursor.'})
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValidationError({self.cursor_query_param: 'Invalid cursor.'})
+        return value, last_id
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last_row))
+
+    def get_paginated_response_data(self, results):
+        return {
+            'next': self.get_next_link(),
+            'results': results,
+        }
@@ -0,0 +1,157 @@
+# quantable_app/payloads.py
+
+from .enums import Category
+from .instrumentation import timer
+from .serializers import QuantableSerializer, QuantableRowSerializer
+from .unit_conversions import convert, convert_values, convert_stats, convert_bins
+from .vote_storage import get_storage
+
+# Response bodies of the quantable read endpoints, shared by the sync views and their async
+# versions. The views do the loading (and decide what runs concurrently); these only shape data.
+
+
+def page_with_partners(page):
+    """
+    The pair of each quantable on a list page, and the page plus any partners that are not on it.
+    A pair is listed at the position of whichever side sorts first, so its partner may sit on a
+    later page; the list query joins the pairs and partners in, so nothing is read here.
+    """
+    pairs = {quantable.id: quantable.get_pair() for quantable in page}
+    page_ids = set(pairs)
+    partners = {}
+    for quantable in page:
+        pair = pairs[quantable.id]
+        if pair is not None:
+            partner = pair.partner_of(quantable)
+            if partner.id not in page_ids:
+                partners.setdefault(partner.id, partner)
+    return pairs, page + list(partners.values())
+
+
+def build_list_rows(quantables, vote_values, preferred_units, include_vote_values):
+    with timer('serializer'):
+        rows = QuantableRowSerializer(
+            vote_values=vote_values, include_vote_values=include_vote_values
+        ).from_instances(quantables)
+
+    quantable_data_by_id = {}
+    for quantable, quantable_data in zip(quantables, rows):
+        preferred_unit = preferred_units[quantable.id]
+
+        quantable_data['preferred_unit'] = preferred_unit
+        quantable_data['freedman_diaconis_bins'] = quantable.freedman_diaconis_bins()
+
+        if preferred_unit != quantable.default_unit:
+            convert_stats(Category(quantable.category), quantable_data, quantable.default_unit, preferred_unit)
+
+        quantable_data_by_id[quantable.id] = quantable_data
+    return quantable_data_by_id
+
+
+def list_results(page, pairs, quantable_data_by_id, paginator):
+    response_data = []
+
+    for quantable in page:
+        quantable_data = quantable_data_by_id[quantable.id]
+        pair = pairs[quantable.id]
+        if pair is None:
+            if not quantable.pair_id:
+                response_data.append(quantable_data)
+            # A side whose partner is missing is not listed
+            continue
+
+        if paginator.precedes(pair.partner_of(quantable), quantable):
+            # Already listed with its partner, on this page or an earlier one
+            continue
+
+        response_data.append({
+            'pair_id': pair.pair_id,
+            'min_quantable': quantable_data_by_id[pair.min_quantable_id],
+            'max_quantable': quantable_data_by_id[pair.max_quantable_id],
+            'type': 'pair'
+        })
+    return response_data
+
+
+def build_detail_payload(instance, preferred_unit, vote_values=None):
+    # The votes are read once, unless the caller has loaded them, and shared by vote_values and the fallback histogram
+    if vote_values is None:
+        vote_values = get_storage().vote_values([instance.id])[instance.id]
+    with timer('serializer'):
+        data = dict(QuantableSerializer(instance, context={'vote_values': {instance.id: vote_values}}).data)
+
+    if preferred_unit != instance.default_unit:
+        category = Category(instance.category)
+        convert_stats(category, data, instance.default_unit, preferred_unit)
+        data['vote_values'] = convert_values(
+            category, data['vote_values'], instance.default_unit, preferred_unit
+        ).tolist()
+
+    data['preferred_unit'] = preferred_unit
+    data['available_units'] = [unit for unit in instance.available_units if unit != instance.default_unit]
+    data['freedman_diaconis_bins'] = instance.freedman_diaconis_bins(vote_values)
+
+    ninety_percent_range = instance.ninety_percent_vote_range(data['freedman_diaconis_bins'])
+    if ninety_percent_range:
+        nmin, nmax = ninety_percent_range
+        data['ninety_percent_vote_range'] = {
+            'nmin': nmin,
+            'nmax': nmax,
+            'statement': f"90% of our community think that the correct answer is somewhere between {nmin:.2f} and {nmax:.2f} {preferred_unit}."
+        }
+    else:
+        data['ninety_percent_vote_range'] = None
+
+    return data
+
+
+def with_detail_user_vote(data, instance, user_vote, preferred_unit):
+    data = dict(data)
+    if user_vote is not None:
+        data['user_vote'] = convert(Category(instance.category), user_vote, instance.default_unit, preferred_unit)
+    return data
+
+
+def build_pair_payload(min_quantable, max_quantable, preferred_unit, vote_values=None):
+    if vote_values is None:
+        vote_values = get_storage().vote_values([min_quantable.id, max_quantable.id])
+
+    payload = {}
+    for key, quantable in (('min_quantable', min_quantable), ('max_quantable', max_quantable)):
+        with timer('serializer'):
+            quantable_data = dict(QuantableSerializer(quantable, context={'vote_values': vote_values}).data)
+        # Overlaid per user on every request
+        quantable_data['user_vote'] = None
+        quantable_data['freedman_diaconis_bins'] = quantable.freedman_diaconis_bins(vote_values[quantable.id])
+
+        if preferred_unit != quantable.default_unit:
+            # Everything is rounded to 2 decimal places
+            category = Category(quantable.category)
+            convert_stats(category, quantable_data, quantable.default_unit, preferred_unit, ndigits=2)
+            convert_bins(
+                category, quantable_data['freedman_diaconis_bins'], quantable.default_unit, preferred_unit, ndigits=2
+            )
+
+        quantable_data['preferred_unit'] = preferred_unit
+        payload[key] = quantable_data
+    return payload
+
+
+def with_pair_user_votes(payload, min_quantable, max_quantable, user_votes, preferred_unit):
+    """The cached pair payload with the user's votes ({quantable id: value}, or None when anonymous)."""
+    min_quantable_data = dict(payload['min_quantable'])
+    max_quantable_data = dict(payload['max_quantable'])
+
+    if user_votes is not None:
+        for quantable, quantable_data in ((min_quantable, min_quantable_data), (max_quantable, max_quantable_data)):
+            user_vote = user_votes.get(quantable.id)
+            if user_vote is not None and preferred_unit != quantable.default_unit:
+                user_vote = round(
+                    convert(Category(quantable.category), user_vote, quantable.default_unit, preferred_unit), 2
+                )
+            quantable_data['user_vote'] = user_vote
+
+    return {
+        'min_quantable': min_quantable_data,
+        'max_quantable': max_quantable_data,
+    }
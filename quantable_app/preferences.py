@@ -0,0 +1,67 @@
+# quantable_app/preferences.py
+
+import asyncio
+
+from .models import UserQuantablePreference, UserCategoryUnitPreference
+
+
+def resolve_preferred_units(user, quantables):
+    """
+    Map each quantable's id to the unit the user sees it in: their override for that quantable,
+    else their default for its category when the quantable offers that unit, else the quantable's
+    default_unit. Reads at most two queries and never creates preference rows.
+    """
+    quantables = list(quantables)
+    overrides, category_defaults = {}, {}
+    if user is not None and user.is_authenticated and quantables:
+        overrides = dict(_override_query(user, quantables))
+        category_defaults = dict(_category_default_query(user, quantables))
+    return _resolve(quantables, overrides, category_defaults)
+
+
+async def aresolve_preferred_units(user, quantables):
+    """resolve_preferred_units with the two preference queries run concurrently."""
+    quantables = list(quantables)
+    overrides, category_defaults = {}, {}
+    if user is not None and user.is_authenticated and quantables:
+        overrides, category_defaults = await asyncio.gather(
+            _afetch_dict(_override_query(user, quantables)),
+            _afetch_dict(_category_default_query(user, quantables)),
+        )
+    return _resolve(quantables, overrides, category_defaults)
+
+
+def resolve_preferred_unit(user, quantable):
+    return resolve_preferred_units(user, [quantable])[quantable.id]
+
+
+async def aresolve_preferred_unit(user, quantable):
+    return (await aresolve_preferred_units(user, [quantable]))[quantable.id]
+
+
+def _override_query(user, quantables):
+    return UserQuantablePreference.objects.filter(
+        user=user, quantable_id__in=[quantable.id for quantable in quantables]
+    ).exclude(preferred_unit='').values_list('quantable_id', 'preferred_unit')
+
+
+def _category_default_query(user, quantables):
+    return UserCategoryUnitPreference.objects.filter(
+        user=user, category__in={quantable.category for quantable in quantables}
+    ).values_list('category', 'preferred_unit')
+
+
+async def _afetch_dict(queryset):
+    return {key: value async for key, value in queryset}
+
+
+def _resolve(quantables, overrides, category_defaults):
+    preferred_units = {}
+    for quantable in quantables:
+        preferred_unit = overrides.get(quantable.id)
+        if preferred_unit is None:
+            category_default = category_defaults.get(quantable.category)
+            if category_default in quantable.available_units:
+                preferred_unit = category_default
+        preferred_units[quantable.id] = preferred_unit or quantable.default_unit
+    return preferred_units
@@ -0,0 +1,73 @@
+# quantable_app/renderers.py
+
+import zlib
+
+import numpy as np
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+def _ordered_bits(values, uint_dtype):
+    # Map IEEE 754 bit patterns to unsigned integers that sort in the same order as the floats
+    bits = values.view(uint_dtype)
+    sign = uint_dtype(1) << uint_dtype(8 * values.itemsize - 1)
+    return np.where(bits & sign, ~bits, bits | sign)
+
+
+class VoteValuesRenderer(BaseRenderer):
+    """
+    Renders a payload's vote_values as a packed little-endian float buffer instead of JSON text.
+
+    ?encoding=delta sorts the values and sends the differences between their order-preserving
+    integer bit patterns, which is lossless and compresses far better. ?encoding=zlib compresses
+    the buffer, and the two can be combined as ?encoding=delta,zlib. The value count, dtype
+    and encoding are sent in the X-Vote-Count, X-Vote-Dtype and X-Vote-Encoding headers.
+    Payloads without vote_values, such as errors, are rendered as JSON.
+    """
+    dtype = None
+    uint_dtype = None
+    charset = None
+    render_style = 'binary'
+    ENCODINGS = ('delta', 'zlib')
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        response = renderer_context.get('response')
+        request = renderer_context.get('request')
+        if not isinstance(data, dict) or 'vote_values' not in data:
+            if response is not None:
+                response['Content-Type'] = JSONRenderer.media_type
+            return JSONRenderer().render(data, accepted_media_type, renderer_context)
+
+        values = np.ascontiguousarray(data['vote_values'], dtype=self.dtype)
+        encodings = [
+            encoding for encoding in (request.query_params.get('encoding', '') if request else '').split(',')
+            if encoding in self.ENCODINGS
+        ]
+
+        if 'delta' in encodings:
+            ordered = _ordered_bits(np.sort(values), self.uint_dtype)
+            values = np.diff(ordered, prepend=self.uint_dtype(0))
+        # A view of the array's memory: no per-value formatting or copying
+        buffer = values.data
+        if 'zlib' in encodings:
+            buffer = zlib.compress(buffer)
+
+        if response is not None:
+            response['X-Vote-Count'] = str(len(values))
+            response['X-Vote-Dtype'] = np.dtype(self.dtype).name
+            response['X-Vote-Encoding'] = ','.join(encodings) or 'none'
+        return buffer
+
+
+class Float32VoteValuesRenderer(VoteValuesRenderer):
+    media_type = 'application/vnd.quantable.float32'
+    format = 'f32'
+    dtype = np.dtype('<f4')
+    uint_dtype = np.uint32
+
+
+class Float64VoteValuesRenderer(VoteValuesRenderer):
+    media_type = 'application/vnd.quantable.float64'
+    format = 'f64'
+    dtype = np.dtype('<f8')
+    uint_dtype = np.uint64
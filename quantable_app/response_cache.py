@@ -0,0 +1,83 @@
+# quantable_app/response_cache.py
+
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import exchange_rates
+
+# Computed detail and pair payloads are cached per (quantable, unit) under the quantable's current
+# generation. Any change to a quantable or its votes gives it a new generation, so stale entries are
+# never read again and simply expire. Per-user fields are left out and overlaid by the views.
+
+
+def generation_key(quantable_id):
+    return f'quantable:{quantable_id}:generation'
+
+
+def get_generations(quantable_ids):
+    keys = {generation_key(quantable_id): quantable_id for quantable_id in quantable_ids}
+    generations = {keys[key]: generation for key, generation in cache.get_many(keys).items()}
+
+    missing = {key: uuid.uuid4().hex for key, quantable_id in keys.items() if quantable_id not in generations}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        generations.update({keys[key]: generation for key, generation in missing.items()})
+    return generations
+
+
+def invalidate(quantable_ids):
+    # A fresh random generation rather than a counter, so an evicted generation key can never
+    # bring back entries cached under an earlier generation
+    quantable_ids = list(quantable_ids)
+    cache.set_many({generation_key(quantable_id): uuid.uuid4().hex for quantable_id in quantable_ids}, timeout=None)
+
+    from . import live_updates  # Import here to avoid circular import
+    live_updates.publish(quantable_ids)
+
+
+def invalidate_on_commit(quantable_ids):
+    # Invalidating only once the change is visible stops a concurrent read from caching
+    # the old data under the new generation
+    quantable_ids = list(quantable_ids)
+    transaction.on_commit(lambda: invalidate(quantable_ids))
+
+
+def _payload_key(kind, quantable_ids, unit, rates_version, generations):
+    # Converted currency values depend on the exchange rates in use as well
+    return ':'.join([kind, unit, rates_version] + [
+        f'{quantable_id}.{generations[quantable_id]}' for quantable_id in quantable_ids
+    ])
+
+
+def get_or_build(kind, quantable_ids, unit, build):
+    """Return the cached payload of this kind for the quantables in this unit, building and storing it on a miss."""
+    generations = get_generations(quantable_ids)
+    key = _payload_key(kind, quantable_ids, unit, exchange_rates.current_snapshot().version, generations)
+
+    payload = cache.get(key)
+    if payload is None:
+        payload = build()
+        cache.set(key, payload, timeout=getattr(settings, 'QUANTABLE_RESPONSE_CACHE_TIMEOUT', 600))
+    return payload
+
+
+def get_or_build_many(kind, entries, build_missing):
+    """
+    get_or_build for many payloads of one kind with a single cache read and write. `entries` is a
+    list of (quantable_ids, unit); build_missing(entries) builds the uncached ones, in order.
+    Returns the payloads in the order of `entries`.
+    """
+    generations = get_generations({quantable_id for quantable_ids, _ in entries for quantable_id in quantable_ids})
+    rates_version = exchange_rates.current_snapshot().version
+    keys = [_payload_key(kind, quantable_ids, unit, rates_version, generations) for quantable_ids, unit in entries]
+
+    payloads = cache.get_many(keys)
+    missing = [index for index, key in enumerate(keys) if key not in payloads]
+    if missing:
+        built = dict(zip((keys[index] for index in missing), build_missing([entries[index] for index in missing])))
+        cache.set_many(built, timeout=getattr(settings, 'QUANTABLE_RESPONSE_CACHE_TIMEOUT', 600))
+        payloads.update(built)
+    return [payloads[key] for key in keys]
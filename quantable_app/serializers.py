@@ -1,10 +1,11 @@
 # quantable_app/serializers.py
 
 from rest_framework import serializers
-from .models import Quantable, Vote, UserQuantablePreference
+from .models import Quantable, Vote, UserQuantablePreference, UserCategoryUnitPreference
 from django.contrib.auth import get_user_model
-import math
-from .enums import Category
+from django.utils import timezone
+from operator import attrgetter
+from .vote_storage import get_storage
 
 User = get_user_model()
 
@@ -26,15 +27,75 @@ class QuantableSerializer(serializers.ModelSerializer):
                             'vote_median', 'vote_stddev', 'vote_q1', 'vote_q3', 'vote_iqr',
                             'vote_min', 'vote_max', 'vote_skewness', 'vote_values']
 
-    def get_vote_values(self, obj):
-        return obj.vote_set.values_list('value', flat=True)
+    def get_fields(self):
+        fields = super().get_fields()
+        # List payloads leave out the raw votes unless the client asks for them
+        if not self.context.get('include_vote_values', True):
+            fields.pop('vote_values')
+        return fields
 
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        for key, value in representation.items():
-            if isinstance(value, float) and math.isnan(value):
-                representation[key] = None
-        return representation
+    def get_vote_values(self, obj):
+        # List views preload every quantable's votes in one query and pass them in the context
+        preloaded = self.context.get('vote_values')
+        if preloaded is not None:
+            return preloaded.get(obj.id, [])
+        return get_storage().vote_values([obj.id])[obj.id]
+
+
+class QuantableRowSerializer:
+    """
+    Read-only fast path rendering exactly what QuantableSerializer does for a quantable, built
+    from plain value tuples (see QUERY_FIELDS) instead of per-field serializer objects.
+    """
+    QUERY_FIELDS = [
+        'id', 'question', 'category', 'available_units', 'default_unit', 'creator_id', 'creator_name',
+        'pair_id', 'is_min', 'created_at', 'updated_at',
+        'vote_count', 'vote_average', 'vote_median', 'vote_stddev', 'vote_q1', 'vote_q3',
+        'vote_iqr', 'vote_min', 'vote_max', 'vote_skewness',
+    ]
+
+    def __init__(self, vote_values=None, include_vote_values=True):
+        self.vote_values = vote_values or {}
+        self.include_vote_values = include_vote_values
+
+    def from_values(self, queryset):
+        return self.serialize(queryset.values_list(*self.QUERY_FIELDS))
+
+    def from_instances(self, quantables):
+        get_values = attrgetter(*self.QUERY_FIELDS)
+        return self.serialize(get_values(quantable) for quantable in quantables)
+
+    def serialize(self, rows):
+        current_timezone = timezone.get_current_timezone()
+
+        def datetime_to_representation(value):
+            # As rest_framework.fields.DateTimeField renders ISO 8601
+            value = value.astimezone(current_timezone).isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+        data = []
+        for (quantable_id, question, category, available_units, default_unit, creator_id, creator_name,
+             pair_id, is_min, created_at, updated_at, vote_count, *stats) in rows:
+            row = {
+                'id': quantable_id,
+                'question': question,
+                'category': category,
+                'available_units': [str(unit) for unit in available_units],
+                'default_unit': default_unit,
+                'creator': creator_id,
+                'creator_name': creator_name,
+                'pair_id': None if pair_id is None else str(pair_id),
+                'is_min': bool(is_min),
+                'created_at': None if created_at is None else datetime_to_representation(created_at),
+                'updated_at': None if updated_at is None else datetime_to_representation(updated_at),
+                'vote_count': vote_count,
+            }
+            for field, value in zip(self.QUERY_FIELDS[12:], stats):
+                row[field] = None if value is None else float(value)
+            if self.include_vote_values:
+                row['vote_values'] = self.vote_values.get(quantable_id, [])
+            data.append(row)
+        return data
 
 
 class QuantablePairSerializer(serializers.Serializer):
@@ -59,6 +120,16 @@ class VoteSerializer(serializers.ModelSerializer):
         read_only_fields = ['user', 'created_at', 'updated_at']
 
 
+class BulkVoteRowSerializer(serializers.Serializer):
+    quantable = serializers.IntegerField()
+    value = serializers.FloatField()
+    unit = serializers.CharField(required=False, allow_blank=True)
+
+
+class BulkVoteSerializer(serializers.Serializer):
+    votes = BulkVoteRowSerializer(many=True, allow_empty=False)
+
+
 class CategorySerializer(serializers.Serializer):
     name = serializers.CharField()
     value = serializers.CharField()
@@ -70,4 +141,10 @@ class CategorySerializer(serializers.Serializer):
 class UserQuantablePreferenceSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserQuantablePreference
-        fields = ['user', 'quantable', 'preferred_unit']
\ No newline at end of file
+        fields = ['user', 'quantable', 'preferred_unit']
+
+
+class UserCategoryUnitPreferenceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UserCategoryUnitPreference
+        fields = ['user', 'category', 'preferred_unit']
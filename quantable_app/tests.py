@@ -1,3 +1,763 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from . import exchange_rates, payloads, response_cache
+from .enums import Category
+from .models import (
+    DirtyQuantable, Quantable, QuantableHistogram, QuantableStatsState, Vote, PackedVotes, UserCategoryUnitPreference,
+    UserQuantablePreference,
+)
+from .pagination import SORT_OPTIONS
+from .preferences import aresolve_preferred_units, resolve_preferred_units
+from .serializers import QuantableRowSerializer, QuantableSerializer
+from .unit_conversions import convert, UNIT_CONVERSION_FUNCTIONS
+from .vote_ingest import ingest_votes
+from .vote_storage import get_storage
+
+User = get_user_model()
+
+
+class QuantableTestMixin:
+    def create_users(self, count, prefix='user'):
+        return [User.objects.create_user(f'{prefix}{index}', password='password') for index in range(count)]
+
+    def create_quantable(self, creator, **kwargs):
+        fields = {
+            'question': 'How warm is a pleasant day?',
+            'category': 'temperature',
+            'available_units': ['°C', '°F'],
+            'default_unit': '°C',
+        }
+        fields.update(kwargs)
+        return Quantable.objects.create(creator=creator, **fields)
+
+    def create_pair(self, creator, pair_id):
+        fields = {'category': 'area', 'available_units': ['m²', 'ft²'], 'default_unit': 'm²', 'pair_id': pair_id}
+        return (self.create_quantable(creator, question=f'Smallest {pair_id}', is_min=True, **fields),
+                self.create_quantable(creator, question=f'Largest {pair_id}', is_min=False, **fields))
+
+    def stored_values(self, quantable):
+        return np.array(get_storage().vote_values([quantable.id])[quantable.id])
+
+    def assertStatsMatchVotes(self, quantable):
+        """The quantable's vote_* fields against NumPy over its stored votes and against a full recompute."""
+        quantable.refresh_from_db()
+        values = self.stored_values(quantable)
+        self.assertEqual(quantable.vote_count, len(values))
+        if len(values):
+            q1, median, q3 = np.percentile(values, [25, 50, 75]).tolist()
+            self.assertEqual((quantable.vote_q1, quantable.vote_median, quantable.vote_q3), (q1, median, q3))
+            self.assertEqual((quantable.vote_min, quantable.vote_max), (values.min(), values.max()))
+            self.assertAlmostEqual(quantable.vote_average, values.mean(), places=9)
+        if len(values) > 1:
+            self.assertAlmostEqual(quantable.vote_stddev, values.std(), places=9)
+
+        incremental = {field: getattr(quantable, field) for field in Quantable.VOTE_DATA_MARKER_FIELDS}
+        Quantable.refresh_vote_data_markers([quantable])
+        quantable.refresh_from_db()
+        for field, value in incremental.items():
+            recomputed = getattr(quantable, field)
+            if value is None or recomputed is None:
+                self.assertEqual(value, recomputed, field)
+            else:
+                self.assertAlmostEqual(value, recomputed, delta=1e-9 * max(1, abs(recomputed)), msg=field)
+
+
+class VoteStatsTests(QuantableTestMixin, TestCase):
+    def setUp(self):
+        self.users = self.create_users(12)
+        self.quantable = self.create_quantable(self.users[0])
+
+    def test_small_quantable_stats_are_exact(self):
+        for user, value in zip(self.users, [10, 20, 30]):
+            Vote.objects.create(quantable=self.quantable, user=user, value=value)
+
+        self.quantable.refresh_from_db()
+        self.assertEqual(self.quantable.vote_q1, 15)
+        self.assertEqual(self.quantable.vote_median, 20)
+        self.assertEqual(self.quantable.vote_q3, 25)
+        self.assertStatsMatchVotes(self.quantable)
+
+    def test_incremental_stats_match_full_recompute(self):
+        rng = np.random.default_rng(0)
+        for step in range(60):
+            user = self.users[rng.integers(len(self.users))]
+            vote = Vote.objects.filter(quantable=self.quantable, user=user).first()
+            value = float(np.round(rng.normal(20, 8), 2))
+            if vote is None:
+                Vote.objects.create(quantable=self.quantable, user=user, value=value)
+            elif step % 3 == 0:
+                vote.delete()
+            elif step % 3 == 1:
+                vote.value = value
+                vote.save()
+            else:
+                Vote.upsert(self.quantable, user, value)
+            self.assertStatsMatchVotes(self.quantable)
+
+    def test_stale_instances_replace_the_stored_value(self):
+        for user, value in zip(self.users, [10, 20, 30]):
+            Vote.objects.create(quantable=self.quantable, user=user, value=value)
+        first, second = (Vote.objects.get(quantable=self.quantable, user=self.users[0]) for _ in range(2))
+
+        first.value = 15
+        first.save()
+        second.value = 25
+        second.save()
+        self.assertStatsMatchVotes(self.quantable)
+
+        first.delete()
+        second.delete()
+        self.assertStatsMatchVotes(self.quantable)
+        self.assertEqual(self.quantable.vote_count, 2)
+
+    def test_drifted_state_is_rebuilt_from_the_votes(self):
+        for user, value in zip(self.users, [10, 20, 30, 40]):
+            Vote.objects.create(quantable=self.quantable, user=user, value=value)
+        QuantableStatsState.objects.filter(quantable=self.quantable).update(count=7)
+
+        Vote.objects.create(quantable=self.quantable, user=self.users[4], value=50)
+        self.assertStatsMatchVotes(self.quantable)
+
+    def test_votes_removed_without_vote_delete_are_recomputed(self):
+        for user, value in zip(self.users, [10, 20, 30, 40, 50]):
+            Vote.objects.create(quantable=self.quantable, user=user, value=value)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.users[4].delete()
+            Vote.objects.filter(quantable=self.quantable, value__lt=20).delete()
+        self.assertStatsMatchVotes(self.quantable)
+        self.assertEqual((self.quantable.vote_count, self.quantable.vote_max), (3, 40))
+        self.assertEqual(QuantableHistogram.objects.get(quantable=self.quantable).total, 3)
+
+        Vote.objects.create(quantable=self.quantable, user=self.users[5], value=60)
+        self.assertStatsMatchVotes(self.quantable)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.quantable.delete()
+        self.assertFalse(Vote.objects.exists())
+
+    @override_settings(QUANTABLE_EXACT_QUANTILES_MAX_VOTES=3)
+    def test_large_quantable_quartiles_come_from_the_sketch(self):
+        values = [10, 11, 12.5, 13, 14, 17, 20]
+        for user, value in zip(self.users, values):
+            Vote.objects.create(quantable=self.quantable, user=user, value=value)
+
+        self.quantable.refresh_from_db()
+        self.assertEqual(self.quantable.vote_count, len(values))
+        self.assertAlmostEqual(self.quantable.vote_median, np.median(values), delta=0.005 * np.median(values))
+
+    def test_histogram_counts_every_vote(self):
+        rng = np.random.default_rng(1)
+        for user in self.users:
+            Vote.objects.create(quantable=self.quantable, user=user, value=float(rng.normal(20, 8)))
+        for vote in Vote.objects.filter(quantable=self.quantable)[:4]:
+            vote.value += 15
+            vote.save()
+        Vote.objects.filter(quantable=self.quantable).first().delete()
+
+        histogram = QuantableHistogram.objects.get(quantable=self.quantable)
+        values = self.stored_values(self.quantable)
+        bins = np.minimum((values - histogram.origin) // histogram.bin_width, len(histogram.counts) - 1)
+        self.assertEqual(histogram.total, len(values))
+        self.assertEqual(histogram.counts, np.bincount(bins.astype(int), minlength=len(histogram.counts)).tolist())
+
+    def test_histogram_outliers_widen_the_bins_instead_of_adding_them(self):
+        rng = np.random.default_rng(2)
+        users = self.create_users(60, prefix='voter')
+        for user in users[:50]:
+            Vote.objects.create(quantable=self.quantable, user=user, value=float(rng.normal(20, 2)))
+        Vote.objects.create(quantable=self.quantable, user=users[50], value=10000)
+
+        with mock.patch.object(QuantableHistogram, 'rebuild', autospec=True,
+                               side_effect=QuantableHistogram.rebuild) as rebuild:
+            for user in users[51:56]:
+                Vote.objects.create(quantable=self.quantable, user=user, value=float(rng.normal(20, 2)))
+        self.assertEqual(rebuild.call_count, 0)
+
+        Vote.objects.create(quantable=self.quantable, user=users[56], value=1e12)
+        histogram = QuantableHistogram.objects.get(quantable=self.quantable)
+        self.assertLessEqual(len(histogram.counts), QuantableHistogram.MAX_BINS)
+        self.assertEqual((histogram.total, sum(histogram.counts)), (57, 57))
+
+    def test_identical_votes_do_not_rebuild_the_histogram(self):
+        Vote.objects.create(quantable=self.quantable, user=self.users[0], value=20)
+        with mock.patch.object(QuantableHistogram, 'rebuild', autospec=True,
+                               side_effect=QuantableHistogram.rebuild) as rebuild:
+            for user in self.users[1:6]:
+                Vote.objects.create(quantable=self.quantable, user=user, value=20)
+        self.assertEqual(rebuild.call_count, 0)
+        self.assertEqual(QuantableHistogram.objects.get(quantable=self.quantable).total, 6)
+
+
+class VoteIngestTests(QuantableTestMixin, TestCase):
+    def setUp(self):
+        self.users = self.create_users(4)
+        self.quantable = self.create_quantable(self.users[0])
+        self.other = self.create_quantable(self.users[0], question='How warm is too warm?')
+
+    def test_ingest_converts_units_and_keeps_the_last_row_per_user(self):
+        Vote.objects.create(quantable=self.quantable, user=self.users[0], value=5)
+        rows = [
+            {'quantable': self.quantable.id, 'user': self.users[0].id, 'value': 10},
+            {'quantable': self.quantable.id, 'user': self.users[1].id, 'value': 68, 'unit': '°F'},
+            {'quantable': self.quantable.id, 'user': self.users[0].id, 'value': 30},
+            {'quantable': self.other.id, 'user': self.users[2].id, 'value': 25},
+        ]
+        self.assertEqual(ingest_votes(rows), (3, 2))
+
+        votes = dict(Vote.objects.filter(quantable=self.quantable).values_list('user_id', 'value'))
+        self.assertEqual(votes[self.users[0].id], 30)
+        self.assertAlmostEqual(votes[self.users[1].id], 20)
+        self.assertStatsMatchVotes(self.quantable)
+        self.assertStatsMatchVotes(self.other)
+
+    def test_unknown_ids_write_nothing(self):
+        for row in [{'quantable': 0, 'user': self.users[0].id, 'value': 1},
+                    {'quantable': self.quantable.id, 'user': 0, 'value': 1},
+                    {'quantable': self.quantable.id, 'user': self.users[0].id, 'value': 1, 'unit': 'm'}]:
+            with self.subTest(row=row), self.assertRaises(ValueError):
+                ingest_votes([{'quantable': self.other.id, 'user': self.users[1].id, 'value': 1}, row])
+        self.assertFalse(Vote.objects.exists())
+
+    def test_bulk_endpoint_ingests_the_users_votes(self):
+        client = APIClient()
+        client.force_authenticate(self.users[3])
+        url = reverse('bulk_create_votes')
+        response = client.post(url, {'votes': [{'quantable': self.quantable.id, 'value': 20},
+                                               {'quantable': self.other.id, 'value': 77, 'unit': '°F'}]},
+                               format='json')
+        self.assertEqual((response.status_code, response.data), (201, {'votes': 2, 'quantables': 2}))
+        self.assertEqual(Vote.objects.filter(user=self.users[3]).count(), 2)
+        self.assertStatsMatchVotes(self.other)
+
+        response = client.post(url, {'votes': [{'quantable': 0, 'value': 20}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(QUANTABLE_STATS_REFRESH_MODE='deferred')
+class DeferredRefreshTests(QuantableTestMixin, TestCase):
+    def setUp(self):
+        self.users = self.create_users(3)
+        self.quantable = self.create_quantable(self.users[0])
+
+    def vote(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for user, value in zip(self.users, [10, 20, 30]):
+                Vote.objects.create(quantable=self.quantable, user=user, value=value)
+
+    def test_votes_wait_for_the_worker(self):
+        self.vote()
+        self.quantable.refresh_from_db()
+        self.assertEqual(self.quantable.vote_count, 0)
+        self.assertEqual(list(DirtyQuantable.objects.values_list('quantable_id', flat=True)), [self.quantable.id])
+
+        call_command('refresh_vote_stats', '--once', stdout=StringIO())
+        self.assertFalse(DirtyQuantable.objects.exists())
+        self.assertStatsMatchVotes(self.quantable)
+
+    def test_reads_refresh_quantables_queued_for_too_long(self):
+        self.vote()
+        url = reverse('quantable_detail', args=[self.quantable.id])
+        with override_settings(QUANTABLE_STATS_MAX_STALENESS=0):
+            self.assertEqual(APIClient().get(url).data['vote_count'], 3)
+        self.assertFalse(DirtyQuantable.objects.exists())
+        self.assertStatsMatchVotes(self.quantable)
+
+
+class ResponseCacheTests(QuantableTestMixin, TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.users = self.create_users(3)
+        self.quantable = self.create_quantable(self.users[0])
+        self.url = reverse('quantable_detail', args=[self.quantable.id])
+        self.client = APIClient()
+
+    def get_detail(self):
+        with mock.patch.object(payloads, 'build_detail_payload', wraps=payloads.build_detail_payload) as build:
+            data = self.client.get(self.url).data
+        return data, build.called
+
+    def test_detail_payload_is_rebuilt_only_after_a_vote_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            vote = Vote.objects.create(quantable=self.quantable, user=self.users[0], value=10)
+            Vote.objects.create(quantable=self.quantable, user=self.users[1], value=20)
+        self.assertEqual(self.get_detail()[0]['vote_average'], 15)
+        data, built = self.get_detail()
+        self.assertEqual((data['vote_average'], built), (15, False))
+
+        changes = [
+            (lambda: setattr(vote, 'value', 30) or vote.save(), 25),
+            (vote.delete, 20),
+            (lambda: Vote.objects.filter(user=self.users[1]).delete(), None),
+        ]
+        for change, average in changes:
+            generation = response_cache.get_generations([self.quantable.id])
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            self.assertNotEqual(response_cache.get_generations([self.quantable.id]), generation)
+            data, built = self.get_detail()
+            self.assertTrue(built)
+            self.assertEqual(data['vote_average'], average)
+
+    def test_units_are_cached_apart(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.objects.create(quantable=self.quantable, user=self.users[0], value=100)
+        self.assertEqual(self.client.get(self.url).data['vote_average'], 100)
+        UserQuantablePreference.objects.create(user=self.users[0], quantable=self.quantable, preferred_unit='°F')
+        self.client.force_authenticate(self.users[0])
+        self.assertAlmostEqual(self.client.get(self.url).data['vote_average'], 212)
+
+
+class PreferenceTests(QuantableTestMixin, TestCase):
+    def setUp(self):
+        self.user = self.create_users(1)[0]
+        self.quantables = [
+            self.create_quantable(self.user),
+            self.create_quantable(self.user, available_units=['°C']),
+            self.create_quantable(self.user, available_units=['°C', '°F', 'K']),
+        ]
+        UserCategoryUnitPreference.objects.create(user=self.user, category='temperature', preferred_unit='°F')
+        UserQuantablePreference.objects.create(user=self.user, quantable=self.quantables[2], preferred_unit='K')
+        self.expected = {self.quantables[0].id: '°F', self.quantables[1].id: '°C', self.quantables[2].id: 'K'}
+
+    def test_override_then_category_default_then_default_unit(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(resolve_preferred_units(self.user, self.quantables), self.expected)
+        self.assertEqual(async_to_sync(aresolve_preferred_units)(self.user, self.quantables), self.expected)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_preferred_units(AnonymousUser(), self.quantables),
+                             {quantable.id: '°C' for quantable in self.quantables})
+
+    def test_reads_do_not_write_preferences(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for quantable in self.quantables:
+            data = client.get(reverse('quantable_detail', args=[quantable.id])).data
+            self.assertEqual(data['preferred_unit'], self.expected[quantable.id])
+        client.get(reverse('quantable_list'))
+        self.assertEqual(UserQuantablePreference.objects.count(), 1)
+
+
+class QuantableListTests(QuantableTestMixin, TestCase):
+    def setUp(self):
+        self.users = self.create_users(6)
+        self.client = APIClient()
+
+    def create_quantables(self, count):
+        for index in range(count):
+            quantable = self.create_quantable(self.users[0], question=f'Question {index}')
+            for user in self.users[:index % len(self.users) + 1]:
+                Vote.objects.create(quantable=quantable, user=user, value=index + user.id)
+            self.create_pair(self.users[1], f'pair_{index}')
+
+    def list_url(self, **params):
+        params.setdefault('page_size', 100)
+        return reverse('quantable_list') + '?' + '&'.join(f'{key}={value}' for key, value in params.items())
+
+    def test_list_query_count_does_not_grow(self):
+        UserQuantablePreference.objects.create(
+            user=self.users[2], quantable=self.create_quantable(self.users[0]), preferred_unit='°F'
+        )
+        for count in (2, 6):
+            self.create_quantables(count)
+            with self.assertNumQueries(1):
+                self.client.get(self.list_url())
+            with self.assertNumQueries(2):
+                self.client.get(self.list_url(include_vote_values='true'))
+
+            # Plus one query for each kind of stored unit preference
+            self.client.force_authenticate(self.users[2])
+            with self.assertNumQueries(3):
+                self.client.get(self.list_url())
+            self.client.force_authenticate(None)
+
+    def test_keyset_pages_list_every_quantable_and_pair_once(self):
+        # Pair sides are created apart and get different vote counts, so every sort separates them
+        singles = []
+        for index in range(3):
+            min_side = self.create_quantable(self.users[0], question=f'Min {index}', category='area',
+                                             available_units=['m²'], default_unit='m²', pair_id=f'pair_{index}',
+                                             is_min=True)
+            singles.append(self.create_quantable(self.users[0], question=f'Single {index}'))
+            max_side = self.create_quantable(self.users[0], question=f'Max {index}', category='area',
+                                             available_units=['m²'], default_unit='m²', pair_id=f'pair_{index}',
+                                             is_min=False)
+            for user in self.users[:index + 1]:
+                Vote.objects.create(quantable=min_side, user=user, value=1)
+            for user in self.users[:index + 3]:
+                Vote.objects.create(quantable=max_side, user=user, value=2)
+        expected = sorted([f'pair_{index}' for index in range(3)] + [str(single.id) for single in singles])
+
+        for sort in SORT_OPTIONS:
+            for page_size in (1, 2, 3):
+                listed = []
+                url = self.list_url(sort=sort, page_size=page_size)
+                while url:
+                    data = self.client.get(url).json()
+                    for item in data['results']:
+                        if item.get('type') == 'pair':
+                            self.assertEqual(item['min_quantable']['pair_id'], item['pair_id'])
+                            self.assertEqual(item['max_quantable']['pair_id'], item['pair_id'])
+                            listed.append(item['pair_id'])
+                        else:
+                            listed.append(str(item['id']))
+                    url = data['next']
+                self.assertEqual(sorted(listed), expected, (sort, page_size))
+
+    def test_malformed_cursors_are_rejected(self):
+        def cursor(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+        for sort, payload in [('total_votes', {'value': {'a': 1}, 'id': 1}), ('total_votes', {'value': [1], 'id': 1}),
+                              ('total_votes', {'value': '3', 'id': 1}), ('newest', {'value': 3, 'id': 1}),
+                              ('oldest', {'value': '2024-01-01T00:00:00', 'id': {}}), ('newest', ['value'])]:
+            with self.subTest(sort=sort, payload=payload):
+                response = self.client.get(self.list_url(sort=sort, cursor=cursor(payload)))
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('cursor', response.json())
+        self.assertEqual(self.client.get(self.list_url(sort='newest', cursor='not a cursor')).status_code, 400)
+
+
+class QuantableRowSerializerTests(QuantableTestMixin, TestCase):
+    def test_output_is_byte_identical_to_quantable_serializer(self):
+        users = self.create_users(3)
+        self.create_quantable(users[0], question='Nobody voted on this «one»')
+        self.create_pair(users[1], 'pair_1')
+        voted = self.create_quantable(users[2], category='number', available_units=['decimal'], default_unit='decimal')
+        for user, value in zip(users, [0.125, 1e-7, 3e12]):
+            Vote.objects.create(quantable=voted, user=user, value=value)
+
+        queryset = Quantable.objects.order_by('id')
+        quantables = list(queryset)
+        vote_values = get_storage().vote_values([quantable.id for quantable in quantables])
+        renderer = JSONRenderer()
+        for include_vote_values in (False, True):
+            with self.subTest(include_vote_values=include_vote_values):
+                expected = renderer.render(QuantableSerializer(quantables, many=True, context={
+                    'include_vote_values': include_vote_values, 'vote_values': vote_values,
+                }).data)
+                fast = QuantableRowSerializer(vote_values, include_vote_values=include_vote_values)
+                self.assertEqual(renderer.render(fast.from_instances(quantables)), expected)
+                self.assertEqual(renderer.render(fast.from_values(queryset)), expected)
+
+
+class UnitConversionTests(TestCase):
+    # (category, value, from unit, to unit, result of the pairwise rules the conversion table replaced)
+    PREVIOUS_RESULTS = [
+        (Category.SIZE, 3, 'inch', 'cm', 3 * 2.54),
+        (Category.SIZE, 5, 'm', 'ft', 5 / 0.3048),
+        (Category.VOLUME, 2, 'cup', 'ml', 2 * 236.588),
+        (Category.VOLUME, 750, 'ml', 'tsp', 750 / 4.92892),
+        (Category.VOLUME, 4, 'l', 'gal', 4 / 3.78541),
+        (Category.VOLUME, 12, 'cm³', 'ml', 12),
+        (Category.WEIGHT, 8, 'oz', 'g', 8 * 28.34952),
+        (Category.WEIGHT, 70, 'kg', 'lb', 70 / 0.453592),
+        (Category.WEIGHT, 2, 'ton', 'kg', 2 * 1000),
+        (Category.LENGTH, 26.2, 'mi', 'km', 26.2 * 1.60934),
+        (Category.LENGTH, 180, 'cm', 'inch', 180 / 2.54),
+        (Category.LENGTH, 12, 'mm', 'cm', 12 / 10),
+        (Category.AREA, 100, 'ft²', 'm²', 100 * 0.09290304),
+        (Category.AREA, 3, 'mi²', 'km²', 3 * 2.58998811),
+        (Category.AREA, 40, 'acre', 'ha', 40 * 0.40468564),
+        (Category.TEMPERATURE, 21.5, '°C', '°F', (21.5 * 9 / 5) + 32),
+        (Category.TEMPERATURE, 98.6, '°F', '°C', (98.6 - 32) * 5 / 9),
+        (Category.TEMPERATURE, -40, '°F', 'K', (-40 + 459.67) * 5 / 9),
+        (Category.TEMPERATURE, 300, 'K', '°F', (300 * 9 / 5) - 459.67),
+        (Category.TIME, 90, 's', 'min', 90 / 60),
+        (Category.TIME, 3, 'month', 'd', 3 * 30.44),
+        (Category.TIME, 1000, 'd', 'year', 1000 / 365.25),
+        (Category.SPEED, 10, 'm/s', 'km/h', 10 * 3.6),
+        (Category.SPEED, 60, 'mph', 'km/h', 60 * 1.60934),
+        (Category.SPEED, 100, 'km/h', 'knots', 100 / 1.852),
+        (Category.NUMBER, 0.25, 'decimal', 'percentage', 0.25 * 100),
+        (Category.NUMBER, 7, 'whole', 'decimal', 7.0),
+        (Category.CURRENCY, 100, 'USD', 'EUR', 100 / 1.0 * 0.92),
+        (Category.CURRENCY, 5000, 'JPY', 'GBP', 5000 / 135.0 * 0.81),
+    ]
+
+    def test_conversions_match_previous_rules(self):
+        for category, value, from_unit, to_unit, expected in self.PREVIOUS_RESULTS:
+            with self.subTest(category=category, from_unit=from_unit, to_unit=to_unit):
+                self.assertAlmostEqual(convert(category, value, from_unit, to_unit), expected,
+                                       delta=1e-12 * abs(expected))
+                self.assertAlmostEqual(UNIT_CONVERSION_FUNCTIONS[category](value, from_unit, to_unit), expected,
+                                       delta=1e-12 * abs(expected))
+
+    def test_decimal_to_whole_no_longer_truncates(self):
+        # The previous rule returned int(value), 2 here
+        self.assertEqual(convert(Category.NUMBER, 2.75, 'decimal', 'whole'), 2.75)
+
+    def test_unknown_unit_is_rejected(self):
+        with self.assertRaises(ValueError):
+            convert(Category.TEMPERATURE, 20, '°C', 'm')
+
+
+class ExchangeRateTests(TestCase):
+    def tearDown(self):
+        exchange_rates.reset()
+
+    def test_file_rates_are_reread_only_when_the_file_changes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            provider = exchange_rates.FileRateProvider(os.path.join(directory, 'rates.json'))
+            provider.write(dict(exchange_rates.STATIC_RATES), version='1')
+            with override_settings(QUANTABLE_EXCHANGE_RATE_PROVIDER='file', QUANTABLE_EXCHANGE_RATE_FILE=provider.path,
+                                   QUANTABLE_EXCHANGE_RATE_REFRESH_SECONDS=0):
+                exchange_rates.reset()
+                first = exchange_rates.current_snapshot()
+                self.assertEqual(first.version, provider.version())
+                with mock.patch.object(exchange_rates.FileRateProvider, 'snapshot') as snapshot:
+                    self.assertIs(exchange_rates.current_snapshot(), first)
+                self.assertFalse(snapshot.called)
+
+                provider.write(dict(exchange_rates.STATIC_RATES, EUR=0.5), version='2')
+                self.assertEqual(convert(Category.CURRENCY, 10, 'USD', 'EUR'), 5)
+
+
+class VoteUpsertTests(QuantableTestMixin, TestCase):
+    def setUp(self):
+        for alias in caches:
+            caches[alias].clear()
+        self.user = self.create_users(1)[0]
+        self.quantable = self.create_quantable(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_upsert_creates_then_updates(self):
+        vote, created = Vote.upsert(self.quantable, self.user, 20)
+        self.assertTrue(created)
+        same_vote, created = Vote.upsert(self.quantable, self.user, 25)
+        self.assertFalse(created)
+        self.assertEqual(same_vote.id, vote.id)
+        self.assertEqual(Vote.objects.get(id=vote.id).value, 25)
+        self.quantable.refresh_from_db()
+        self.assertEqual((self.quantable.vote_count, self.quantable.vote_average), (1, 25))
+
+    def test_create_view_status_and_unit(self):
+        url = reverse('create_vote')
+        response = self.client.post(url, {'quantable': self.quantable.id, 'value': 20}, format='json')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post(url, {'quantable': self.quantable.id, 'value': 50, 'preferred_unit': '°F'},
+                                    format='json')
+        # A replaced vote answers 201 too, as before votes were upserted
+        self.assertEqual(response.status_code, 201)
+        self.assertAlmostEqual(response.data['value'], 10)
+        self.assertEqual(Vote.objects.filter(quantable=self.quantable).count(), 1)
+
+    def test_idempotency_key_replays_and_rejects_a_different_vote(self):
+        url = reverse('create_vote')
+        first = self.client.post(url, {'quantable': self.quantable.id, 'value': 20}, format='json',
+                                 HTTP_IDEMPOTENCY_KEY='vote-1')
+        Vote.upsert(self.quantable, self.user, 30)
+        replay = self.client.post(url, {'quantable': self.quantable.id, 'value': 20}, format='json',
+                                  HTTP_IDEMPOTENCY_KEY='vote-1')
+        self.assertEqual((replay.status_code, replay.data), (201, first.data))
+        # The replay returned the stored response without writing the vote again
+        self.assertEqual(Vote.objects.get(quantable=self.quantable, user=self.user).value, 30)
+
+        # Kept apart from the cached payloads, so clearing those does not forget the key
+        caches['default'].clear()
+        replay = self.client.post(url, {'quantable': self.quantable.id, 'value': 20}, format='json',
+                                  HTTP_IDEMPOTENCY_KEY='vote-1')
+        self.assertEqual(replay.data, first.data)
+
+        mismatch = self.client.post(url, {'quantable': self.quantable.id, 'value': 21}, format='json',
+                                    HTTP_IDEMPOTENCY_KEY='vote-1')
+        self.assertEqual(mismatch.status_code, 400)
+        self.assertIn('Idempotency-Key', mismatch.data)
+
+
+@override_settings(QUANTABLE_VOTE_STORAGE='packed')
+class PackedVoteStorageTests(QuantableTestMixin, TestCase):
+    def setUp(self):
+        self.users = self.create_users(5)
+        self.quantable = self.create_quantable(self.users[0])
+        for user, value in zip(self.users, [10, 20.5, 30, 40.25, 55]):
+            Vote.objects.create(quantable=self.quantable, user=user, value=value)
+
+    def votes_by_user(self):
+        return {user.id: get_storage().user_votes(user, [self.quantable.id]).get(self.quantable.id)
+                for user in self.users}
+
+    def test_compact_and_expand_round_trip(self):
+        votes = self.votes_by_user()
+        self.assertEqual(PackedVotes.compact(self.quantable), 5)
+        self.assertFalse(Vote.objects.filter(quantable=self.quantable).exists())
+        self.assertEqual(self.votes_by_user(), votes)
+        self.assertStatsMatchVotes(self.quantable)
+
+        self.assertEqual(PackedVotes.expand(self.quantable), 5)
+        self.assertFalse(PackedVotes.objects.filter(quantable=self.quantable).exists())
+        self.assertEqual(dict(Vote.objects.filter(quantable=self.quantable).values_list('user_id', 'value')), votes)
+        self.assertStatsMatchVotes(self.quantable)
+
+    def test_new_row_shadows_packed_vote(self):
+        PackedVotes.compact(self.quantable)
+        Vote.objects.create(quantable=self.quantable, user=self.users[1], value=99)
+
+        self.quantable.refresh_from_db()
+        values = get_storage().vote_values([self.quantable.id])[self.quantable.id]
+        self.assertEqual(sorted(values), [10, 30, 40.25, 55, 99])
+        self.assertEqual(self.quantable.vote_count, 5)
+        self.assertStatsMatchVotes(self.quantable)
+
+    def test_upsert_replaces_packed_vote(self):
+        PackedVotes.compact(self.quantable)
+        vote, created = Vote.upsert(self.quantable, self.users[2], 31)
+        self.assertFalse(created)
+        self.assertEqual(self.votes_by_user()[self.users[2].id], 31)
+        self.assertStatsMatchVotes(self.quantable)
+
+        # Deleting the row removes the vote, rather than uncovering the packed one
+        vote.delete()
+        self.assertIsNone(self.votes_by_user()[self.users[2].id])
+        self.assertStatsMatchVotes(self.quantable)
+        self.assertEqual(self.quantable.vote_count, 4)
+
+        PackedVotes.compact(self.quantable)
+        self.assertEqual(sorted(self.stored_values(self.quantable)), [10, 20.5, 40.25, 55])
+
+
+class AsyncViewTests(QuantableTestMixin, TestCase):
+    def setUp(self):
+        self.users = self.create_users(3)
+        for index in range(3):
+            quantable = self.create_quantable(self.users[0], question=f'Question {index}')
+            for user in self.users[:index + 1]:
+                Vote.objects.create(quantable=quantable, user=user, value=10 * index + user.id)
+        min_side, max_side = self.create_pair(self.users[1], 'pair_1')
+        Vote.objects.create(quantable=max_side, user=self.users[2], value=40)
+        UserQuantablePreference.objects.create(user=self.users[2], quantable=quantable, preferred_unit='°F')
+        self.headers = {'authorization': f'Token {Token.objects.create(user=self.users[2]).key}'}
+        self.quantable = quantable
+
+    def test_async_views_answer_like_the_sync_views(self):
+        requests = [
+            ('quantable_list', [], '?sort=total_votes&page_size=2'),
+            ('quantable_list', [], '?include_vote_values=true'),
+            ('quantable_detail', [self.quantable.id], ''),
+            ('quantable_detail', [0], ''),
+            ('quantable_pair_detail', ['pair_1'], '?preferred_unit=ft²'),
+            ('quantable_pair_detail', ['missing'], ''),
+            ('category_list', [], ''),
+            ('unit_list', ['temperature'], ''),
+        ]
+        for name, args, query in requests:
+            for headers in ({}, self.headers):
+                with self.subTest(name=name, args=args, query=query, authenticated=bool(headers)):
+                    expected = self.client.get(reverse(name, args=args) + query, headers=headers)
+                    response = async_to_sync(self.async_get)(reverse(f'async_{name}', args=args) + query, headers)
+                    self.assertEqual(response.status_code, expected.status_code)
+                    data = response.json()
+                    if isinstance(data, dict) and data.get('next'):
+                        # The next page is on the async endpoint itself
+                        data['next'] = data['next'].replace(reverse('async_quantable_list'), reverse('quantable_list'))
+                    self.assertEqual(data, expected.json())
+
+    async def async_get(self, url, headers):
+        return await self.async_client.get(url, headers=headers)
+
+
+class BatchDetailTests(QuantableTestMixin, TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.users = self.create_users(3)
+        self.quantables = [self.create_quantable(self.users[0], question=f'Question {index}') for index in range(4)]
+        self.pairs = [self.create_pair(self.users[0], f'pair_{index}') for index in range(2)]
+        for index, quantable in enumerate(self.quantables + [side for pair in self.pairs for side in pair]):
+            for user in self.users[:index % 3 + 1]:
+                Vote.objects.create(quantable=quantable, user=user, value=index + user.id)
+        UserQuantablePreference.objects.create(user=self.users[0], quantable=self.quantables[1], preferred_unit='°F')
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def batch(self, ids='', pair_ids=''):
+        return self.client.get(reverse('quantable_batch_detail') + f'?ids={ids}&pair_ids={pair_ids}')
+
+    def test_batch_matches_the_detail_endpoints(self):
+        ids = [quantable.id for quantable in self.quantables]
+        response = self.batch(f'{ids[2]},{ids[0]},0,{ids[1]},{ids[0]}', 'pair_1,missing,pair_0')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+
+        self.assertEqual(list(data['quantables']), [str(ids[2]), str(ids[0]), str(ids[1])])
+        for quantable_id in (ids[2], ids[0], ids[1]):
+            expected = self.client.get(reverse('quantable_detail', args=[quantable_id])).json()
+            self.assertEqual(data['quantables'][str(quantable_id)], expected)
+        self.assertEqual(list(data['pairs']), ['pair_1', 'pair_0'])
+        for pair_id in ('pair_1', 'pair_0'):
+            expected = self.client.get(reverse('quantable_pair_detail', args=[pair_id])).json()
+            self.assertEqual(data['pairs'][pair_id], expected)
+        self.assertEqual(data['not_found'], {'ids': [0], 'pair_ids': ['missing']})
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        ids = [quantable.id for quantable in self.quantables]
+        query_counts = []
+        for quantable_ids, pair_ids in ([ids[:1], ['pair_0']], [ids, ['pair_0', 'pair_1']]):
+            caches['default'].clear()
+            with CaptureQueriesContext(connection) as context:
+                self.batch(','.join(map(str, quantable_ids)), ','.join(pair_ids))
+            query_counts.append(len(context.captured_queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    @override_settings(QUANTABLE_BATCH_DETAIL_MAX_ITEMS=2)
+    def test_invalid_batches_are_rejected(self):
+        self.assertEqual(self.batch().status_code, 400)
+        self.assertEqual(self.batch('1,x').status_code, 400)
+        self.assertEqual(self.batch(f'{self.quantables[0].id},{self.quantables[1].id}', 'pair_0').status_code, 400)
+
+
+class BenchmarkApiTests(TransactionTestCase):
+    # load_sample_data credits its quantables to the users with the first ids
+    reset_sequences = True
+
+    # The in-process client sends Host: localhost, which only DEBUG allows by default
+    @override_settings(ALLOWED_HOSTS=['localhost'])
+    def test_seeds_measures_and_compares(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            call_command('benchmark_api', '--seed-data', users=20, quantables=4, votes_per_quantable=5, requests=3,
+                         warmup=1, output=output, stdout=StringIO())
+            with open(output) as output_file:
+                results = json.load(output_file)
+            self.assertEqual(results['meta']['quantables'], Quantable.objects.count())
+            for endpoint, result in results['results'].items():
+                self.assertEqual((result['requests'], result['errors']), (3, 0), endpoint)
+
+            # A baseline a thousand times faster is a regression
+            for result in results['results'].values():
+                result['throughput_rps'] *= 1000
+                result['latency_ms'] = {name: value / 1000 for name, value in result['latency_ms'].items()}
+            with open(output, 'w') as output_file:
+                json.dump(results, output_file)
+            with self.assertRaises(CommandError):
+                call_command('benchmark_api', requests=3, warmup=0, compare=output, fail_on_regression=True,
+                             stdout=StringIO())
+
+
+class LiveUpdatesTests(QuantableTestMixin, TestCase):
+    def test_wsgi_request_is_rejected(self):
+        user = self.create_users(1)[0]
+        quantable = self.create_quantable(user)
+        response = APIClient().get(reverse('quantable_live_updates') + f'?ids={quantable.id}')
+        self.assertEqual(response.status_code, 501)
@@ -1,281 +1,235 @@
 # quantable_app/unit_conversions.py
 
-from .enums import Category, SizeUnit, VolumeUnit, WeightUnit, LengthUnit, AreaUnit, TemperatureUnit, TimeUnit, \
-    SpeedUnit, NumberUnit, CurrencyUnit
-
-
-def convert_size(value, from_unit, to_unit):
-    if from_unit == SizeUnit.CENTIMETER.value and to_unit == SizeUnit.METER.value:
-        return value / 100
-    elif from_unit == SizeUnit.METER.value and to_unit == SizeUnit.CENTIMETER.value:
-        return value * 100
-    elif from_unit == SizeUnit.INCH.value and to_unit == SizeUnit.CENTIMETER.value:
-        return value * 2.54
-    elif from_unit == SizeUnit.CENTIMETER.value and to_unit == SizeUnit.INCH.value:
-        return value / 2.54
-    elif from_unit == SizeUnit.FOOT.value and to_unit == SizeUnit.METER.value:
-        return value * 0.3048
-    elif from_unit == SizeUnit.METER.value and to_unit == SizeUnit.FOOT.value:
-        return value / 0.3048
-    elif from_unit == SizeUnit.YARD.value and to_unit == SizeUnit.METER.value:
-        return value * 0.9144
-    elif from_unit == SizeUnit.METER.value and to_unit == SizeUnit.YARD.value:
-        return value / 0.9144
-    elif from_unit == SizeUnit.MILE.value and to_unit == SizeUnit.KILOMETER.value:
-        return value * 1.60934
-    elif from_unit == SizeUnit.KILOMETER.value and to_unit == SizeUnit.MILE.value:
-        return value / 1.60934
-    else:
-        raise ValueError(f"Unsupported unit conversion: {from_unit} to {to_unit}")
-
+from fractions import Fraction
+
+import numpy as np
+
+from . import exchange_rates
+from .enums import Category, CATEGORY_UNIT_MAPPING, SizeUnit, VolumeUnit, WeightUnit, LengthUnit, AreaUnit, \
+    TemperatureUnit, TimeUnit, SpeedUnit, NumberUnit, CurrencyUnit
+
+# Static rates (units per USD); live rates come from exchange_rates.current_snapshot()
+CURRENCY_RATES = {CurrencyUnit(unit): rate for unit, rate in exchange_rates.STATIC_RATES.items()}
+
+
+def currency_definitions(rates):
+    return {unit: (1 / Fraction(str(rates[unit.value])), 0) for unit in CurrencyUnit}
+
+
+# Every unit as (factor, offset) against its category's base unit: base = value * factor + offset
+UNIT_DEFINITIONS = {
+    Category.SIZE: {
+        SizeUnit.CENTIMETER: (0.01, 0),
+        SizeUnit.METER: (1, 0),
+        SizeUnit.INCH: (0.0254, 0),
+        SizeUnit.FOOT: (0.3048, 0),
+        SizeUnit.YARD: (0.9144, 0),
+        SizeUnit.MILE: (1609.34, 0),
+    },
+    Category.VOLUME: {
+        VolumeUnit.MILLILITER: (0.001, 0),
+        VolumeUnit.LITER: (1, 0),
+        VolumeUnit.CUBIC_CENTIMETER: (0.001, 0),
+        VolumeUnit.CUBIC_METER: (1000, 0),
+        VolumeUnit.TEASPOON: (0.00492892, 0),
+        VolumeUnit.TABLESPOON: (0.0147868, 0),
+        VolumeUnit.FLUID_OUNCE: (0.0295735, 0),
+        VolumeUnit.CUP: (0.236588, 0),
+        VolumeUnit.PINT: (0.473176, 0),
+        VolumeUnit.QUART: (0.946353, 0),
+        VolumeUnit.GALLON: (3.78541, 0),
+    },
+    Category.WEIGHT: {
+        WeightUnit.MILLIGRAM: (1e-6, 0),
+        WeightUnit.GRAM: (0.001, 0),
+        WeightUnit.KILOGRAM: (1, 0),
+        WeightUnit.OUNCE: (0.02834952, 0),
+        WeightUnit.POUND: (0.453592, 0),
+        WeightUnit.TON: (1000, 0),
+    },
+    Category.LENGTH: {
+        LengthUnit.MILLIMETER: (0.001, 0),
+        LengthUnit.CENTIMETER: (0.01, 0),
+        LengthUnit.METER: (1, 0),
+        LengthUnit.KILOMETER: (1000, 0),
+        LengthUnit.INCH: (0.0254, 0),
+        LengthUnit.FOOT: (0.3048, 0),
+        LengthUnit.YARD: (0.9144, 0),
+        LengthUnit.MILE: (1609.34, 0),
+    },
+    Category.AREA: {
+        AreaUnit.SQUARE_MILLIMETER: (1e-6, 0),
+        AreaUnit.SQUARE_CENTIMETER: (1e-4, 0),
+        AreaUnit.SQUARE_METER: (1, 0),
+        AreaUnit.SQUARE_KILOMETER: (1e6, 0),
+        AreaUnit.SQUARE_INCH: (6.4516e-4, 0),
+        AreaUnit.SQUARE_FOOT: (0.09290304, 0),
+        AreaUnit.SQUARE_YARD: (0.83612736, 0),
+        AreaUnit.SQUARE_MILE: (2589988.11, 0),
+        AreaUnit.ACRE: (4046.8564, 0),
+        AreaUnit.HECTARE: (10000, 0),
+    },
+    Category.TEMPERATURE: {
+        TemperatureUnit.CELSIUS: (1, 0),
+        TemperatureUnit.FAHRENHEIT: (Fraction(5, 9), Fraction(-32 * 5, 9)),
+        TemperatureUnit.KELVIN: (1, -273.15),
+    },
+    Category.TIME: {
+        TimeUnit.MILLISECOND: (0.001, 0),
+        TimeUnit.SECOND: (1, 0),
+        TimeUnit.MINUTE: (60, 0),
+        TimeUnit.HOUR: (3600, 0),
+        TimeUnit.DAY: (86400, 0),
+        TimeUnit.WEEK: (7 * 86400, 0),
+        TimeUnit.MONTH: (30.44 * 86400, 0),  # Average days per month
+        TimeUnit.YEAR: (365.25 * 86400, 0),  # Average days per year
+    },
+    Category.SPEED: {
+        SpeedUnit.METERS_PER_SECOND: (3.6, 0),
+        SpeedUnit.KILOMETERS_PER_HOUR: (1, 0),
+        SpeedUnit.MILES_PER_HOUR: (1.60934, 0),
+        SpeedUnit.KNOTS: (1.852, 0),
+    },
+    Category.NUMBER: {
+        NumberUnit.WHOLE: (1, 0),
+        NumberUnit.DECIMAL: (1, 0),
+        NumberUnit.PERCENTAGE: (0.01, 0),
+    },
+    Category.CURRENCY: currency_definitions(exchange_rates.STATIC_RATES),
+}
 
-def convert_volume(value, from_unit, to_unit):
-    if from_unit == VolumeUnit.MILLILITER.value and to_unit == VolumeUnit.LITER.value:
-        return value / 1000
-    elif from_unit == VolumeUnit.LITER.value and to_unit == VolumeUnit.MILLILITER.value:
-        return value * 1000
-    elif from_unit == VolumeUnit.CUBIC_CENTIMETER.value and to_unit == VolumeUnit.MILLILITER.value:
-        return value
-    elif from_unit == VolumeUnit.MILLILITER.value and to_unit == VolumeUnit.CUBIC_CENTIMETER.value:
-        return value
-    elif from_unit == VolumeUnit.CUBIC_METER.value and to_unit == VolumeUnit.LITER.value:
-        return value * 1000
-    elif from_unit == VolumeUnit.LITER.value and to_unit == VolumeUnit.CUBIC_METER.value:
-        return value / 1000
-    elif from_unit == VolumeUnit.TEASPOON.value and to_unit == VolumeUnit.MILLILITER.value:
-        return value * 4.92892
-    elif from_unit == VolumeUnit.MILLILITER.value and to_unit == VolumeUnit.TEASPOON.value:
-        return value / 4.92892
-    elif from_unit == VolumeUnit.TABLESPOON.value and to_unit == VolumeUnit.MILLILITER.value:
-        return value * 14.7868
-    elif from_unit == VolumeUnit.MILLILITER.value and to_unit == VolumeUnit.TABLESPOON.value:
-        return value / 14.7868
-    elif from_unit == VolumeUnit.FLUID_OUNCE.value and to_unit == VolumeUnit.MILLILITER.value:
-        return value * 29.5735
-    elif from_unit == VolumeUnit.MILLILITER.value and to_unit == VolumeUnit.FLUID_OUNCE.value:
-        return value / 29.5735
-    elif from_unit == VolumeUnit.CUP.value and to_unit == VolumeUnit.MILLILITER.value:
-        return value * 236.588
-    elif from_unit == VolumeUnit.MILLILITER.value and to_unit == VolumeUnit.CUP.value:
-        return value / 236.588
-    elif from_unit == VolumeUnit.PINT.value and to_unit == VolumeUnit.LITER.value:
-        return value * 0.473176
-    elif from_unit == VolumeUnit.LITER.value and to_unit == VolumeUnit.PINT.value:
-        return value / 0.473176
-    elif from_unit == VolumeUnit.QUART.value and to_unit == VolumeUnit.LITER.value:
-        return value * 0.946353
-    elif from_unit == VolumeUnit.LITER.value and to_unit == VolumeUnit.QUART.value:
-        return value / 0.946353
-    elif from_unit == VolumeUnit.GALLON.value and to_unit == VolumeUnit.LITER.value:
-        return value * 3.78541
-    elif from_unit == VolumeUnit.LITER.value and to_unit == VolumeUnit.GALLON.value:
-        return value / 3.78541
-    else:
-        raise ValueError(f"Unsupported unit conversion: {from_unit} to {to_unit}")
+# Fields of a serialized quantable that hold vote values, and those that hold differences between them
+# (a spread only scales: a 10 °C standard deviation is 18 °F, not 50 °F)
+VALUE_FIELDS = ['vote_average', 'vote_median', 'vote_q1', 'vote_q3', 'vote_min', 'vote_max']
+SPREAD_FIELDS = ['vote_stddev', 'vote_iqr']
 
 
-def convert_weight(value, from_unit, to_unit):
-    if from_unit == WeightUnit.MILLIGRAM.value and to_unit == WeightUnit.GRAM.value:
-        return value / 1000
-    elif from_unit == WeightUnit.GRAM.value and to_unit == WeightUnit.MILLIGRAM.value:
-        return value * 1000
-    elif from_unit == WeightUnit.GRAM.value and to_unit == WeightUnit.KILOGRAM.value:
-        return value / 1000
-    elif from_unit == WeightUnit.KILOGRAM.value and to_unit == WeightUnit.GRAM.value:
-        return value * 1000
-    elif from_unit == WeightUnit.OUNCE.value and to_unit == WeightUnit.GRAM.value:
-        return value * 28.34952
-    elif from_unit == WeightUnit.GRAM.value and to_unit == WeightUnit.OUNCE.value:
-        return value / 28.34952
-    elif from_unit == WeightUnit.POUND.value and to_unit == WeightUnit.KILOGRAM.value:
-        return value * 0.453592
-    elif from_unit == WeightUnit.KILOGRAM.value and to_unit == WeightUnit.POUND.value:
-        return value / 0.453592
-    elif from_unit == WeightUnit.TON.value and to_unit == WeightUnit.KILOGRAM.value:
-        return value * 1000
-    elif from_unit == WeightUnit.KILOGRAM.value and to_unit == WeightUnit.TON.value:
-        return value / 1000
-    else:
-        raise ValueError(f"Unsupported unit conversion: {from_unit} to {to_unit}")
+def _exact(number):
+    # Decimal literals such as 0.3048 are taken at face value so compiled coefficients round only once
+    return Fraction(str(number)) if isinstance(number, float) else Fraction(number)
 
 
-def convert_length(value, from_unit, to_unit):
-    if from_unit == LengthUnit.MILLIMETER.value and to_unit == LengthUnit.CENTIMETER.value:
-        return value / 10
-    elif from_unit == LengthUnit.CENTIMETER.value and to_unit == LengthUnit.MILLIMETER.value:
-        return value * 10
-    elif from_unit == LengthUnit.CENTIMETER.value and to_unit == LengthUnit.METER.value:
-        return value / 100
-    elif from_unit == LengthUnit.METER.value and to_unit == LengthUnit.CENTIMETER.value:
-        return value * 100
-    elif from_unit == LengthUnit.METER.value and to_unit == LengthUnit.KILOMETER.value:
-        return value / 1000
-    elif from_unit == LengthUnit.KILOMETER.value and to_unit == LengthUnit.METER.value:
-        return value * 1000
-    elif from_unit == LengthUnit.INCH.value and to_unit == LengthUnit.CENTIMETER.value:
-        return value * 2.54
-    elif from_unit == LengthUnit.CENTIMETER.value and to_unit == LengthUnit.INCH.value:
-        return value / 2.54
-    elif from_unit == LengthUnit.FOOT.value and to_unit == LengthUnit.METER.value:
-        return value * 0.3048
-    elif from_unit == LengthUnit.METER.value and to_unit == LengthUnit.FOOT.value:
-        return value / 0.3048
-    elif from_unit == LengthUnit.YARD.value and to_unit == LengthUnit.METER.value:
-        return value * 0.9144
-    elif from_unit == LengthUnit.METER.value and to_unit == LengthUnit.YARD.value:
-        return value / 0.9144
-    elif from_unit == LengthUnit.MILE.value and to_unit == LengthUnit.KILOMETER.value:
-        return value * 1.60934
-    elif from_unit == LengthUnit.KILOMETER.value and to_unit == LengthUnit.MILE.value:
-        return value / 1.60934
-    else:
-        raise ValueError(f"Unsupported unit conversion: {from_unit} to {to_unit}")
+def compile_category(category, units):
+    """(category, from_unit, to_unit) -> (scale, shift) for every pair of one category's units."""
+    missing = [unit.value for unit in CATEGORY_UNIT_MAPPING[category] if unit not in units]
+    if missing:
+        raise ValueError(f"No conversion defined for {category.value} units: {', '.join(missing)}")
+    conversions = {}
+    for from_unit, (from_factor, from_offset) in units.items():
+        for to_unit, (to_factor, to_offset) in units.items():
+            scale = _exact(from_factor) / _exact(to_factor)
+            shift = (_exact(from_offset) - _exact(to_offset)) / _exact(to_factor)
+            conversions[(category, from_unit.value, to_unit.value)] = (float(scale), float(shift))
+    return conversions
 
 
-def convert_area(value, from_unit, to_unit):
-    if from_unit == AreaUnit.SQUARE_MILLIMETER.value and to_unit == AreaUnit.SQUARE_CENTIMETER.value:
-        return value / 100
-    elif from_unit == AreaUnit.SQUARE_CENTIMETER.value and to_unit == AreaUnit.SQUARE_MILLIMETER.value:
-        return value * 100
-    elif from_unit == AreaUnit.SQUARE_CENTIMETER.value and to_unit == AreaUnit.SQUARE_METER.value:
-        return value / 10000
-    elif from_unit == AreaUnit.SQUARE_METER.value and to_unit == AreaUnit.SQUARE_CENTIMETER.value:
-        return value * 10000
-    elif from_unit == AreaUnit.SQUARE_METER.value and to_unit == AreaUnit.SQUARE_KILOMETER.value:
-        return value / 1e6
-    elif from_unit == AreaUnit.SQUARE_KILOMETER.value and to_unit == AreaUnit.SQUARE_METER.value:
-        return value * 1e6
-    elif from_unit == AreaUnit.SQUARE_INCH.value and to_unit == AreaUnit.SQUARE_CENTIMETER.value:
-        return value * 6.4516
-    elif from_unit == AreaUnit.SQUARE_CENTIMETER.value and to_unit == AreaUnit.SQUARE_INCH.value:
-        return value / 6.4516
-    elif from_unit == AreaUnit.SQUARE_FOOT.value and to_unit == AreaUnit.SQUARE_METER.value:
-        return value * 0.09290304
-    elif from_unit == AreaUnit.SQUARE_METER.value and to_unit == AreaUnit.SQUARE_FOOT.value:
-        return value / 0.09290304
-    elif from_unit == AreaUnit.SQUARE_YARD.value and to_unit == AreaUnit.SQUARE_METER.value:
-        return value * 0.83612736
-    elif from_unit == AreaUnit.SQUARE_METER.value and to_unit == AreaUnit.SQUARE_YARD.value:
-        return value / 0.83612736
-    elif from_unit == AreaUnit.SQUARE_MILE.value and to_unit == AreaUnit.SQUARE_KILOMETER.value:
-        return value * 2.58998811
-    elif from_unit == AreaUnit.SQUARE_KILOMETER.value and to_unit == AreaUnit.SQUARE_MILE.value:
-        return value / 2.58998811
-    elif from_unit == AreaUnit.ACRE.value and to_unit == AreaUnit.HECTARE.value:
-        return value * 0.40468564
-    elif from_unit == AreaUnit.HECTARE.value and to_unit == AreaUnit.ACRE.value:
-        return value / 0.40468564
-    else:
-        raise ValueError(f"Unsupported unit conversion: {from_unit} to {to_unit}")
+def compile_conversions(unit_definitions):
+    """(category, from_unit, to_unit) -> (scale, shift) for every pair of units, so that to = from * scale + shift."""
+    conversions = {}
+    for category in CATEGORY_UNIT_MAPPING:
+        conversions.update(compile_category(category, unit_definitions[category]))
+    return conversions
 
 
-def convert_temperature(value, from_unit, to_unit):
-    if from_unit == TemperatureUnit.CELSIUS.value and to_unit == TemperatureUnit.FAHRENHEIT.value:
-        return (value * 9/5) + 32
-    elif from_unit == TemperatureUnit.FAHRENHEIT.value and to_unit == TemperatureUnit.CELSIUS.value:
-        return (value - 32) * 5/9
-    elif from_unit == TemperatureUnit.CELSIUS.value and to_unit == TemperatureUnit.KELVIN.value:
-        return value + 273.15
-    elif from_unit == TemperatureUnit.KELVIN.value and to_unit == TemperatureUnit.CELSIUS.value:
-        return value - 273.15
-    elif from_unit == TemperatureUnit.FAHRENHEIT.value and to_unit == TemperatureUnit.KELVIN.value:
-        return (value + 459.67) * 5/9
-    elif from_unit == TemperatureUnit.KELVIN.value and to_unit == TemperatureUnit.FAHRENHEIT.value:
-        return (value * 9/5) - 459.67
-    else:
-        raise ValueError(f"Unsupported unit conversion: {from_unit} to {to_unit}")
+CONVERSIONS = compile_conversions(UNIT_DEFINITIONS)
 
 
-def convert_time(value, from_unit, to_unit):
-    if from_unit == TimeUnit.MILLISECOND.value and to_unit == TimeUnit.SECOND.value:
-        return value / 1000
-    elif from_unit == TimeUnit.SECOND.value and to_unit == TimeUnit.MILLISECOND.value:
-        return value * 1000
-    elif from_unit == TimeUnit.SECOND.value and to_unit == TimeUnit.MINUTE.value:
-        return value / 60
-    elif from_unit == TimeUnit.MINUTE.value and to_unit == TimeUnit.SECOND.value:
-        return value * 60
-    elif from_unit == TimeUnit.MINUTE.value and to_unit == TimeUnit.HOUR.value:
-        return value / 60
-    elif from_unit == TimeUnit.HOUR.value and to_unit == TimeUnit.MINUTE.value:
-        return value * 60
-    elif from_unit == TimeUnit.HOUR.value and to_unit == TimeUnit.DAY.value:
-        return value / 24
-    elif from_unit == TimeUnit.DAY.value and to_unit == TimeUnit.HOUR.value:
-        return value * 24
-    elif from_unit == TimeUnit.DAY.value and to_unit == TimeUnit.WEEK.value:
-        return value / 7
-    elif from_unit == TimeUnit.WEEK.value and to_unit == TimeUnit.DAY.value:
-        return value * 7
-    elif from_unit == TimeUnit.MONTH.value and to_unit == TimeUnit.DAY.value:
-        return value * 30.44  # Average days per month
-    elif from_unit == TimeUnit.DAY.value and to_unit == TimeUnit.MONTH.value:
-        return value / 30.44
-    elif from_unit == TimeUnit.YEAR.value and to_unit == TimeUnit.DAY.value:
-        return value * 365.25  # Average days per year
-    elif from_unit == TimeUnit.DAY.value and to_unit == TimeUnit.YEAR.value:
-        return value / 365.25
-    else:
-        raise ValueError(f"Unsupported unit conversion: {from_unit} to {to_unit}")
+# (rate snapshot version, compiled currency conversions), recompiled when the snapshot changes
+_currency_conversions = (None, {})
 
 
-def convert_speed(value, from_unit, to_unit):
-    if from_unit == SpeedUnit.METERS_PER_SECOND.value and to_unit == SpeedUnit.KILOMETERS_PER_HOUR.value:
-        return value * 3.6
-    elif from_unit == SpeedUnit.KILOMETERS_PER_HOUR.value and to_unit == SpeedUnit.METERS_PER_SECOND.value:
-        return value / 3.6
-    elif from_unit == SpeedUnit.MILES_PER_HOUR.value and to_unit == SpeedUnit.KILOMETERS_PER_HOUR.value:
-        return value * 1.60934
-    elif from_unit == SpeedUnit.KILOMETERS_PER_HOUR.value and to_unit == SpeedUnit.MILES_PER_HOUR.value:
-        return value / 1.60934
-    elif from_unit == SpeedUnit.KNOTS.value and to_unit == SpeedUnit.KILOMETERS_PER_HOUR.value:
-        return value * 1.852
-    elif from_unit == SpeedUnit.KILOMETERS_PER_HOUR.value and to_unit == SpeedUnit.KNOTS.value:
-        return value / 1.852
-    else:
-        raise ValueError(f"Unsupported unit conversion: {from_unit} to {to_unit}")
+def currency_conversions():
+    global _currency_conversions
+    snapshot = exchange_rates.current_snapshot()
+    version, conversions = _currency_conversions
+    if version != snapshot.version:
+        conversions = compile_category(Category.CURRENCY, currency_definitions(snapshot.rates))
+        _currency_conversions = (snapshot.version, conversions)
+    return conversions
 
 
-def convert_number(value, from_unit, to_unit):
-    if from_unit == NumberUnit.WHOLE.value and to_unit == NumberUnit.DECIMAL.value:
-        return float(value)
-    elif from_unit == NumberUnit.DECIMAL.value and to_unit == NumberUnit.WHOLE.value:
-        return int(value)
-    elif from_unit == NumberUnit.PERCENTAGE.value and to_unit == NumberUnit.DECIMAL.value:
-        return value / 100
-    elif from_unit == NumberUnit.DECIMAL.value and to_unit == NumberUnit.PERCENTAGE.value:
-        return value * 100
-    else:
+def get_coefficients(category, from_unit, to_unit):
+    conversions = currency_conversions() if category == Category.CURRENCY else CONVERSIONS
+    try:
+        return conversions[(category, from_unit, to_unit)]
+    except KeyError:
         raise ValueError(f"Unsupported unit conversion: {from_unit} to {to_unit}")
 
 
-def convert_currency(value, from_unit, to_unit):
+def convert(category, value, from_unit, to_unit):
     if value is None:
         return None
-
-    # Hardcoded conversion rates for development purposes
-    conversion_rates = {
-        CurrencyUnit.USD.value: 1.0,
-        CurrencyUnit.EUR.value: 0.92,
-        CurrencyUnit.GBP.value: 0.81,
-        CurrencyUnit.JPY.value: 135.0,
-        CurrencyUnit.CAD.value: 1.32,
-        CurrencyUnit.AUD.value: 1.47,
-        CurrencyUnit.CHF.value: 0.96,
-        CurrencyUnit.CNY.value: 6.80,
-        CurrencyUnit.HKD.value: 7.75,
-        CurrencyUnit.SGD.value: 1.37,
-    }
-
-    if from_unit not in conversion_rates or to_unit not in conversion_rates:
-        raise ValueError(f"Unsupported currency units: {from_unit} to {to_unit}")
-
-    if from_unit == to_unit:
-        return value
-
-    usd_value = value / conversion_rates[from_unit]
-    converted_value = usd_value * conversion_rates[to_unit]
-    return converted_value
+    scale, shift = get_coefficients(category, from_unit, to_unit)
+    return value * scale + shift
+
+
+def convert_values(category, values, from_unit, to_unit):
+    """Convert a NumPy array or list of values in one vectorized operation."""
+    scale, shift = get_coefficients(category, from_unit, to_unit)
+    return np.asarray(values, dtype=float) * scale + shift
+
+
+def convert_stats(category, data, from_unit, to_unit, ndigits=None):
+    """Convert the vote_* fields of a serialized quantable in place."""
+    scale, shift = get_coefficients(category, from_unit, to_unit)
+    for fields, field_shift in ((VALUE_FIELDS, shift), (SPREAD_FIELDS, 0)):
+        for key in fields:
+            value = data.get(key)
+            if value is not None:
+                value = value * scale + field_shift
+                data[key] = value if ndigits is None else round(value, ndigits)
+    return data
+
+
+def convert_bins(category, bins, from_unit, to_unit, ndigits=None):
+    """Convert the edges of a list of histogram bins in place."""
+    if not bins:
+        return bins
+    scale, shift = get_coefficients(category, from_unit, to_unit)
+    edges = np.array([[bin_data['bin_min'], bin_data['bin_max']] for bin_data in bins]) * scale + shift
+    if ndigits is not None:
+        edges = edges.round(ndigits)
+    for bin_data, (bin_min, bin_max) in zip(bins, edges.tolist()):
+        bin_data['bin_min'] = bin_min
+        bin_data['bin_max'] = bin_max
+    return bins
+
+
+def convert_currency_values(values, from_unit, to_unit):
+    """Convert an array of amounts at the current exchange rates in one vectorized operation."""
+    return convert_values(Category.CURRENCY, values, from_unit, to_unit)
+
+
+def convert_distribution(category, points, from_unit, to_unit):
+    """Convert the values of distribution points in place, rescaling densities so the curve still integrates to 1."""
+    if not points:
+        return points
+    scale, shift = get_coefficients(category, from_unit, to_unit)
+    for point in points:
+        point['value'] = point['value'] * scale + shift
+        if 'density' in point:
+            point['density'] = point['density'] / abs(scale)
+    return points
+
+
+def _category_converter(category):
+    def convert_category(value, from_unit, to_unit):
+        return convert(category, value, from_unit, to_unit)
+
+    convert_category.__name__ = f'convert_{category.value}'
+    return convert_category
+
+
+convert_size = _category_converter(Category.SIZE)
+convert_volume = _category_converter(Category.VOLUME)
+convert_weight = _category_converter(Category.WEIGHT)
+convert_length = _category_converter(Category.LENGTH)
+convert_area = _category_converter(Category.AREA)
+convert_temperature = _category_converter(Category.TEMPERATURE)
+convert_time = _category_converter(Category.TIME)
+convert_speed = _category_converter(Category.SPEED)
+convert_number = _category_converter(Category.NUMBER)
+convert_currency = _category_converter(Category.CURRENCY)
 
 
 UNIT_CONVERSION_FUNCTIONS = {
@@ -290,5 +244,3 @@ UNIT_CONVERSION_FUNCTIONS = {
     Category.NUMBER: convert_number,
     Category.CURRENCY: convert_currency,
 }
-
-
@@ -3,18 +3,37 @@
 from django.urls import path
 from .views import (
     CreateQuantableView, QuantableListView, QuantableDetailView,
-    VoteCreateView, VoteRetrieveUpdateDestroyView, CategoryListView, UnitListView, UserQuantablePreferenceView,
-    QuantablePairDetailView,
+    VoteCreateView, VoteBulkCreateView, VoteRetrieveUpdateDestroyView, CategoryListView, UnitListView, UserQuantablePreferenceView,
+    QuantablePairDetailView, UserCategoryUnitPreferenceView, QuantableDistributionView,
+    QuantableVoteValuesView, QuantableBatchDetailView, RequestMetricsView,
+)
+from .async_views import (
+    AsyncQuantableListView, AsyncQuantableDetailView, AsyncQuantablePairDetailView, AsyncCategoryListView,
+    AsyncUnitListView, QuantableLiveUpdatesView,
 )
 
 urlpatterns = [
     path('quantables/create/', CreateQuantableView.as_view(), name='create_quantable'),
     path('quantables/list/', QuantableListView.as_view(), name='quantable_list'),
     path('quantables/detail/<int:pk>/', QuantableDetailView.as_view(), name='quantable_detail'),
+    path('quantables/batch/', QuantableBatchDetailView.as_view(), name='quantable_batch_detail'),
+    path('quantables/distribution/<int:pk>/', QuantableDistributionView.as_view(), name='quantable_distribution'),
+    path('quantables/vote-values/<int:pk>/', QuantableVoteValuesView.as_view(), name='quantable_vote_values'),
     path('votes/create/', VoteCreateView.as_view(), name='create_vote'),
+    path('votes/bulk/', VoteBulkCreateView.as_view(), name='bulk_create_votes'),
     path('votes/detail/<int:pk>/', VoteRetrieveUpdateDestroyView.as_view(), name='vote_detail'),
     path('categories/', CategoryListView.as_view(), name='category_list'),
     path('units/<str:category>/', UnitListView.as_view(), name='unit_list'),
     path('preferences/update/', UserQuantablePreferenceView.as_view(), name='update_preference'),
+    path('preferences/category/update/', UserCategoryUnitPreferenceView.as_view(), name='update_category_preference'),
     path('quantable-pairs/<str:pair_id>/', QuantablePairDetailView.as_view(), name='quantable_pair_detail'),
+    path('metrics/requests/', RequestMetricsView.as_view(), name='request_metrics'),
+    # Async versions of the read endpoints, for ASGI deployments
+    path('async/quantables/list/', AsyncQuantableListView.as_view(), name='async_quantable_list'),
+    path('async/quantables/detail/<int:pk>/', AsyncQuantableDetailView.as_view(), name='async_quantable_detail'),
+    path('async/quantable-pairs/<str:pair_id>/', AsyncQuantablePairDetailView.as_view(),
+         name='async_quantable_pair_detail'),
+    path('async/categories/', AsyncCategoryListView.as_view(), name='async_category_list'),
+    path('async/units/<str:category>/', AsyncUnitListView.as_view(), name='async_unit_list'),
+    path('quantables/live/', QuantableLiveUpdatesView.as_view(), name='quantable_live_updates'),
 ]
\ No newline at end of file
@@ -1,16 +1,26 @@
 # quantable_app/views.py
 
+from django.conf import settings
+from django.core.cache import caches
 from rest_framework import generics, permissions, request, status
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError, NotFound
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
-from . import serializers
-from .models import Quantable, Vote, UserQuantablePreference
-from .serializers import QuantableSerializer, VoteSerializer, CategorySerializer, UserQuantablePreferenceSerializer, \
-    QuantablePairSerializer
+from . import payloads, response_cache
+from .models import Quantable, QuantablePair, Vote, UserQuantablePreference, UserCategoryUnitPreference
+from .serializers import QuantableSerializer, VoteSerializer, BulkVoteSerializer, CategorySerializer, UserQuantablePreferenceSerializer, \
+    UserCategoryUnitPreferenceSerializer, QuantablePairSerializer
 from .enums import Category, CATEGORY_UNIT_MAPPING
-from .unit_conversions import UNIT_CONVERSION_FUNCTIONS
+from .pagination import QuantableKeysetPagination
+from .renderers import VoteValuesRenderer, Float32VoteValuesRenderer, Float64VoteValuesRenderer
+from .preferences import resolve_preferred_unit, resolve_preferred_units
+from .unit_conversions import convert_values, convert_distribution
+from . import histograms
+from .instrumentation import registry, timer
+from .vote_ingest import ingest_votes
+from .vote_storage import get_storage
 
 
 import numpy as np
@@ -91,81 +101,33 @@ class QuantableListView(generics.ListAPIView):
 
     def list(self, request, *args, **kwargs):
         try:
-            queryset = self.get_queryset()
-
-
             # Get the sorting option from the request query parameters
             sort_option = request.query_params.get('sort', 'newest')
+            include_vote_values = request.query_params.get('include_vote_values', '').lower() in ('1', 'true')
 
-            # Apply sorting based on the selected option
-            if sort_option == 'newest':
-                queryset = queryset.order_by('-created_at')
-            elif sort_option == 'oldest':
-                queryset = queryset.order_by('created_at')
-            elif sort_option == 'total_votes':
-                queryset = queryset.order_by('-vote_count')
+            paginator = QuantableKeysetPagination(request, sort_option)
+            page = paginator.paginate_queryset(self.get_queryset().select_related(
+                'histogram', 'min_of_pair__max_quantable__histogram', 'max_of_pair__min_quantable__histogram'
+            ))
+            pairs, quantables = payloads.page_with_partners(page)
+            Quantable.refresh_stale_vote_data(quantables)
 
-            serializer = self.get_serializer(queryset, many=True)
-            data = serializer.data
+            # Everything the rows need is bulk-loaded up front, so the number of queries
+            # does not grow with the number of quantables and nothing is written on read.
+            quantable_ids = [quantable.id for quantable in quantables]
 
-            quantable_pairs = {}
-            individual_quantables = []
-
-            for quantable_data in data:
-                quantable = Quantable.objects.get(id=quantable_data['id'])
-                user = request.user
-
-                if user.is_authenticated:
-                    preference, _ = UserQuantablePreference.objects.get_or_create(user=user, quantable=quantable)
-                    preferred_unit = preference.preferred_unit
-                else:
-                    preferred_unit = quantable.default_unit
-
-                quantable_data['preferred_unit'] = preferred_unit or quantable.default_unit
-                quantable_data['freedman_diaconis_bins'] = quantable.freedman_diaconis_bins()
-
-                # Identify fields that should undergo unit conversion
-                fields_for_conversion = [
-                    'vote_average', 'vote_median', 'vote_stddev',
-                    'vote_q1', 'vote_q3', 'vote_iqr', 'vote_min', 'vote_max'
-                ]
-
-                if preferred_unit and preferred_unit != quantable.default_unit:
-                    conversion_function = UNIT_CONVERSION_FUNCTIONS.get(Category(quantable.category))
-                    if conversion_function:
-                        for key in fields_for_conversion:
-                            value = quantable_data.get(key)
-                            if value is not None:
-                                quantable_data[key] = conversion_function(value, quantable.default_unit, preferred_unit)
-
-                if quantable_data['pair_id']:
-                    pair_id = quantable_data['pair_id']
-                    if pair_id not in quantable_pairs:
-                        quantable_pairs[pair_id] = {'min_quantable': None, 'max_quantable': None}
-                    if quantable_data['is_min']:
-                        quantable_pairs[pair_id]['min_quantable'] = quantable_data
-                    else:
-                        quantable_pairs[pair_id]['max_quantable'] = quantable_data
-                else:
-                    individual_quantables.append(quantable_data)
-
-            # Prepare the response data
-            response_data = []
-
-            for pair_id, pair_data in quantable_pairs.items():
-                min_quantable = pair_data['min_quantable']
-                max_quantable = pair_data['max_quantable']
-                if min_quantable and max_quantable:
-                    response_data.append({
-                        'pair_id': pair_id,
-                        'min_quantable': min_quantable,
-                        'max_quantable': max_quantable,
-                        'type': 'pair'
-                    })
-
-            response_data.extend(individual_quantables)
-
-            return Response(response_data)
+            vote_values = {quantable_id: [] for quantable_id in quantable_ids}
+            if include_vote_values:
+                vote_values = get_storage().vote_values(quantable_ids)
+
+            preferred_units = resolve_preferred_units(request.user, quantables)
+
+            quantable_data_by_id = payloads.build_list_rows(
+                quantables, vote_values, preferred_units, include_vote_values
+            )
+            response_data = payloads.list_results(page, pairs, quantable_data_by_id, paginator)
+
+            return Response(paginator.get_paginated_response_data(response_data))
         except ValueError as e:
             # Handle the ValueError exception
             error_message = str(e)
@@ -173,68 +135,26 @@ class QuantableListView(generics.ListAPIView):
 
 
 class QuantableDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Quantable.objects.all()
+    queryset = Quantable.objects.select_related('histogram')
     serializer_class = QuantableSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        data = serializer.data
+        Quantable.refresh_stale_vote_data([instance])
 
         user = request.user
-        if user.is_authenticated:
-            preference, _ = UserQuantablePreference.objects.get_or_create(user=user, quantable=instance)
-            preferred_unit = preference.preferred_unit
-            user_vote = Vote.objects.filter(user=user, quantable=instance).first()
-            if user_vote:
-                data['user_vote'] = user_vote.value
-                if preferred_unit and preferred_unit != instance.default_unit:
-                    conversion_function = UNIT_CONVERSION_FUNCTIONS.get(Category(instance.category))
-                    if conversion_function:
-                        data['user_vote'] = conversion_function(user_vote.value, instance.default_unit, preferred_unit)
-        else:
-            preferred_unit = instance.default_unit
+        preferred_unit = resolve_preferred_unit(user, instance)
 
-        # Identify fields that should undergo unit conversion
-        fields_for_conversion = [
-            'vote_values', 'vote_average', 'vote_median', 'vote_stddev',
-            'vote_q1', 'vote_q3', 'vote_iqr', 'vote_min', 'vote_max'
-        ]
+        data = response_cache.get_or_build(
+            'detail', [instance.id], preferred_unit, lambda: payloads.build_detail_payload(instance, preferred_unit)
+        )
 
-        if preferred_unit and preferred_unit != instance.default_unit:
-            conversion_function = UNIT_CONVERSION_FUNCTIONS.get(Category(instance.category))
-            if conversion_function:
-                converted_data = {}
-                for key, value in data.items():
-                    if key in fields_for_conversion:
-                        if key == 'vote_values':
-                            converted_data[key] = [conversion_function(vote, instance.default_unit, preferred_unit) for
-                                                   vote in value]
-                        elif value is not None:  # Check if the value is not None before conversion
-                            converted_data[key] = conversion_function(value, instance.default_unit, preferred_unit)
-                        else:
-                            converted_data[key] = value
-                    else:
-                        converted_data[key] = value
-                data = converted_data
-
-        data['preferred_unit'] = preferred_unit or instance.default_unit
-        data['available_units'] = [unit for unit in instance.available_units if unit != instance.default_unit]
-        data['freedman_diaconis_bins'] = instance.freedman_diaconis_bins()
-
-        ninety_percent_range = instance.ninety_percent_vote_range()
-        if ninety_percent_range:
-            nmin, nmax = ninety_percent_range
-            data['ninety_percent_vote_range'] = {
-                'nmin': nmin,
-                'nmax': nmax,
-                'statement': f"90% of our community think that the correct answer is somewhere between {nmin:.2f} and {nmax:.2f} {preferred_unit or instance.default_unit}."
-            }
-        else:
-            data['ninety_percent_vote_range'] = None
+        user_vote = None
+        if user.is_authenticated:
+            user_vote = get_storage().user_votes(user, [instance.id]).get(instance.id)
 
-        return Response(data)
+        return Response(payloads.with_detail_user_vote(data, instance, user_vote, preferred_unit))
 
 
 class QuantablePairDetailView(generics.RetrieveAPIView):
@@ -242,130 +162,276 @@ class QuantablePairDetailView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get_object(self):
-        pair_id = self.kwargs['pair_id']
-        pair_quantables = Quantable.objects.filter(pair_id=pair_id)
-        if pair_quantables.count() != 2:
+        try:
+            return QuantablePair.objects.select_related(
+                'min_quantable__histogram', 'max_quantable__histogram'
+            ).get(pair_id=self.kwargs['pair_id'])
+        except QuantablePair.DoesNotExist:
             raise NotFound("Quantable pair not found.")
-        return pair_quantables
 
     def retrieve(self, request, *args, **kwargs):
-        pair_quantables = self.get_object()
-        min_quantable = pair_quantables.filter(is_min=True).first()
-        max_quantable = pair_quantables.filter(is_min=False).first()
+        pair = self.get_object()
+        min_quantable, max_quantable = pair.min_quantable, pair.max_quantable
+        Quantable.refresh_stale_vote_data([min_quantable, max_quantable])
 
-        if min_quantable is None or max_quantable is None:
-            return Response({'detail': 'Quantable pair not found.'}, status=status.HTTP_404_NOT_FOUND)
+        user = request.user
+        # A unit passed in the query applies to this response only; otherwise the user's stored preferences apply
+        preferred_unit = request.query_params.get('preferred_unit') or resolve_preferred_unit(user, min_quantable)
 
-        preferred_unit = request.query_params.get('preferred_unit')
-        print(f"Preferred unit from request: {preferred_unit}")
+        payload = response_cache.get_or_build(
+            'pair', [min_quantable.id, max_quantable.id], preferred_unit,
+            lambda: payloads.build_pair_payload(min_quantable, max_quantable, preferred_unit)
+        )
 
-        user = request.user
+        user_votes = None
         if user.is_authenticated:
-            min_preference, _ = UserQuantablePreference.objects.get_or_create(user=user, quantable=min_quantable)
-            min_preference.preferred_unit = preferred_unit
-            min_preference.save()
-
-            max_preference, _ = UserQuantablePreference.objects.get_or_create(user=user, quantable=max_quantable)
-            max_preference.preferred_unit = preferred_unit
-            max_preference.save()
+            user_votes = get_storage().user_votes(user, [min_quantable.id, max_quantable.id])
 
-        min_quantable_data = QuantableSerializer(min_quantable).data
-        max_quantable_data = QuantableSerializer(max_quantable).data
+        serializer = self.get_serializer(
+            payloads.with_pair_user_votes(payload, min_quantable, max_quantable, user_votes, preferred_unit)
+        )
+        with timer('serializer'):
+            data = serializer.data
+        return Response(data)
 
-        min_user_vote = min_quantable.vote_set.filter(user=user).first()
-        max_user_vote = max_quantable.vote_set.filter(user=user).first()
 
-        if min_user_vote:
-            min_quantable_data['user_vote'] = min_user_vote.value
-        else:
-            min_quantable_data['user_vote'] = None
+class QuantableBatchDetailView(APIView):
+    """
+    The detail payloads of many quantables (?ids=1,2,3) and pairs (?pair_ids=a,b) in one response, as
+    quantable_detail and quantable_pair_detail return them, read with a fixed number of queries however
+    many are asked for. ?preferred_unit= applies to every quantable that offers the unit; the others
+    use the user's stored preferences. Ids that do not exist are listed under not_found.
+    """
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
-        if max_user_vote:
-            max_quantable_data['user_vote'] = max_user_vote.value
-        else:
-            max_quantable_data['user_vote'] = None
+    def get(self, request, *args, **kwargs):
+        try:
+            quantable_ids = self.parse_ids('ids', int)
+        except ValueError:
+            raise ValidationError({'ids': 'A comma-separated list of quantable ids is expected.'})
+        pair_ids = self.parse_ids('pair_ids', str)
+        if not quantable_ids and not pair_ids:
+            raise ValidationError({'ids': 'Pass quantable ids in ?ids=, pair ids in ?pair_ids=, or both.'})
+        max_items = getattr(settings, 'QUANTABLE_BATCH_DETAIL_MAX_ITEMS', 100)
+        if len(quantable_ids) + len(pair_ids) > max_items:
+            raise ValidationError({'ids': f'At most {max_items} quantables and pairs can be read at once.'})
+
+        quantables = Quantable.objects.select_related('histogram').in_bulk(quantable_ids)
+        pairs = QuantablePair.objects.select_related(
+            'min_quantable__histogram', 'max_quantable__histogram'
+        ).in_bulk(pair_ids, field_name='pair_id')
+        quantables = [quantables[quantable_id] for quantable_id in quantable_ids if quantable_id in quantables]
+        pairs = [pairs[pair_id] for pair_id in pair_ids if pair_id in pairs]
+
+        everything = quantables + [side for pair in pairs for side in (pair.min_quantable, pair.max_quantable)]
+        Quantable.refresh_stale_vote_data(everything)
 
-        min_quantable_data['freedman_diaconis_bins'] = min_quantable.freedman_diaconis_bins()
-        max_quantable_data['freedman_diaconis_bins'] = max_quantable.freedman_diaconis_bins()
+        user = request.user
+        unit = request.query_params.get('preferred_unit')
+        preferred_units = resolve_preferred_units(user, everything)
+        for quantable in everything:
+            if unit and (unit == quantable.default_unit or unit in quantable.available_units):
+                preferred_units[quantable.id] = unit
 
-        if preferred_unit and preferred_unit != min_quantable.default_unit:
-            conversion_function = UNIT_CONVERSION_FUNCTIONS.get(Category(min_quantable.category))
-            if conversion_function:
-                self.apply_unit_conversion(min_quantable_data, conversion_function, min_quantable.default_unit, preferred_unit)
-                self.apply_unit_conversion(max_quantable_data, conversion_function, max_quantable.default_unit, preferred_unit)
+        user_votes = None
+        if user.is_authenticated:
+            user_votes = get_storage().user_votes(user, [quantable.id for quantable in everything])
+
+        details = response_cache.get_or_build_many(
+            'detail', [([quantable.id], preferred_units[quantable.id]) for quantable in quantables],
+            lambda entries: self.build_details(quantables, entries),
+        )
+        # A pair is shown in its min side's unit, as quantable_pair_detail does
+        pair_payloads = response_cache.get_or_build_many(
+            'pair', [([pair.min_quantable_id, pair.max_quantable_id], preferred_units[pair.min_quantable_id])
+                     for pair in pairs],
+            lambda entries: self.build_pairs(pairs, entries),
+        )
+
+        return Response({
+            'quantables': {
+                quantable.id: payloads.with_detail_user_vote(
+                    data, quantable, (user_votes or {}).get(quantable.id), preferred_units[quantable.id]
+                ) for quantable, data in zip(quantables, details)
+            },
+            'pairs': {
+                pair.pair_id: payloads.with_pair_user_votes(
+                    payload, pair.min_quantable, pair.max_quantable, user_votes, preferred_units[pair.min_quantable_id]
+                ) for pair, payload in zip(pairs, pair_payloads)
+            },
+            'not_found': {
+                'ids': [quantable_id for quantable_id in quantable_ids
+                        if quantable_id not in {quantable.id for quantable in quantables}],
+                'pair_ids': [pair_id for pair_id in pair_ids if pair_id not in {pair.pair_id for pair in pairs}],
+            },
+        })
 
-        min_quantable_data['preferred_unit'] = preferred_unit or min_quantable.default_unit
-        max_quantable_data['preferred_unit'] = preferred_unit or max_quantable.default_unit
+    def parse_ids(self, param, parse):
+        # In request order, without repeats
+        ids = (parse(value.strip()) for value in self.request.query_params.get(param, '').split(',') if value.strip())
+        return list(dict.fromkeys(ids))
+
+    def build_details(self, quantables, entries):
+        by_id = {quantable.id: quantable for quantable in quantables}
+        vote_values = get_storage().vote_values([quantable_ids[0] for quantable_ids, _ in entries])
+        return [
+            payloads.build_detail_payload(by_id[quantable_id], unit, vote_values[quantable_id])
+            for (quantable_id,), unit in entries
+        ]
 
-        serializer = self.get_serializer({
-            'min_quantable': min_quantable_data,
-            'max_quantable': max_quantable_data
-        })
+    def build_pairs(self, pairs, entries):
+        by_ids = {(pair.min_quantable_id, pair.max_quantable_id): pair for pair in pairs}
+        vote_values = get_storage().vote_values(
+            [quantable_id for quantable_ids, _ in entries for quantable_id in quantable_ids]
+        )
+        built = []
+        for quantable_ids, unit in entries:
+            pair = by_ids[tuple(quantable_ids)]
+            built.append(payloads.build_pair_payload(pair.min_quantable, pair.max_quantable, unit, vote_values))
+        return built
+
+
+class QuantableDistributionView(generics.RetrieveAPIView):
+    """
+    A fixed-size summary of the vote distribution for charts: a KDE curve sampled at `points`
+    values (?method=kde, the default) or the edges of `points` equal-share quantile buckets
+    (?method=quantiles), in ?unit= or the user's preferred unit.
+    """
+    queryset = Quantable.objects.all()
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
-        print(f"Response data: {serializer.data}")
+    METHODS = {'kde': histograms.kde_curve, 'quantiles': histograms.quantile_buckets}
+    DEFAULT_POINTS = 64
+    MAX_POINTS = 512
 
-        return Response(serializer.data)
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        Quantable.refresh_stale_vote_data([instance])
 
-    def apply_unit_conversion(self, quantable_data, conversion_function, default_unit, preferred_unit):
-        fields_for_conversion = [
-            'vote_average', 'vote_median', 'vote_stddev',
-            'vote_q1', 'vote_q3', 'vote_iqr', 'vote_min', 'vote_max'
-        ]
+        method = request.query_params.get('method', 'kde')
+        if method not in self.METHODS:
+            raise ValidationError(f"Invalid method. Choose one of: {', '.join(self.METHODS)}")
+        try:
+            points = int(request.query_params.get('points', self.DEFAULT_POINTS))
+        except ValueError:
+            raise ValidationError("points must be an integer.")
+        if not 2 <= points <= self.MAX_POINTS:
+            raise ValidationError(f"points must be between 2 and {self.MAX_POINTS}.")
+        unit = request.query_params.get('unit') or resolve_preferred_unit(request.user, instance)
+
+        # Computed in the default unit once per change to the votes, and converted per request
+        distribution = response_cache.get_or_build(
+            f'distribution:{method}:{points}', [instance.id], instance.default_unit,
+            timer('stats')(lambda: self.METHODS[method](
+                histograms.sort_votes(get_storage().vote_values([instance.id])[instance.id]), points
+            ))
+        )
+        distribution = [dict(point) for point in distribution]
+
+        if unit != instance.default_unit:
+            try:
+                convert_distribution(Category(instance.category), distribution, instance.default_unit, unit)
+            except ValueError as e:
+                raise ValidationError(str(e))
+
+        return Response({
+            'id': instance.id,
+            'method': method,
+            'unit': unit,
+            'vote_count': instance.vote_count,
+            'points': distribution,
+        })
 
-        for key in fields_for_conversion:
-            value = quantable_data.get(key)
-            if value is not None:
-                converted_value = conversion_function(value, default_unit, preferred_unit)
-                quantable_data[key] = round(converted_value, 2)  # Round to 2 decimal places
 
-        if 'user_vote' in quantable_data and quantable_data['user_vote'] is not None:
-            converted_user_vote = conversion_function(quantable_data['user_vote'], default_unit, preferred_unit)
-            quantable_data['user_vote'] = round(converted_user_vote, 2)  # Round to 2 decimal places
+class QuantableVoteValuesView(generics.RetrieveAPIView):
+    """
+    A quantable's raw votes in ?unit= or the user's preferred unit. Alongside JSON, the values
+    can be requested as a packed float32 or float64 buffer with ?format=f32 / ?format=f64 or an
+    Accept header of application/vnd.quantable.float32 / application/vnd.quantable.float64.
+    """
+    queryset = Quantable.objects.all()
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    renderer_classes = list(api_settings.DEFAULT_RENDERER_CLASSES) + [Float32VoteValuesRenderer, Float64VoteValuesRenderer]
 
-        for bin_data in quantable_data['freedman_diaconis_bins']:
-            bin_min = conversion_function(bin_data['bin_min'], default_unit, preferred_unit)
-            bin_max = conversion_function(bin_data['bin_max'], default_unit, preferred_unit)
-            bin_data['bin_min'] = round(bin_min, 2)  # Round to 2 decimal places
-            bin_data['bin_max'] = round(bin_max, 2)  # Round to 2 decimal places
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        unit = request.query_params.get('unit') or resolve_preferred_unit(request.user, instance)
+
+        vote_values = np.array(get_storage().vote_values([instance.id])[instance.id], dtype=float)
+        if unit != instance.default_unit:
+            try:
+                vote_values = convert_values(Category(instance.category), vote_values, instance.default_unit, unit)
+            except ValueError as e:
+                raise ValidationError(str(e))
+
+        # The binary renderers pack the array directly; JSON needs a list
+        binary = isinstance(request.accepted_renderer, VoteValuesRenderer)
+        return Response({
+            'id': instance.id,
+            'unit': unit,
+            'vote_values': vote_values if binary else vote_values.tolist(),
+        })
 
 
 class VoteCreateView(generics.CreateAPIView):
+    """
+    Casts the user's vote on a quantable, or replaces it, with `value` given in `preferred_unit` (the
+    quantable's default unit when omitted), answering 201 either way. A client may send an
+    Idempotency-Key header; a retry with the same key and body gets the first response back while
+    the QUANTABLE_VOTE_IDEMPOTENCY_CACHE entry lasts.
+    """
     queryset = Vote.objects.all()
     serializer_class = VoteSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-    def perform_create(self, serializer):
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
         quantable = serializer.validated_data['quantable']
-        preferred_unit = self.request.data.get('preferred_unit')
-        user = self.request.user
+        preferred_unit = request.data.get('preferred_unit')
+        value = serializer.validated_data['value']
+
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if idempotency_key:
+            cache_key = f'vote-idempotency:{request.user.id}:{idempotency_key}'
+            fingerprint = (quantable.id, value, preferred_unit or None)
+            idempotency_cache = caches[getattr(settings, 'QUANTABLE_VOTE_IDEMPOTENCY_CACHE', 'default')]
+            stored = idempotency_cache.get(cache_key)
+            if stored is not None:
+                if stored['fingerprint'] != fingerprint:
+                    raise ValidationError({'Idempotency-Key': 'This key was already used for a different vote.'})
+                return Response(stored['data'], status=stored['status'])
 
         try:
-            vote = Vote.objects.get(quantable=quantable, user=user)
-            # Update existing vote
-            if preferred_unit and preferred_unit != quantable.default_unit:
-                conversion_function = UNIT_CONVERSION_FUNCTIONS.get(Category(quantable.category))
-                if conversion_function:
-                    value = serializer.validated_data['value']
-                    converted_value = conversion_function(value, preferred_unit, quantable.default_unit)
-                    vote.value = converted_value
-                    vote.save()
-                else:
-                    raise ValidationError("Unit conversion not supported for this category.")
-            else:
-                vote.value = serializer.validated_data['value']
-                vote.save()
-        except Vote.DoesNotExist:
-            # Create new vote
-            if preferred_unit and preferred_unit != quantable.default_unit:
-                conversion_function = UNIT_CONVERSION_FUNCTIONS.get(Category(quantable.category))
-                if conversion_function:
-                    value = serializer.validated_data['value']
-                    converted_value = conversion_function(value, preferred_unit, quantable.default_unit)
-                    serializer.save(user=user, value=converted_value)
-                else:
-                    raise ValidationError("Unit conversion not supported for this category.")
-            else:
-                serializer.save(user=user)
+            value = quantable.to_default_unit(value, preferred_unit)
+        except ValueError as e:
+            raise ValidationError(str(e))
+        vote, _ = Vote.upsert(quantable, request.user, value)
+
+        response = Response(self.get_serializer(vote).data, status=status.HTTP_201_CREATED)
+        if idempotency_key:
+            idempotency_cache.set(
+                cache_key, {'fingerprint': fingerprint, 'data': response.data, 'status': response.status_code},
+                timeout=getattr(settings, 'QUANTABLE_VOTE_IDEMPOTENCY_TIMEOUT', 86400),
+            )
+        return response
+
+
+class VoteBulkCreateView(generics.GenericAPIView):
+    serializer_class = BulkVoteSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        rows = [dict(row, user=request.user.id) for row in serializer.validated_data['votes']]
+        try:
+            vote_count, quantable_count = ingest_votes(rows)
+        except ValueError as e:
+            raise ValidationError(str(e))
+
+        return Response({'votes': vote_count, 'quantables': quantable_count}, status=status.HTTP_201_CREATED)
 
 
 class VoteRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
@@ -378,21 +444,16 @@ class VoteRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
 
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
-        quantable = instance.quantable
-        preferred_unit = request.data.get('preferred_unit')
-
-        if preferred_unit and preferred_unit != quantable.unit:
-            conversion_function = UNIT_CONVERSION_FUNCTIONS.get(Category(quantable.category))
-            if conversion_function:
-                value = request.data.get('value')
-                converted_value = conversion_function(value, preferred_unit, quantable.unit)
-                serializer = self.get_serializer(instance, data={'value': converted_value}, partial=True)
-            else:
-                raise serializers.ValidationError("Unit conversion not supported for this category.")
-        else:
-            serializer = self.get_serializer(instance, data=request.data, partial=True)
-
+        serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
+
+        if 'value' in serializer.validated_data:
+            try:
+                serializer.validated_data['value'] = instance.quantable.to_default_unit(
+                    serializer.validated_data['value'], request.data.get('preferred_unit')
+                )
+            except ValueError as e:
+                raise ValidationError(str(e))
         self.perform_update(serializer)
         return Response(serializer.data)
 
@@ -406,8 +467,42 @@ class UserQuantablePreferenceView(generics.UpdateAPIView):
         quantable_id = request.data.get('quantable_id')
         preferred_unit = request.data.get('preferred_unit')
 
-        preference, _ = UserQuantablePreference.objects.get_or_create(user=request.user, quantable_id=quantable_id)
-        preference.preferred_unit = preferred_unit
-        preference.save()
+        if preferred_unit:
+            UserQuantablePreference.objects.update_or_create(
+                user=request.user, quantable_id=quantable_id, defaults={'preferred_unit': preferred_unit}
+            )
+        else:
+            # Clearing the override falls back to the category default or the quantable's default unit
+            UserQuantablePreference.objects.filter(user=request.user, quantable_id=quantable_id).delete()
+
+        return Response({'detail': 'Preference updated successfully'})
+
+
+class UserCategoryUnitPreferenceView(generics.UpdateAPIView):
+    queryset = UserCategoryUnitPreference.objects.all()
+    serializer_class = UserCategoryUnitPreferenceSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def update(self, request, *args, **kwargs):
+        category = request.data.get('category')
+        preferred_unit = request.data.get('preferred_unit')
+
+        try:
+            if preferred_unit:
+                UserCategoryUnitPreference.objects.update_or_create(
+                    user=request.user, category=category, defaults={'preferred_unit': preferred_unit}
+                )
+            else:
+                UserCategoryUnitPreference.objects.filter(user=request.user, category=category).delete()
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({'detail': 'Preference updated successfully'})
+
+
+class RequestMetricsView(APIView):
+    """p50/p90/p99/max of the per-request metrics recently recorded by this process, per URL name."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(registry.summary())
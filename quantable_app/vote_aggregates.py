@@ -0,0 +1,211 @@
+# quantable_app/vote_aggregates.py
+
+import math
+from collections import defaultdict, namedtuple
+
+import numpy as np
+from django.db import connection
+
+from . import histograms
+from .vote_stats import RunningMoments, QuantileSketch, finite_or_none
+
+# Everything update_vote_data_markers writes for one quantable: the Quantable vote_* fields,
+# the QuantableStatsState fields and the QuantableHistogram fields
+VoteAggregate = namedtuple('VoteAggregate', ['markers', 'state', 'histogram'])
+
+STATS_SQL = '''
+    WITH means AS (
+        SELECT quantable_id, AVG(value) AS mean
+        FROM {vote_table}
+        WHERE quantable_id = ANY(%s)
+        GROUP BY quantable_id
+    )
+    SELECT v.quantable_id,
+           COUNT(*),
+           m.mean,
+           STDDEV_POP(v.value),
+           MIN(v.value),
+           MAX(v.value),
+           PERCENTILE_CONT(ARRAY[0.25, 0.5, 0.75]) WITHIN GROUP (ORDER BY v.value),
+           SUM(POWER(v.value - m.mean, 2)),
+           SUM(POWER(v.value - m.mean, 3))
+    FROM {vote_table} v
+    JOIN means m ON m.quantable_id = v.quantable_id
+    GROUP BY v.quantable_id, m.mean
+'''
+
+SKETCH_SQL = '''
+    SELECT quantable_id,
+           CASE WHEN value > %s THEN 1 WHEN value < -%s THEN -1 ELSE 0 END AS sign,
+           CASE WHEN ABS(value) > %s THEN CEIL(LN(ABS(value)) / %s)::integer ELSE 0 END AS bucket,
+           COUNT(*)
+    FROM {vote_table}
+    WHERE quantable_id = ANY(%s)
+    GROUP BY 1, 2, 3
+'''
+
+HISTOGRAM_SQL = '''
+    SELECT v.quantable_id,
+           LEAST(GREATEST(FLOOR((v.value - p.origin) / p.bin_width), 0), p.num_bins - 1)::integer AS bin,
+           COUNT(*)
+    FROM {vote_table} v
+    JOIN UNNEST(%s::bigint[], %s::double precision[], %s::double precision[], %s::integer[])
+        AS p(quantable_id, origin, bin_width, num_bins) ON p.quantable_id = v.quantable_id
+    GROUP BY 1, 2
+'''
+
+
+def supports_sql_aggregation():
+    # percentile_cont and the other ordered-set aggregates are PostgreSQL only
+    return connection.vendor == 'postgresql'
+
+
+def empty_aggregate():
+    return VoteAggregate(
+        markers={
+            'vote_count': 0, 'vote_average': None, 'vote_median': None, 'vote_stddev': None, 'vote_q1': None,
+            'vote_q3': None, 'vote_iqr': None, 'vote_min': None, 'vote_max': None, 'vote_skewness': None,
+        },
+        state={
+            'count': 0, 'mean': 0.0, 'm2': 0.0, 'm3': 0.0, 'minimum': None, 'maximum': None,
+            'sketch': QuantileSketch().to_dict(),
+        },
+        histogram={'origin': None, 'bin_width': None, 'counts': [], 'total': 0},
+    )
+
+
+def aggregate_vote_array(vote_array):
+    """Build the aggregate of one quantable from its votes in Python (the SQLite fallback)."""
+    sorted_values = histograms.sort_votes(vote_array)
+    vote_count = len(sorted_values)
+    if vote_count == 0:
+        return empty_aggregate()
+
+    moments = RunningMoments.from_array(sorted_values)
+    q1, median, q3 = histograms.quantiles(sorted_values, [0.25, 0.5, 0.75]).tolist()
+    minimum, maximum = float(sorted_values[0]), float(sorted_values[-1])
+
+    return VoteAggregate(
+        markers=_markers(moments, minimum, maximum, q1, median, q3),
+        state=_state(moments, minimum, maximum, QuantileSketch.from_array(sorted_values)),
+        histogram=_histogram_from_sorted(sorted_values, q3 - q1),
+    )
+
+
+def aggregate_votes_in_db(quantable_ids):
+    """
+    Build the aggregates of many quantables inside PostgreSQL: one grouped query for the
+    statistics, one for the quantile sketch buckets and one for the histogram counts.
+    No vote values are transferred to Python.
+    """
+    from .models import Vote  # Import here to avoid circular import
+
+    vote_table = connection.ops.quote_name(Vote._meta.db_table)
+    quantable_ids = list(quantable_ids)
+    aggregates = {quantable_id: empty_aggregate() for quantable_id in quantable_ids}
+    if not quantable_ids:
+        return aggregates
+
+    with connection.cursor() as cursor:
+        cursor.execute(STATS_SQL.format(vote_table=vote_table), [quantable_ids])
+        stats_rows = cursor.fetchall()
+
+        sketch = QuantileSketch()
+        epsilon = QuantileSketch.MIN_INDEXABLE_VALUE
+        cursor.execute(SKETCH_SQL.format(vote_table=vote_table),
+                       [epsilon, epsilon, epsilon, math.log(sketch.gamma), quantable_ids])
+        sketches = defaultdict(QuantileSketch)
+        for quantable_id, sign, bucket, count in cursor.fetchall():
+            if sign > 0:
+                sketches[quantable_id].positive[bucket] = count
+            elif sign < 0:
+                sketches[quantable_id].negative[bucket] = count
+            else:
+                sketches[quantable_id].zero_count = count
+
+        layouts = {}
+        for quantable_id, vote_count, mean, stddev, minimum, maximum, quartiles, m2, m3 in stats_rows:
+            q1, median, q3 = quartiles
+            moments = RunningMoments(vote_count, mean, m2, m3)
+            aggregates[quantable_id] = VoteAggregate(
+                markers=_markers(moments, minimum, maximum, q1, median, q3, stddev=stddev),
+                state=_state(moments, minimum, maximum, sketches[quantable_id]),
+                histogram={'origin': None, 'bin_width': None, 'counts': [], 'total': vote_count},
+            )
+            bin_width = histograms.freedman_diaconis_width(vote_count, q3 - q1)
+            if bin_width:
+                layouts[quantable_id] = (minimum, *histograms.stored_layout(minimum, maximum, bin_width))
+
+        if layouts:
+            layout_ids = list(layouts)
+            cursor.execute(HISTOGRAM_SQL.format(vote_table=vote_table), [
+                layout_ids,
+                [layouts[quantable_id][0] for quantable_id in layout_ids],
+                [layouts[quantable_id][1] for quantable_id in layout_ids],
+                [layouts[quantable_id][2] for quantable_id in layout_ids],
+            ])
+            counts = {quantable_id: [0] * layout[2] for quantable_id, layout in layouts.items()}
+            for quantable_id, bin_index, count in cursor.fetchall():
+                counts[quantable_id][bin_index] = count
+            for quantable_id, (origin, bin_width, _) in layouts.items():
+                aggregates[quantable_id].histogram.update(
+                    origin=origin, bin_width=bin_width, counts=counts[quantable_id]
+                )
+
+    return aggregates
+
+
+def _markers(moments, minimum, maximum, q1, median, q3, stddev=None):
+    markers = {
+        'vote_count': moments.count,
+        'vote_average': moments.mean,
+        'vote_median': median,
+        'vote_stddev': (stddev if stddev is not None else moments.stddev) if moments.count > 1 else None,
+        'vote_q1': q1,
+        'vote_q3': q3,
+        'vote_iqr': q3 - q1,
+        'vote_min': minimum,
+        'vote_max': maximum,
+        'vote_skewness': moments.skewness,
+    }
+    return {field: finite_or_none(value) for field, value in markers.items()}
+
+
+def _state(moments, minimum, maximum, sketch):
+    return {
+        'count': moments.count,
+        'mean': moments.mean,
+        'm2': moments.m2,
+        'm3': moments.m3,
+        'minimum': minimum,
+        'maximum': maximum,
+        'sketch': sketch.to_dict(),
+    }
+
+
+def histogram_fields(vote_array):
+    sorted_values = histograms.sort_votes(vote_array)
+    if len(sorted_values) < 2:
+        return {'origin': None, 'bin_width': None, 'counts': [], 'total': len(sorted_values)}
+    q1, q3 = histograms.quantiles(sorted_values, [0.25, 0.75])
+    return _histogram_from_sorted(sorted_values, q3 - q1)
+
+
+def _histogram_from_sorted(sorted_values, vote_iqr):
+    vote_count = len(sorted_values)
+    empty = {'origin': None, 'bin_width': None, 'counts': [], 'total': vote_count}
+    bin_width = histograms.freedman_diaconis_width(vote_count, vote_iqr)
+    if not bin_width:
+        return empty
+
+    origin = sorted_values[0]
+    bin_width, num_bins = histograms.stored_layout(origin, sorted_values[-1], bin_width)
+    # Unlike the on-demand bins the last bin is closed, so the maximum vote is counted
+    edges = origin + np.arange(1, num_bins) * bin_width
+    counts = np.diff(np.searchsorted(sorted_values, edges), prepend=0, append=vote_count)
+    return {
+        'origin': float(origin),
+        'bin_width': float(bin_width),
+        'counts': counts.tolist(),
+        'total': vote_count,
+    }
@@ -0,0 +1,72 @@
+# quantable_app/vote_ingest.py
+
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .enums import Category
+from .models import Quantable, Vote, DirtyQuantable, stats_refresh_deferred
+from .unit_conversions import convert_values
+
+User = get_user_model()
+
+
+def ingest_votes(rows, batch_size=1000):
+    """
+    Upsert many votes at once and recompute each affected quantable a single time.
+
+    ``rows`` is an iterable of dicts with ``quantable`` and ``user`` ids, a ``value`` and an
+    optional ``unit`` (the quantable's default unit when omitted). Values are converted to
+    the default unit per (quantable, unit) group in one vectorized call, and a later row for
+    the same (quantable, user) replaces an earlier one. Raises ValueError for unknown
+    quantables, users or units without writing anything.
+
+    In deferred refresh mode the quantables are queued for the refresh_vote_stats worker instead.
+
+    Returns (number of votes written, number of quantables affected).
+    """
+    rows = list(rows)
+    quantable_ids = {row['quantable'] for row in rows}
+    quantables = Quantable.objects.in_bulk(quantable_ids)
+    missing = quantable_ids - set(quantables)
+    if missing:
+        raise ValueError(f"Unknown quantables: {', '.join(str(quantable_id) for quantable_id in sorted(missing))}")
+
+    user_ids = {row['user'] for row in rows}
+    missing = user_ids - set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+    if missing:
+        raise ValueError(f"Unknown users: {', '.join(str(user_id) for user_id in sorted(missing))}")
+
+    groups = defaultdict(list)
+    for index, row in enumerate(rows):
+        quantable = quantables[row['quantable']]
+        groups[(quantable.id, row.get('unit') or quantable.default_unit)].append(index)
+
+    values = [None] * len(rows)
+    for (quantable_id, unit), indices in groups.items():
+        quantable = quantables[quantable_id]
+        converted = convert_values(
+            Category(quantable.category), [rows[index]['value'] for index in indices], unit, quantable.default_unit
+        )
+        for index, value in zip(indices, converted.tolist()):
+            values[index] = value
+
+    # One row per (quantable, user): an upsert may not touch the same row twice
+    votes = {}
+    for row, value in zip(rows, values):
+        votes[(row['quantable'], row['user'])] = Vote(quantable_id=row['quantable'], user_id=row['user'], value=value)
+
+    with transaction.atomic():
+        Vote.objects.bulk_create(
+            votes.values(), batch_size=batch_size,
+            update_conflicts=True, unique_fields=['quantable', 'user'], update_fields=['value', 'updated_at'],
+        )
+        affected = [quantables[quantable_id] for quantable_id in sorted({key[0] for key in votes})]
+        if stats_refresh_deferred():
+            DirtyQuantable.mark_on_commit([quantable.id for quantable in affected])
+        else:
+            for start in range(0, len(affected), batch_size):
+                Quantable.refresh_vote_data_markers(affected[start:start + batch_size])
+
+    return len(votes), len(affected)
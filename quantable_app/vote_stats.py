@@ -0,0 +1,212 @@
+# quantable_app/vote_stats.py
+
+import math
+
+import numpy as np
+
+
+def finite_or_none(value):
+    """Stats are stored and served as None rather than NaN or infinity."""
+    if value is None or not math.isfinite(value):
+        return None
+    return value
+
+
+class RunningMoments:
+    """
+    Count, mean and the second/third central moment sums of a set of votes.
+
+    Votes can be added and removed one at a time in O(1) using the
+    Welford/Terriberry update (and its inverse), so the stored state never
+    needs the full vote list to stay current.
+    """
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, m3=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.m3 = m3
+
+    def add(self, value):
+        n1 = self.count
+        n = n1 + 1
+        delta = value - self.mean
+        delta_n = delta / n
+        term1 = delta * delta_n * n1
+
+        self.mean += delta_n
+        self.m3 += term1 * delta_n * (n - 2) - 3 * delta_n * self.m2
+        self.m2 += term1
+        self.count = n
+
+    def remove(self, value):
+        n = self.count
+        if n <= 1:
+            self.count, self.mean, self.m2, self.m3 = 0, 0.0, 0.0, 0.0
+            return
+
+        previous_mean = (n * self.mean - value) / (n - 1)
+        delta = value - previous_mean
+        delta_n = delta / n
+        term1 = delta * delta_n * (n - 1)
+
+        self.m2 = max(self.m2 - term1, 0.0)
+        self.m3 -= term1 * delta_n * (n - 2) - 3 * delta_n * self.m2
+        self.mean = previous_mean
+        self.count = n - 1
+
+    @property
+    def stddev(self):
+        # Population standard deviation, same as np.std
+        if self.count < 2:
+            return None
+        return math.sqrt(self.m2 / self.count)
+
+    @property
+    def skewness(self):
+        # Biased sample skewness, same as scipy.stats.skew
+        if self.count < 2 or self.m2 <= 0:
+            return None
+        return math.sqrt(self.count) * self.m3 / self.m2 ** 1.5
+
+    @classmethod
+    def from_array(cls, values):
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return cls()
+        mean = values.mean()
+        centred = values - mean
+        return cls(len(values), float(mean), float(np.sum(centred ** 2)), float(np.sum(centred ** 3)))
+
+
+class QuantileSketch:
+    """
+    Log-bucketed quantile sketch (DDSketch style) with deletion support.
+
+    Every vote is counted in the bucket ``ceil(log_gamma(|value|))``, so any
+    quantile is returned within ``relative_accuracy`` of the exact value.
+    Adding or removing a vote is a single dict update and the number of
+    buckets depends on the spread of the values, not on how many there are.
+    """
+
+    DEFAULT_RELATIVE_ACCURACY = 0.005
+    MIN_INDEXABLE_VALUE = 1e-9
+
+    def __init__(self, relative_accuracy=DEFAULT_RELATIVE_ACCURACY, positive=None, negative=None, zero_count=0):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = positive or {}
+        self.negative = negative or {}
+        self.zero_count = zero_count
+
+    @property
+    def count(self):
+        return sum(self.positive.values()) + sum(self.negative.values()) + self.zero_count
+
+    def _key(self, value):
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _bucket_value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value):
+        if value > self.MIN_INDEXABLE_VALUE:
+            key = self._key(value)
+            self.positive[key] = self.positive.get(key, 0) + 1
+        elif value < -self.MIN_INDEXABLE_VALUE:
+            key = self._key(-value)
+            self.negative[key] = self.negative.get(key, 0) + 1
+        else:
+            self.zero_count += 1
+
+    def remove(self, value):
+        if value > self.MIN_INDEXABLE_VALUE:
+            self._decrement(self.positive, self._key(value))
+        elif value < -self.MIN_INDEXABLE_VALUE:
+            self._decrement(self.negative, self._key(-value))
+        elif self.zero_count > 0:
+            self.zero_count -= 1
+
+    @staticmethod
+    def _decrement(store, key):
+        remaining = store.get(key, 0) - 1
+        if remaining > 0:
+            store[key] = remaining
+        else:
+            store.pop(key, None)
+
+    def _ordered_buckets(self):
+        # (representative value, count) pairs in ascending value order
+        for key in sorted(self.negative, reverse=True):
+            yield -self._bucket_value(key), self.negative[key]
+        if self.zero_count:
+            yield 0.0, self.zero_count
+        for key in sorted(self.positive):
+            yield self._bucket_value(key), self.positive[key]
+
+    def quantiles(self, qs):
+        """
+        Return the values at each quantile in ``qs`` (0-1), interpolated between
+        ranks the same way as np.percentile's default linear method.
+        """
+        count = self.count
+        if count == 0:
+            return [None for _ in qs]
+
+        positions = [q * (count - 1) for q in qs]
+        ranks = sorted({int(math.floor(p)) for p in positions} | {int(math.ceil(p)) for p in positions})
+
+        values_at_rank = {}
+        pending = iter(ranks)
+        rank = next(pending, None)
+        seen = 0
+        for value, bucket_count in self._ordered_buckets():
+            seen += bucket_count
+            while rank is not None and rank < seen:
+                values_at_rank[rank] = value
+                rank = next(pending, None)
+            if rank is None:
+                break
+
+        results = []
+        for position in positions:
+            lower = values_at_rank[int(math.floor(position))]
+            upper = values_at_rank[int(math.ceil(position))]
+            results.append(lower + (upper - lower) * (position - math.floor(position)))
+        return results
+
+    def to_dict(self):
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'positive': {str(key): count for key, count in self.positive.items()},
+            'negative': {str(key): count for key, count in self.negative.items()},
+            'zero_count': self.zero_count,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if not data:
+            return cls()
+        return cls(
+            relative_accuracy=data.get('relative_accuracy', cls.DEFAULT_RELATIVE_ACCURACY),
+            positive={int(key): count for key, count in data.get('positive', {}).items()},
+            negative={int(key): count for key, count in data.get('negative', {}).items()},
+            zero_count=data.get('zero_count', 0),
+        )
+
+    @classmethod
+    def from_array(cls, values, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        sketch = cls(relative_accuracy=relative_accuracy)
+        values = np.asarray(values, dtype=float)
+
+        positive = values[values > cls.MIN_INDEXABLE_VALUE]
+        negative = -values[values < -cls.MIN_INDEXABLE_VALUE]
+        sketch.zero_count = int(len(values) - len(positive) - len(negative))
+
+        for store, magnitudes in ((sketch.positive, positive), (sketch.negative, negative)):
+            if len(magnitudes):
+                keys, counts = np.unique(np.ceil(np.log(magnitudes) / sketch._log_gamma), return_counts=True)
+                store.update({int(key): int(count) for key, count in zip(keys, counts)})
+
+        return sketch
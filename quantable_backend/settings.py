@@ -45,6 +45,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'quantable_app.instrumentation.InstrumentationMiddleware',
 ]
 
 ROOT_URLCONF = 'quantable_backend.urls'
@@ -138,13 +139,36 @@ REST_FRAMEWORK = {
 }
 
 
+# Per-request metrics (see quantable_app/instrumentation.py) are written as JSON lines to
+# QUANTABLE_METRICS_LOG_FILE; summarize them with the request_metrics command. Set
+# QUANTABLE_METRICS_LOG_LEVEL=WARNING to stop writing them. Queries slower than
+# QUANTABLE_SLOW_QUERY_MS are logged to the console, sampled at QUANTABLE_SLOW_QUERY_SAMPLE_RATE.
+QUANTABLE_METRICS_LOG_FILE = os.getenv('QUANTABLE_METRICS_LOG_FILE', str(BASE_DIR / 'request_metrics.log'))
+QUANTABLE_METRICS_LOG_LEVEL = os.getenv('QUANTABLE_METRICS_LOG_LEVEL', 'INFO')
+QUANTABLE_METRICS_WINDOW = 1000
+QUANTABLE_SLOW_QUERY_MS = float(os.getenv('QUANTABLE_SLOW_QUERY_MS', '100'))
+QUANTABLE_SLOW_QUERY_SAMPLE_RATE = float(os.getenv('QUANTABLE_SLOW_QUERY_SAMPLE_RATE', '1.0'))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'message': {
+            'format': '%(message)s',
+        },
+    },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
         },
+        'metrics_file': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': QUANTABLE_METRICS_LOG_FILE,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 3,
+            'delay': True,
+            'formatter': 'message',
+        },
     },
     'loggers': {
         '': {
@@ -152,11 +176,81 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        'quantable_app.metrics': {
+            'handlers': ['metrics_file'],
+            'level': QUANTABLE_METRICS_LOG_LEVEL,
+            'propagate': False,
+        },
+        'quantable_app.slow_queries': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
     },
 }
 
 CSRF_TRUSTED_ORIGINS = ['http://localhost:3000']
 
+# Computed quantable detail and pair payloads are cached here (see quantable_app/response_cache.py);
+# use a shared backend such as Redis or Memcached when running more than one process
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Idempotency-Key responses, kept apart so cached payloads cannot cull them. Local memory is per
+    # process, so a retry that reaches another worker is not recognised; point this at a shared
+    # cache (Redis, Memcached or the database) for retries to be safe across workers.
+    'idempotency': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'idempotency',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+QUANTABLE_RESPONSE_CACHE_TIMEOUT = 600
+# Most quantables plus pairs one quantables/batch/ request may ask for
+QUANTABLE_BATCH_DETAIL_MAX_ITEMS = 100
+
+# Exchange rates for currency conversion: 'static' (the built-in table, works offline), 'file'
+# (QUANTABLE_EXCHANGE_RATE_FILE) or 'database' (the newest ExchangeRateSnapshot). Record new rates
+# with the update_exchange_rates command; each process picks them up within the refresh interval.
+QUANTABLE_EXCHANGE_RATE_PROVIDER = os.getenv('QUANTABLE_EXCHANGE_RATE_PROVIDER', 'static')
+QUANTABLE_EXCHANGE_RATE_FILE = os.getenv('QUANTABLE_EXCHANGE_RATE_FILE', str(BASE_DIR / 'exchange_rates.json'))
+QUANTABLE_EXCHANGE_RATE_REFRESH_SECONDS = 300
+
+# Vote statistics refresh: 'sync' updates a quantable's stats inside every vote write, 'deferred'
+# only queues it for the refresh_vote_stats worker. Reads recompute any queued quantable that has
+# waited longer than QUANTABLE_STATS_MAX_STALENESS seconds. Run `refresh_vote_stats --once` after
+# switching back to 'sync' so no queued quantable is left behind.
+QUANTABLE_STATS_REFRESH_MODE = os.getenv('QUANTABLE_STATS_REFRESH_MODE', 'sync')
+QUANTABLE_STATS_MAX_STALENESS = int(os.getenv('QUANTABLE_STATS_MAX_STALENESS', '30'))
+# Up to this many votes a single vote change reads the quantable's votes for its exact median and
+# quartiles; above it they come from the quantile sketch (within 0.5%), so the update does not grow
+# with the number of votes. A full recompute is always exact.
+QUANTABLE_EXACT_QUANTILES_MAX_VOTES = 1000
+
+# Vote storage: 'rows' keeps every vote as a Vote row; 'packed' also reads the votes the compact_votes
+# command has packed into float32 arrays, one row per quantable (see quantable_app/vote_storage.py for
+# the precision kept). Run `compact_votes --expand` before switching back to 'rows'.
+QUANTABLE_VOTE_STORAGE = os.getenv('QUANTABLE_VOTE_STORAGE', 'rows')
+
+# Live stats over server-sent events (quantables/live/). They need an ASGI server, e.g.
+# `uvicorn quantable_backend.asgi:application`; under WSGI_APPLICATION or runserver the endpoint answers 501.
+# 'local' only reaches streams in the process where the change was made; 'cache' also polls the shared
+# cache every QUANTABLE_LIVE_UPDATES_POLL_SECONDS, for more than one worker process or with deferred
+# stats refresh.
+QUANTABLE_LIVE_UPDATES_BACKEND = os.getenv('QUANTABLE_LIVE_UPDATES_BACKEND', 'local')
+QUANTABLE_LIVE_UPDATES_INTERVAL = 1.0
+QUANTABLE_LIVE_UPDATES_POLL_SECONDS = 1.0
+QUANTABLE_LIVE_UPDATES_KEEPALIVE_SECONDS = 15.0
+QUANTABLE_LIVE_UPDATES_MAX_QUANTABLES = 50
+
+# How long the response to a vote sent with an Idempotency-Key header is kept for retries, in seconds,
+# and the CACHES alias it is kept in. Replays are best effort: an evicted or unshared entry means the
+# retry is applied again, which the vote upsert makes harmless unless the vote changed in between.
+QUANTABLE_VOTE_IDEMPOTENCY_TIMEOUT = 86400
+QUANTABLE_VOTE_IDEMPOTENCY_CACHE = 'idempotency'
+
 # Email configuration for testing
 # EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 